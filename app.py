@@ -1,5 +1,7 @@
 import os
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+import time
+import threading
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
 import torch
 import numpy as np
 import librosa
@@ -13,15 +15,26 @@ from emotion_twin import EmotionTwin
 from neuro_challenges import NeuroChallenges
 from bio_sync import BioSync
 from micro_empathy import MicroEmpathy
-from emotion_privacy import EmotionPrivacy
+from emotion_privacy import EmotionPrivacy, gzip_chunks
 from resilience_builder import ResilienceBuilder
 from emotion_forecast import EmotionForecast
 from mind_rooms import MindRooms
 from emotion_anchors import EmotionAnchors
 from coping_coach import CopingCoach
+from inference_client import InferenceClient, InferenceUnavailable, fallback_detection
+from fusion_engine.fusion import FusionEngine
+from event_bus import EventBus, POLL_SECONDS
 import database as db
+import storage
+import auth
+import metrics
+import sampling_profiler
 
 app = Flask(__name__)
+# Per-route counts/latency/in-flight, SQLite time per request, GET /metrics (Prometheus)
+metrics.init_app(app)
+# /admin/profile + X-Profile header; only active when NEUROLENS_PROFILER_TOKEN is set
+sampling_profiler.init_app(app)
 app.secret_key = 'neurolens_secret_key_2024'
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -43,6 +56,96 @@ emotion_anchors = EmotionAnchors()
 coping_coach = CopingCoach()
 db.init_db()
 
+# Out-of-process inference (python inference_server.py); unset keeps DeepFace in-process
+inference_client = InferenceClient() if os.environ.get('NEUROLENS_INFERENCE_SOCKET') else None
+
+# Password KDF work runs on a bounded pool; authorization reads cached user rows
+auth_pool = auth.AuthPool()
+users = auth.UserCache(db.get_user)
+db.USER_CHANGE_HOOKS.append(users.invalidate)
+
+def is_parent():
+    """Logged in as a parent whose users row (cached) still says parent"""
+    if 'user_id' not in session or session.get('role') != 'parent':
+        return False
+    user = users.get(session['user_id'])
+    return user is not None and user['role'] == 'parent'
+
+# Face and voice samples of each user are fused into one stream; /log_emotion logs that stream
+fusion = FusionEngine()
+
+def fuse_sample(modality, emotion, confidence, all_emotions=None):
+    """Feed one modality result into the current user's fused stream"""
+    if 'user_id' not in session:
+        session['user_id'] = 1
+    return fusion.update(session['user_id'], modality, all_emotions or {emotion: confidence}, confidence)
+
+# Server push (/events): per-user state is sent only when it changes
+bus = EventBus()
+EMPATHY_INTERVAL = 60   # seconds between empathy prompts
+DERIVED_INTERVAL = 30   # seconds between weekly/resilience/forecast recomputes for one user
+CLOUD_INTERVAL = 30     # seconds the global emotion cloud is cached
+_cloud_cache = {'at': 0.0, 'data': None}
+# One snapshot per user, shared by all of that user's /events streams in this worker
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+def _snapshot(user_id):
+    with _snapshots_lock:
+        snap = _snapshots.get(user_id)
+        if snap is None:
+            for other in [u for u in _snapshots if not bus.is_connected(u)]:
+                del _snapshots[other]
+            snap = _snapshots[user_id] = {'lock': threading.Lock(), 'checked_at': 0.0, 'mark': None, 'dirty': True,
+                                          'derived_at': 0.0, 'empathy_at': 0.0, 'state': {}}
+        return snap
+
+def refresh_user_state(user_id):
+    """Make the user's streams re-read the database now instead of at the next poll"""
+    with _snapshots_lock:
+        snap = _snapshots.get(user_id)
+    if snap is not None:
+        snap['checked_at'] = 0.0
+    bus.notify(user_id)
+
+def user_state(user_id, user_type):
+    """State callable for bus.stream(); read-only, and shared by the user's streams.
+
+    However many tabs are open, the latest emotion is read at most once per
+    POLL_SECONDS (or right after refresh_user_state), and weekly/resilience/
+    forecast are recomputed only after it changes.
+    """
+    snap = _snapshot(user_id)
+    
+    def state():
+        now = time.time()
+        with snap['lock']:
+            if now - snap['checked_at'] >= POLL_SECONDS:
+                snap['checked_at'] = now
+                latest = db.get_latest_emotion(user_id)
+                if latest and latest[0] != snap['mark']:
+                    snap['mark'] = latest[0]
+                    snap['dirty'] = True
+                    emotion = latest[1]
+                    snap['state']['emotion'] = {'emotion': emotion, 'confidence': latest[2]}
+                    if emotion != 'happy' and now - snap['empathy_at'] >= EMPATHY_INTERVAL:
+                        snap['empathy_at'] = now
+                        snap['state']['empathy'] = {**micro_empathy.get_empathy_prompt(emotion, user_type), 'emotion': emotion}
+            if snap['dirty'] and now - snap['derived_at'] >= DERIVED_INTERVAL:
+                snap['dirty'] = False
+                snap['derived_at'] = now
+                snap['state']['weekly_emotions'] = weekly_emotions_payload(user_id)
+                resilience = resilience_builder.calculate_resilience_score(user_id)
+                snap['state']['resilience'] = {**resilience, 'goal': resilience_builder.weekly_goal(resilience)}
+                snap['state']['forecast'] = {'forecast': emotion_forecast.get_3day_forecast(user_id), 'success': True}
+            current = dict(snap['state'])
+        if now - _cloud_cache['at'] >= CLOUD_INTERVAL:
+            _cloud_cache['at'] = now
+            _cloud_cache['data'] = emotion_cloud_payload()
+        return {**current, 'emotion_cloud': _cloud_cache['data']}
+    
+    return state
+
 # --- Fake Models (replace with your own) ---
 emotions_image = ["angry", "disgust", "fear", "happy"]
 emotions_voice = ["euphoric", "sad", "joyful", "surprised"]
@@ -77,8 +180,14 @@ def home():
 def login():
     username = request.json.get("username")
     password = request.json.get("password")
+    if not username or not password:
+        return jsonify({"success": False, "message": "Invalid credentials"})
     
-    user = db.verify_user(username, password)
+    try:
+        user = auth_pool.run(db.verify_user, username, password)
+    except auth.AuthBusy:
+        metrics.record_error('login_busy')
+        return jsonify({"success": False, "message": "Server busy, please try again"}), 503
     if user:
         session['user_id'] = user[0]
         session['role'] = user[1]
@@ -99,7 +208,14 @@ def register():
     if role == 'child' and parent_code:
         parent_id = int(parent_code)
     
-    user_id = db.create_user(username, password, role, parent_id, user_type)
+    if not username or not password:
+        return jsonify({"success": False, "message": "Username and password are required"})
+    
+    try:
+        user_id = auth_pool.run(db.create_user, username, password, role, parent_id, user_type)
+    except auth.AuthBusy:
+        metrics.record_error('register_busy')
+        return jsonify({"success": False, "message": "Server busy, please try again"}), 503
     if user_id:
         return jsonify({"success": True, "user_id": user_id})
     return jsonify({"success": False, "message": "Username already exists"})
@@ -111,7 +227,7 @@ def logout():
 
 @app.route("/parent_dashboard")
 def parent_dashboard():
-    if 'user_id' not in session or session['role'] != 'parent':
+    if not is_parent():
         return redirect(url_for('home'))
     return render_template("parent_dashboard.html")
 
@@ -129,6 +245,27 @@ def detect_emotion():
     try:
         image_data = request.json.get('image', '')
         
+        if inference_client is not None:
+            import base64
+            img_data = base64.b64decode(image_data.split(',')[1])
+            try:
+                with metrics.time_inference('inference_server_face'):
+                    result = inference_client.detect_face(img_data)
+            except InferenceUnavailable as e:
+                print(f"Inference server unavailable, using pattern-based detection: {e}")
+                metrics.record_error('inference_server_face')
+                with metrics.time_inference('pattern'):
+                    result = fallback_detection(img_data)
+            
+            return jsonify({
+                'success': True,
+                'dominant_emotion': result['dominant_emotion'],
+                'confidence': result['confidence'],
+                'all_emotions': result.get('all_emotions'),
+                'fused': fuse_sample('face', result['dominant_emotion'], result['confidence'],
+                                     result.get('all_emotions'))
+            })
+        
         # Try using DeepFace for real emotion detection
         try:
             from deepface import DeepFace
@@ -142,7 +279,8 @@ def detect_emotion():
             img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             
             # Analyze emotion
-            result = DeepFace.analyze(img, actions=['emotion'], enforce_detection=False)
+            with metrics.time_inference('deepface'):
+                result = DeepFace.analyze(img, actions=['emotion'], enforce_detection=False)
             
             if isinstance(result, list):
                 result = result[0]
@@ -155,7 +293,8 @@ def detect_emotion():
                 'success': True,
                 'dominant_emotion': dominant_emotion,
                 'confidence': confidence,
-                'all_emotions': emotions
+                'all_emotions': emotions,
+                'fused': fuse_sample('face', dominant_emotion, confidence, emotions)
             })
         except ImportError:
             # Fallback: Use face detection patterns
@@ -187,10 +326,12 @@ def detect_emotion():
             return jsonify({
                 'success': True,
                 'dominant_emotion': emotion,
-                'confidence': 0.75
+                'confidence': 0.75,
+                'fused': fuse_sample('face', emotion, 0.75)
             })
     except Exception as e:
         print(f"Detection error: {e}")
+        metrics.record_error('detect_emotion')
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route("/analyze_image", methods=["POST"])
@@ -199,15 +340,25 @@ def analyze_image():
     filepath = os.path.join(UPLOAD_FOLDER, secure_filename(file.filename))
     file.save(filepath)
     emotion = predict_image(filepath)
-    return jsonify({"emotion": emotion})
+    return jsonify({"emotion": emotion, "fused": fuse_sample('face', emotion, 0.5)})
 
 @app.route("/analyze_voice", methods=["POST"])
 def analyze_voice():
     file = request.files["file"]
     filepath = os.path.join(UPLOAD_FOLDER, secure_filename(file.filename))
     file.save(filepath)
-    emotion = predict_voice(filepath)
-    return jsonify({"emotion": emotion})
+    result = None
+    if inference_client is not None:
+        try:
+            with metrics.time_inference('inference_server_voice'):
+                result = inference_client.predict_voice(filepath)
+        except InferenceUnavailable:
+            metrics.record_error('inference_server_voice')
+    if result is None:
+        with metrics.time_inference('voice'):
+            result = {'emotion': predict_voice(filepath), 'confidence': 0.5}
+    fused = fuse_sample('voice', result['emotion'], result.get('confidence', 0.5), result.get('all_emotions'))
+    return jsonify({"emotion": result['emotion'], "fused": fused})
 
 @app.route("/chat", methods=["POST"])
 def chat():
@@ -231,22 +382,33 @@ def log_emotion():
     emotion = request.json.get("emotion")
     confidence = request.json.get("confidence", 0.9)
     
+    # Log the fused face+voice stream; the posted emotion only seeds it when nothing
+    # was analysed server-side recently (e.g. the client's own pattern fallback)
+    fused = fusion.current(session['user_id'])
+    if fused is None and emotion:
+        fused = fuse_sample(request.json.get("modality", "face"), emotion, confidence)
+    if fused is not None:
+        emotion, confidence = fused['emotion'], fused['confidence']
+    
     # Create privacy-protected record
     privacy_record = emotion_privacy.create_privacy_record(emotion, confidence, session['user_id'])
     
     try:
         db.log_emotion(session['user_id'], emotion, confidence)
-    except:
-        pass
+        refresh_user_state(session['user_id'])
+    except storage.backend().Error as e:
+        print(f"⚠️ Emotion log failed: {e}")
+        metrics.record_error('log_emotion_db')
     
     # Get productivity coaching based on emotion
     coaching = productivity_coach.analyze_emotion(emotion, confidence)
     
-    return jsonify({"success": True, "coaching": coaching, "privacy": privacy_record})
+    return jsonify({"success": True, "emotion": emotion, "confidence": confidence, "fused": fused,
+                    "coaching": coaching, "privacy": privacy_record})
 
 @app.route("/get_children_data")
 def get_children_data():
-    if 'user_id' not in session or session['role'] != 'parent':
+    if not is_parent():
         return jsonify({"success": False})
     
     children = db.get_children(session['user_id'])
@@ -260,6 +422,156 @@ def get_children_data():
         "chats": chats
     })
 
+# --- Parent dashboard API: fixed-size summaries + keyset-paginated raw logs ---
+SUMMARY_DAYS = 14
+NEGATIVE_ALERT_SHARE = 0.5
+INACTIVE_ALERT_DAYS = 3
+PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+def child_summaries_payload(parent_id, days=SUMMARY_DAYS):
+    """Per-child distribution, daily trend and alerts from the daily rollup tables"""
+    from datetime import datetime, timedelta
+
+    emotions, chats, latest = db.get_child_rollups(parent_id, days)
+    today = datetime.utcnow().date()  # rollup days are UTC (storage.today())
+    day_keys = [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+    children = {}
+    for child_id, username in db.get_children(parent_id):
+        children[child_id] = {
+            "child_id": child_id,
+            "username": username,
+            "distribution": {},
+            "avg_confidence": None,
+            "trend": {day: {"day": day, "count": 0, "negative": 0} for day in day_keys},
+            "chats": {"total": 0, "concerning": 0},
+            "last_seen": None,
+            "alerts": []
+        }
+
+    confidence = {}
+    for child_id, day, emotion, count, confidence_sum in emotions:
+        child = children.get(child_id)
+        if child is None or day not in child["trend"]:
+            continue
+        child["distribution"][emotion] = child["distribution"].get(emotion, 0) + count
+        child["trend"][day]["count"] += count
+        if emotion in db.NEGATIVE_EMOTIONS:
+            child["trend"][day]["negative"] += count
+        total, summed = confidence.get(child_id, (0, 0.0))
+        confidence[child_id] = (total + count, summed + confidence_sum)
+
+    for child_id, day, sentiment, count in chats:
+        child = children.get(child_id)
+        if child is None:
+            continue
+        child["chats"]["total"] += count
+        if sentiment == 'concerning':
+            child["chats"]["concerning"] += count
+
+    cursors = {"emotions": 0, "chats": 0}
+    for child_id, last_emotion_id, last_seen, last_chat_id in latest:
+        child = children.get(child_id)
+        if child is None:
+            continue
+        child["last_seen"] = last_seen
+        cursors["emotions"] = max(cursors["emotions"], last_emotion_id or 0)
+        cursors["chats"] = max(cursors["chats"], last_chat_id or 0)
+
+    for child_id, child in children.items():
+        total, summed = confidence.get(child_id, (0, 0.0))
+        if total:
+            child["avg_confidence"] = round(summed / total, 3)
+        points = list(child["trend"].values())
+        child["trend"] = [
+            {"day": point["day"], "count": point["count"],
+             "negative_share": round(point["negative"] / point["count"], 3) if point["count"] else None}
+            for point in points
+        ]
+
+        # Direction: negative share of the recent half of the window vs the earlier half
+        half = len(points) // 2
+        def share(window):
+            count = sum(p["count"] for p in window)
+            return sum(p["negative"] for p in window) / count if count else None
+        earlier, recent = share(points[:half]), share(points[half:])
+        if earlier is None or recent is None:
+            child["direction"] = "unknown"
+        elif recent > earlier + 0.1:
+            child["direction"] = "worsening"
+        elif recent < earlier - 0.1:
+            child["direction"] = "improving"
+        else:
+            child["direction"] = "stable"
+
+        if recent is not None and recent >= NEGATIVE_ALERT_SHARE:
+            child["alerts"].append({"type": "negative_mood",
+                                    "message": f"{round(recent * 100)}% negative emotions in the last {len(points) - half} days"})
+        if child["chats"]["concerning"]:
+            child["alerts"].append({"type": "concerning_chat",
+                                    "message": f"{child['chats']['concerning']} concerning chat message(s)"})
+        recent_activity = sum(p["count"] for p in points[-INACTIVE_ALERT_DAYS:])
+        if not recent_activity:
+            child["alerts"].append({"type": "inactive",
+                                    "message": f"No emotion check-ins in {INACTIVE_ALERT_DAYS} days"})
+
+    return {"success": True, "days": days, "children": list(children.values()), "cursors": cursors}
+
+def parent_logs_payload(parent_id, table, fields):
+    """Keyset page of emotion/chat rows: ?child_id=&before=<id> (older) or ?since=<id> (delta)"""
+    def int_arg(name):
+        value = request.args.get(name)
+        return int(value) if value not in (None, '') else None
+
+    try:
+        child_id, before, since = int_arg('child_id'), int_arg('before'), int_arg('since')
+        limit = min(max(int_arg('limit') or PAGE_LIMIT, 1), MAX_PAGE_LIMIT)
+    except ValueError:
+        return jsonify({"success": False, "error": "child_id, before, since and limit must be integers"}), 400
+
+    # Fetch one extra row to know whether another page exists without a COUNT(*)
+    rows = db.get_child_logs(parent_id, table, child_id=child_id, before=before, since=since, limit=limit + 1)
+    has_more = len(rows) > limit
+    items = [dict(zip(fields, row)) for row in rows[:limit]]
+    if since is not None:
+        next_cursor = {"since": items[-1]["id"] if items else since}
+    else:
+        next_cursor = {"before": items[-1]["id"] if items and has_more else None}
+    return jsonify({"success": True, "items": items, "has_more": has_more, "next": next_cursor})
+
+@app.route("/parent/api/summary")
+def parent_summary():
+    if not is_parent():
+        return jsonify({"success": False}), 403
+    try:
+        days = min(max(int(request.args.get('days', SUMMARY_DAYS)), 2), 90)
+    except ValueError:
+        days = SUMMARY_DAYS
+    payload = child_summaries_payload(session['user_id'], days)
+    # Unchanged logs (and same day) -> 304, so an idle dashboard refresh costs no payload at all
+    cursors = payload["cursors"]
+    etag = f'W/"{session["user_id"]}-{days}-{cursors["emotions"]}-{cursors["chats"]}-{storage.today()}"'
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=304, headers={'ETag': etag})
+    response = jsonify(payload)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route("/parent/api/emotions")
+def parent_emotion_logs():
+    if not is_parent():
+        return jsonify({"success": False}), 403
+    return parent_logs_payload(session['user_id'], 'emotion_logs',
+                               ("id", "child_id", "username", "emotion", "confidence", "timestamp"))
+
+@app.route("/parent/api/chats")
+def parent_chat_logs():
+    if not is_parent():
+        return jsonify({"success": False}), 403
+    return parent_logs_payload(session['user_id'], 'chat_logs',
+                               ("id", "child_id", "username", "message", "sentiment", "timestamp"))
+
 @app.route("/reset_chat", methods=["POST"])
 def reset_chat():
     global chatbot
@@ -319,13 +631,12 @@ def get_mood_forecast():
     
     # For child users, get their own emotions
     if session['role'] == 'child':
-        import sqlite3
-        conn = sqlite3.connect('neurolens.db')
+        conn = storage.connect()
         c = conn.cursor()
-        c.execute('''SELECT username, emotion, confidence, timestamp 
-                     FROM emotion_logs 
-                     WHERE user_id = ? 
-                     ORDER BY timestamp DESC LIMIT 100''', (session['user_id'],))
+        c.execute('''SELECT u.username, e.emotion, e.confidence, e.timestamp 
+                     FROM emotion_logs e JOIN users u ON e.user_id = u.id 
+                     WHERE e.user_id = ? 
+                     ORDER BY e.timestamp DESC LIMIT 100''', (session['user_id'],))
         emotions = c.fetchall()
         conn.close()
     
@@ -356,25 +667,35 @@ def get_peer_topic():
     topic = role_personalization.get_peer_topic()
     return jsonify({"topic": topic})
 
+@app.route("/events")
+def events():
+    """Server-Sent Events channel for the current user (see event_bus.py)"""
+    if 'user_id' not in session:
+        session['user_id'] = 1
+    state = user_state(session['user_id'], session.get('user_type', 'general'))
+    return Response(bus.stream(session['user_id'], state), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route("/get_weekly_emotions", methods=["GET"])
 def get_weekly_emotions():
     if 'user_id' not in session:
         session['user_id'] = 1
-    
+    return jsonify(weekly_emotions_payload(session['user_id']))
+
+def weekly_emotions_payload(user_id):
     try:
-        import sqlite3
-        conn = sqlite3.connect('neurolens.db')
+        conn = storage.connect()
         c = conn.cursor()
         c.execute('''SELECT emotion, timestamp 
                      FROM emotion_logs 
                      WHERE user_id = ? 
-                     AND datetime(timestamp) >= datetime('now', '-7 days')
-                     ORDER BY timestamp ASC''', (session['user_id'],))
+                     AND timestamp >= ?
+                     ORDER BY timestamp ASC''', (user_id, storage.ago(days=7)))
         emotions = c.fetchall()
         conn.close()
-        return jsonify({"success": True, "emotions": emotions})
+        return {"success": True, "emotions": emotions}
     except:
-        return jsonify({"success": True, "emotions": []})
+        return {"success": True, "emotions": []}
 
 @app.route("/get_twin_response", methods=["POST"])
 def get_twin_response():
@@ -448,37 +769,46 @@ def get_privacy_stats():
 
 @app.route("/export_emotion_dna", methods=["GET"])
 def export_emotion_dna():
+    """Stream the user's full history: ?format=json (default, chunked array), ndjson or binary"""
     if 'user_id' not in session:
         session['user_id'] = 1
-    
-    import sqlite3
-    conn = sqlite3.connect('neurolens.db')
-    c = conn.cursor()
-    c.execute('SELECT emotion, confidence FROM emotion_logs WHERE user_id = ? ORDER BY timestamp DESC LIMIT 100', (session['user_id'],))
-    logs = c.fetchall()
-    conn.close()
-    
-    dna_data = emotion_privacy.export_emotion_dna(session['user_id'], logs)
-    
-    from flask import Response
+    user_id = session['user_id']
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'ndjson', 'binary'):
+        fmt = 'json'
+
+    chunks = emotion_privacy.stream_emotion_dna(user_id, db.iter_emotion_logs(user_id), fmt)
+    if fmt == 'binary':
+        # Blocks are compressed already; gzip on top would only cost CPU
+        return Response(chunks, mimetype='application/octet-stream',
+                        headers={'Content-Disposition': 'attachment;filename=emotion_dna.mooddna.bin'})
+    headers = {
+        'Content-Disposition': f"attachment;filename=emotion_dna.mooddna{'.ndjson' if fmt == 'ndjson' else ''}",
+        'Vary': 'Accept-Encoding'
+    }
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
     return Response(
-        dna_data,
-        mimetype='application/json',
-        headers={'Content-Disposition': 'attachment;filename=emotion_dna.mooddna'}
+        chunks,
+        mimetype='application/x-ndjson' if fmt == 'ndjson' else 'application/json',
+        headers=headers
     )
 
 @app.route("/admin/emotion_cloud", methods=["GET"])
 def emotion_cloud():
-    import sqlite3
+    return jsonify(emotion_cloud_payload())
+
+def emotion_cloud_payload():
     from collections import Counter
     from datetime import datetime, timedelta
     
-    conn = sqlite3.connect('neurolens.db')
+    conn = storage.connect()
     c = conn.cursor()
     
     # Get all emotions from last 24 hours
     c.execute('''SELECT emotion, timestamp FROM emotion_logs 
-                 WHERE datetime(timestamp) >= datetime('now', '-1 day')''')
+                 WHERE timestamp >= ?''', (storage.ago(days=1),))
     emotions = c.fetchall()
     
     # Distribution
@@ -519,7 +849,7 @@ def emotion_cloud():
     
     conn.close()
     
-    return jsonify({
+    return {
         'distribution': distribution,
         'hourly_labels': [f'{i}:00' for i in range(24)],
         'hourly_happy': [hourly_data[i]['happy'] for i in range(24)],
@@ -530,7 +860,7 @@ def emotion_cloud():
         'avg_health': round(75 - (sad_count/total*20) if total > 0 else 75, 1),
         'peak_stress_time': max(hourly_data.items(), key=lambda x: x[1]['stress'])[0] if emotions else 'N/A',
         'anomalies': anomalies
-    })
+    }
 
 @app.route("/get_resilience_score", methods=["GET"])
 def get_resilience_score():
@@ -0,0 +1,150 @@
+"""
+Password hashing, off-thread login verification and cached user lookups
+
+Passwords are stored as PBKDF2-HMAC-SHA256 strings
+
+    pbkdf2_sha256$<iterations>$<salt b64>$<hash b64>
+
+Legacy bare SHA-256 hex digests still verify and are flagged for rehash,
+so existing accounts upgrade on their next successful login.
+
+The KDF is deliberately slow (~0.3 s at the default iteration count), so
+logins and registrations run on a small bounded pool (hashlib releases
+the GIL while hashing): at most `workers` hashes run at once, at most
+`max_pending` wait, and anything beyond that fails fast with AuthBusy
+instead of piling up request threads.
+
+UserCache keeps (role, parent_id, user_type) per user id for a few
+seconds so authorization checks don't hit SQLite on every request.
+Updates in this process invalidate the entry; other workers see the
+change once the TTL runs out.
+"""
+
+import os
+import hmac
+import time
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+ALGORITHM = 'pbkdf2_sha256'
+ITERATIONS = int(os.environ.get('NEUROLENS_PBKDF2_ITERATIONS', 600000))
+SALT_BYTES = 16
+AUTH_WORKERS = int(os.environ.get('NEUROLENS_AUTH_WORKERS', min(4, os.cpu_count() or 1)))
+AUTH_MAX_PENDING = int(os.environ.get('NEUROLENS_AUTH_MAX_PENDING', 32))
+AUTH_TIMEOUT = 10.0
+USER_CACHE_TTL = float(os.environ.get('NEUROLENS_USER_CACHE_TTL', 30))
+
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def hash_password(password, iterations=None, salt=None):
+    iterations = iterations or ITERATIONS
+    salt = salt or os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password, stored):
+    """(matches, needs_rehash) for a stored hash in either format"""
+    if not stored:
+        return False, False
+    if not stored.startswith(ALGORITHM + '$'):
+        # Legacy unsalted SHA-256 hex digest
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        matches = hmac.compare_digest(legacy, stored)
+        return matches, matches
+    try:
+        _, iterations, salt, expected = stored.split('$')
+        iterations = int(iterations)
+        salt, expected = _unb64(salt), _unb64(expected)
+    except ValueError:
+        return False, False
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    matches = hmac.compare_digest(digest, expected)
+    return matches, matches and iterations < ITERATIONS
+
+
+_dummy_hash = None
+
+
+def verify_dummy(password):
+    """Spend one verification's worth of KDF time, e.g. for an unknown username"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password('')
+    verify_password(password, _dummy_hash)
+
+
+class AuthBusy(Exception):
+    """Raised when the verification queue is full or a verification times out"""
+
+
+class AuthPool:
+    """Bounded thread pool for KDF work"""
+
+    def __init__(self, workers=AUTH_WORKERS, max_pending=AUTH_MAX_PENDING):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='auth')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def run(self, fn, *args, timeout=AUTH_TIMEOUT):
+        """Run fn(*args) on the pool and wait for it; AuthBusy when the queue is full or it times out"""
+        if not self._slots.acquire(blocking=False):
+            raise AuthBusy("too many logins in progress")
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            raise AuthBusy("login verification timed out")
+
+
+class UserCache:
+    """TTL + LRU cache of user rows, loaded through loader(user_id) -> dict or None"""
+
+    def __init__(self, loader, ttl=USER_CACHE_TTL, maxsize=4096, clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()  # user id -> (expires, row)
+        self._generation = 0  # bumped by invalidate() so a load racing an update isn't stored
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+            generation = self._generation
+        row = self.loader(user_id)
+        with self._lock:
+            if generation != self._generation:
+                return row
+            self._entries[user_id] = (now + self.ttl, row)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return row
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
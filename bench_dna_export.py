@@ -0,0 +1,181 @@
+"""
+Emotion DNA export benchmark
+Builds a throwaway database with a large history for one user and exports it
+with the old in-memory exporter and the streaming exporter.
+
+    legacy        - fetch everything, create_privacy_record per row, json.dumps(indent=2)
+    stream-json   - keyset batches -> chunked JSON array (what /export_emotion_dna serves)
+    stream-ndjson - keyset batches -> NDJSON
+    ndjson+gzip   - NDJSON through the incremental gzip encoder
+    binary        - columnar mooddna_format blocks
+
+Streamed outputs are written to disk and parsed back (json.load for the
+JSON document, MoodDNAReader.columns() for binary) to compare parse time.
+
+Each scenario runs in a forked child so peak RSS is measured per scenario.
+
+Run: python bench_dna_export.py
+     python bench_dna_export.py --rows 1000000 --batch 5000 --json bench_output/dna_export.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+USER_ID = 1
+EMOTIONS = ['happy', 'sad', 'angry', 'neutral', 'surprise', 'fear', 'disgust']
+SCENARIOS = ['legacy', 'stream-json', 'stream-ndjson', 'ndjson+gzip', 'binary']
+
+
+def build_history(n_rows):
+    """Fill neurolens.db in the current directory with n_rows logs for USER_ID"""
+    import database as db  # creates the schema in the current directory
+
+    db.create_user('bench', 'bench', 'child')
+    conn = sqlite3.connect('neurolens.db')
+    rng = random.Random(0)
+    start = time.time() - n_rows * 1.5
+    batch = 100000
+    for offset in range(0, n_rows, batch):
+        conn.executemany(
+            'INSERT INTO emotion_logs (user_id, emotion, confidence, timestamp) VALUES (?, ?, ?, ?)',
+            ((USER_ID, rng.choice(EMOTIONS), rng.random(),
+              time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(start + i * 1.5)))
+             for i in range(offset, min(offset + batch, n_rows))))
+    conn.commit()
+    conn.close()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def export(scenario, batch_size):
+    """Run one export into a file like a client download would; returns (path, bytes written, rows)"""
+    import database as db
+    from emotion_privacy import EmotionPrivacy, gzip_chunks
+
+    privacy = EmotionPrivacy()
+    if scenario == 'legacy':
+        conn = sqlite3.connect('neurolens.db')
+        logs = conn.execute('SELECT emotion, confidence FROM emotion_logs WHERE user_id = ? ORDER BY timestamp DESC',
+                            (USER_ID,)).fetchall()
+        conn.close()
+        body = privacy.export_emotion_dna(USER_ID, logs)
+        return None, len(body.encode()), len(logs)
+
+    fmt = {'stream-json': 'json', 'binary': 'binary'}.get(scenario, 'ndjson')
+    rows = 0
+
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += len(batch)
+            yield batch
+
+    chunks = privacy.stream_emotion_dna(USER_ID, counted(db.iter_emotion_logs(USER_ID, batch_size)), fmt)
+    if scenario == 'ndjson+gzip':
+        chunks = gzip_chunks(chunks)
+    path = f"export.{scenario}"
+    written = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            written += f.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+    return path, written, rows
+
+
+def parse(scenario, path):
+    """Seconds to load the exported file back, or None when not applicable"""
+    if scenario not in ('stream-json', 'binary'):
+        return None
+    from mooddna_format import read_mooddna
+    start = time.perf_counter()
+    if scenario == 'binary':
+        read_mooddna(path)
+    else:
+        with open(path) as f:
+            json.load(f)
+    return round(time.perf_counter() - start, 2)
+
+
+def _child(scenario, batch_size, baseline, results):
+    start = time.perf_counter()
+    path, written, rows = export(scenario, batch_size)
+    seconds = time.perf_counter() - start
+    parse_seconds = parse(scenario, path)
+    if path:
+        os.remove(path)
+    results.put({
+        'scenario': scenario,
+        'rows': rows,
+        'seconds': round(seconds, 2),
+        'rows_per_second': round(rows / seconds) if seconds else 0,
+        'output_mb': round(written / 1e6, 1),
+        'parse_seconds': parse_seconds,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'rss_growth_mb': round(peak_rss_mb() - baseline, 1)
+    })
+
+
+def run_scenario(scenario, batch_size):
+    ctx = mp.get_context('fork')
+    results = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(scenario, batch_size, peak_rss_mb(), results))
+    proc.start()
+    row = results.get()
+    proc.join()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emotion DNA export benchmark")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch', type=int, default=5000, help="Rows per keyset batch")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    if sys.platform != 'linux':
+        print("⚠️  This benchmark needs fork() (Linux)")
+        return 1
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = tempfile.mkdtemp(prefix='neurolens-dna-')
+    os.chdir(workdir)
+
+    print("=" * 80)
+    print(f"📦 Building {args.rows:,}-row history in {workdir}")
+    start = time.perf_counter()
+    build_history(args.rows)
+    print(f"✓ Built in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize('neurolens.db') / 1e6:.0f} MB database)")
+    print("=" * 80)
+
+    rows = []
+    print(f"\n{'Scenario':<15} {'Rows':<10} {'Seconds':<9} {'Rows/s':<10} {'Output (MB)':<12} {'Parse (s)':<10} {'RSS growth (MB)':<15}")
+    print("─" * 86)
+    for scenario in args.scenarios:
+        row = run_scenario(scenario, args.batch)
+        rows.append(row)
+        print(f"{scenario:<15} {row['rows']:<10} {row['seconds']:<9} {row['rows_per_second']:<10} "
+              f"{row['output_mb']:<12} {str(row['parse_seconds'] or '-'):<10} {row['rss_growth_mb']:<15}")
+
+    if json_path:
+        os.makedirs(os.path.dirname(json_path) or '.', exist_ok=True)
+        with open(json_path, 'w') as f:
+            json.dump({'rows': args.rows, 'batch': args.batch, 'results': rows}, f, indent=2)
+        print(f"\n💾 Results saved to {json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Storage backend throughput benchmark (SQLite vs PostgreSQL)
+Runs the same workload through storage.py against each backend:
+
+    log_emotion    - db.log_emotion() per row (insert + daily rollup upsert), from --threads threads
+    bulk_insert    - storage.bulk_insert() (executemany on SQLite, COPY on PostgreSQL)
+    dashboard      - db.get_child_rollups() + first get_child_logs() page per parent
+    stream         - db.iter_emotion_logs() over one child's full history
+
+PostgreSQL runs against --postgres-url, or a throwaway initdb/pg_ctl cluster
+when those binaries and psycopg are available; otherwise it is skipped.
+
+Run: python bench_storage.py
+     python bench_storage.py --rows 500000 --threads 8 --json bench_output/storage.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+EMOTIONS = ['happy', 'sad', 'angry', 'neutral', 'surprise', 'fear', 'disgust']
+SCENARIOS = ['log_emotion', 'bulk_insert', 'dashboard', 'stream']
+PARENTS = 20
+CHILDREN_PER_PARENT = 3
+
+
+def reset(storage, url):
+    """Point storage at url and start from empty tables"""
+    storage.use(url)
+    if storage.is_postgres():
+        conn = storage.connect()
+        for table in storage.SCHEMA:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+        conn.commit()
+        conn.close()
+    import database as db
+    db.init_db()
+    storage.ensure_schema()
+    parents = []
+    for p in range(PARENTS):
+        parent = db.create_user(f'parent{p}', 'bench', 'parent', user_type='parent')
+        children = [db.create_user(f'child{p}_{c}', 'bench', 'child', parent_id=parent)
+                    for c in range(CHILDREN_PER_PARENT)]
+        parents.append((parent, children))
+    return parents
+
+
+def bench_log_emotion(db, children, rows, threads):
+    per_thread = max(rows // threads, 1)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            db.log_emotion(rng.choice(children), rng.choice(EMOTIONS), rng.random())
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return per_thread * threads, time.perf_counter() - start
+
+
+def bench_bulk_insert(storage, children, rows):
+    rng = random.Random(0)
+    now = time.time()
+    data = ((rng.choice(children), rng.choice(EMOTIONS), rng.random(),
+             time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now - (rows - i) * 1.5)))
+            for i in range(rows))
+    start = time.perf_counter()
+    count = storage.bulk_insert('emotion_logs', ('user_id', 'emotion', 'confidence', 'timestamp'), data)
+    return count, time.perf_counter() - start
+
+
+def bench_dashboard(db, parents, rounds=5):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for parent, _children in parents:
+            db.get_child_rollups(parent)
+            db.get_child_logs(parent, 'emotion_logs', limit=50)
+    return rounds * len(parents), time.perf_counter() - start
+
+
+def bench_stream(db, child):
+    start = time.perf_counter()
+    count = sum(len(batch) for batch in db.iter_emotion_logs(child))
+    return count, time.perf_counter() - start
+
+
+def run_backend(name, url, args):
+    import storage
+    import database as db
+
+    parents = reset(storage, url)
+    children = [child for _parent, kids in parents for child in kids]
+    results = []
+    for scenario in args.scenarios:
+        if scenario == 'log_emotion':
+            count, seconds = bench_log_emotion(db, children, args.inserts, args.threads)
+        elif scenario == 'bulk_insert':
+            count, seconds = bench_bulk_insert(storage, children, args.rows)
+        elif scenario == 'dashboard':
+            count, seconds = bench_dashboard(db, parents)
+        else:
+            count, seconds = bench_stream(db, children[0])
+        results.append({
+            'backend': name,
+            'scenario': scenario,
+            'operations': count,
+            'seconds': round(seconds, 3),
+            'per_second': round(count / seconds) if seconds else 0
+        })
+        row = results[-1]
+        print(f"{name:<10} {scenario:<13} {row['operations']:<12} {row['seconds']:<10} {row['per_second']:<12}")
+    storage.backend().close()
+    return results
+
+
+def postgres_target(args):
+    """(url, cleanup) for the PostgreSQL run, or (None, reason)"""
+    try:
+        import psycopg, psycopg_pool  # noqa: F401
+    except ImportError as e:
+        return None, f"psycopg not installed ({e})"
+    if args.postgres_url:
+        return args.postgres_url, None
+    from test_storage import local_postgres
+    cluster = local_postgres()
+    try:
+        return cluster.__enter__(), cluster
+    except Exception as e:
+        return None, f"no local PostgreSQL ({e})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage backend throughput benchmark")
+    parser.add_argument('--rows', type=int, default=200000, help="Rows for bulk_insert (and so for stream)")
+    parser.add_argument('--inserts', type=int, default=5000, help="Total log_emotion calls")
+    parser.add_argument('--threads', type=int, default=4, help="Threads calling log_emotion")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--postgres-url', help="Use this database instead of a throwaway pg_ctl cluster")
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = tempfile.mkdtemp(prefix='neurolens-storage-')
+    os.chdir(workdir)
+    os.environ.setdefault('NEUROLENS_PBKDF2_ITERATIONS', '1000')  # user setup only; not what's measured
+
+    print("=" * 80)
+    print(f"📦 Storage benchmark in {workdir}: {args.rows:,} bulk rows, "
+          f"{args.inserts:,} inserts on {args.threads} threads")
+    print("=" * 80)
+    print(f"\n{'Backend':<10} {'Scenario':<13} {'Operations':<12} {'Seconds':<10} {'Per second':<12}")
+    print("─" * 60)
+
+    results = run_backend('sqlite', f"sqlite:///{os.path.join(workdir, 'neurolens.db')}", args)
+    url, cleanup = postgres_target(args)
+    if url is None:
+        print(f"⚠️  PostgreSQL skipped: {cleanup}")
+    else:
+        try:
+            results += run_backend('postgres', url, args)
+        finally:
+            if cleanup is not None:
+                cleanup.__exit__(None, None, None)
+
+    if json_path:
+        os.makedirs(os.path.dirname(json_path) or '.', exist_ok=True)
+        with open(json_path, 'w') as f:
+            json.dump({'rows': args.rows, 'inserts': args.inserts, 'threads': args.threads,
+                       'results': results}, f, indent=2)
+        print(f"\n💾 Results saved to {json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+RSS-per-worker benchmark for shared model weights
+Forks 1, 4 and 8 workers per scenario and reports RSS/PSS per worker.
+
+    baseline  - every worker loads its own private copy (old behaviour)
+    mmap      - every worker memory-maps the same checkpoint (PyTorch)
+
+PSS (proportional set size) divides shared pages among the processes
+sharing them, so sum(PSS) is the real memory cost of the pool.
+
+Run: python bench_worker_rss.py
+     python bench_worker_rss.py --workers 1 4 8 --json bench_output/worker_rss.json
+"""
+
+import os
+import gc
+import sys
+import json
+import argparse
+import multiprocessing as mp
+
+from shared_weights import load_torch_model, worker_memory
+
+TORCH_MODELS = ["models/image_model.pth", "models/voice_model.pth"]
+
+
+def load_torch(mmap):
+    models = [load_torch_model(path, mmap=mmap) for path in TORCH_MODELS]
+    for m in models:
+        m.eval()
+    return models
+
+
+def infer_torch(models):
+    import torch
+    image_model = models[0]
+    with torch.no_grad():
+        image_model(torch.zeros(1, 3, 128, 128))
+
+
+SCENARIOS = ['baseline', 'mmap']
+
+
+def _worker(scenario, ready, results):
+    models = load_torch(scenario == 'mmap')
+    infer_torch(models)
+    gc.collect()
+    results.put(worker_memory())
+    ready.wait()
+
+
+def run_scenario(scenario, n_workers):
+    ctx = mp.get_context('fork')
+    ready = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(scenario, ready, results))
+             for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    # Measure while all workers are alive so shared pages are actually shared
+    samples = [results.get() for _ in procs]
+    ready.set()
+    for p in procs:
+        p.join()
+
+    rss = [s.get('rss', 0) for s in samples]
+    pss = [s.get('pss', 0) for s in samples]
+    return {
+        'scenario': scenario,
+        'workers': n_workers,
+        'rss_per_worker_mb': round(sum(rss) / len(rss), 1),
+        'pss_per_worker_mb': round(sum(pss) / len(pss), 1),
+        'total_pss_mb': round(sum(pss), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory benchmark")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    if sys.platform != 'linux':
+        print("⚠️  This benchmark needs fork() and /proc (Linux)")
+        return 1
+
+    rows = []
+    print(f"\n{'Scenario':<12} {'Workers':<9} {'RSS/worker (MB)':<17} {'PSS/worker (MB)':<17} {'Total PSS (MB)':<15}")
+    print("─" * 72)
+    for scenario in SCENARIOS:
+        for n in args.workers:
+            row = run_scenario(scenario, n)
+            rows.append(row)
+            print(f"{scenario:<12} {n:<9} {row['rss_per_worker_mb']:<17} {row['pss_per_worker_mb']:<17} {row['total_pss_mb']:<15}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or '.', exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({'results': rows}, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
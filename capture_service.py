@@ -0,0 +1,160 @@
+"""
+Background webcam capture + off-loop inference for the async (FastAPI) app
+
+The camera is opened once. A daemon thread keeps reading frames into a
+single-slot buffer (only the newest frame is kept; older ones are dropped
+instead of queueing up), so a request never pays device start-up and never
+sees a stale backlog. Inference runs on a small thread pool through
+run_in_executor, so async handlers never block the event loop.
+
+    capture = CaptureService(device=0)
+    capture.start()                                       # app startup
+    probs = await capture.run(predict_frame, frame)       # any blocking call, off-loop
+    async for frame, seq, ts in capture.frames(): ...     # each new frame once
+    capture.stop()                                        # app shutdown
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FrameGrabber:
+    """Daemon thread holding the newest camera frame in a single slot"""
+
+    def __init__(self, device=0, reopen_delay=1.0):
+        self.device = device
+        self.reopen_delay = reopen_delay
+        self._frame = None
+        self._seq = 0
+        self._timestamp = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._waiters = set()  # (loop, asyncio.Event) of async consumers, set on every new frame
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='frame-grabber', daemon=True)
+            self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None and not self._stop.is_set()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        import cv2
+
+        while not self._stop.is_set():
+            cap = cv2.VideoCapture(self.device)
+            if not cap.isOpened():
+                print(f"⚠️ Camera {self.device} unavailable, retrying in {self.reopen_delay}s")
+                cap.release()
+                self._stop.wait(self.reopen_delay)
+                continue
+            print(f"✅ Camera {self.device} opened")
+            try:
+                while not self._stop.is_set():
+                    # read() blocks until the driver delivers the next frame, pacing this loop
+                    ok, frame = cap.read()
+                    if not ok:
+                        print(f"⚠️ Camera {self.device} read failed, reopening")
+                        break
+                    with self._cond:
+                        self._frame = frame
+                        self._seq += 1
+                        self._timestamp = time.time()
+                        self._cond.notify_all()
+                    self._wake()
+            finally:
+                cap.release()
+            self._stop.wait(self.reopen_delay)
+
+    def _wake(self):
+        with self._cond:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                self.unsubscribe(loop, event)  # loop already closed
+
+    def subscribe(self, loop, event):
+        """Have `event` set (on `loop`) whenever a frame arrives or the grabber stops"""
+        with self._cond:
+            self._waiters.add((loop, event))
+
+    def unsubscribe(self, loop, event):
+        with self._cond:
+            self._waiters.discard((loop, event))
+
+    def latest(self):
+        """(frame, seq, timestamp) of the newest frame; frame is None before the first one"""
+        with self._cond:
+            return self._frame, self._seq, self._timestamp
+
+    def wait_newer(self, seq, timeout=1.0):
+        """Block until a frame newer than `seq` exists (or timeout); returns latest()"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq or self._stop.is_set(), timeout)
+            return self._frame, self._seq, self._timestamp
+
+
+class CaptureService:
+    def __init__(self, device=0, workers=2):
+        self.grabber = FrameGrabber(device)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+
+    def start(self):
+        self.grabber.start()
+        return self
+
+    def stop(self):
+        self.grabber.stop()
+        self.executor.shutdown(wait=False)
+
+    def latest(self):
+        return self.grabber.latest()
+
+    async def run(self, fn, *args):
+        """Run a blocking call on the inference pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def frames(self, min_interval=0.0, timeout=1.0):
+        """Yield (frame, seq, timestamp) for each new frame, at most one per `min_interval` seconds"""
+        seq = 0
+        loop = asyncio.get_running_loop()
+        # Waiting is an asyncio.Event the grabber sets from its thread: idle streams hold no threads
+        new_frame = asyncio.Event()
+        self.grabber.subscribe(loop, new_frame)
+        try:
+            while self.grabber.running:
+                started = loop.time()
+                new_frame.clear()
+                frame, new_seq, timestamp = self.grabber.latest()
+                if new_seq <= seq or frame is None:
+                    try:
+                        await asyncio.wait_for(new_frame.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                seq = new_seq
+                yield frame, seq, timestamp
+                remaining = min_interval - (loop.time() - started)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+        finally:
+            self.grabber.unsubscribe(loop, new_frame)
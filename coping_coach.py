@@ -1,9 +1,9 @@
-import sqlite3
+import storage
 from datetime import datetime
 import random
 
 class CopingCoach:
-    def __init__(self, db_path='neurolens.db'):
+    def __init__(self, db_path=None):
         self.db_path = db_path
         self._init_db()
         self.coping_actions = {
@@ -35,14 +35,7 @@ class CopingCoach:
         }
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS coping_actions
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
-                      emotion_before TEXT, coping_type TEXT, coping_title TEXT,
-                      emotion_after TEXT, created_at TEXT)''')
-        conn.commit()
-        conn.close()
+        storage.ensure_schema('coping_actions', path=self.db_path)
     
     def should_suggest(self, emotion):
         negative_emotions = ['sad', 'angry', 'fear', 'stressed', 'anxious']
@@ -53,7 +46,7 @@ class CopingCoach:
         return random.choice(actions)
     
     def log_action(self, user_id, emotion_before, coping_type, coping_title, emotion_after=''):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''INSERT INTO coping_actions 
                      (user_id, emotion_before, coping_type, coping_title, emotion_after, created_at)
@@ -63,7 +56,7 @@ class CopingCoach:
         conn.close()
     
     def get_history(self, user_id, limit=10):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''SELECT emotion_before, coping_title, emotion_after, created_at 
                      FROM coping_actions WHERE user_id=? 
@@ -1,89 +1,132 @@
-import sqlite3
-import hashlib
-from datetime import datetime
+from datetime import datetime, timedelta
+import heapq
+from itertools import islice
+
+import auth
+import storage
+
+# Called with a user id whenever a users row changes (e.g. to invalidate caches)
+USER_CHANGE_HOOKS = []
 
 def init_db():
-    conn = sqlite3.connect('neurolens.db')
-    c = conn.cursor()
-    
-    # Users table
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        role TEXT NOT NULL,
-        parent_id INTEGER,
-        user_type TEXT DEFAULT 'child',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )''')
-    
-    # Emotion logs table
-    c.execute('''CREATE TABLE IF NOT EXISTS emotion_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        emotion TEXT NOT NULL,
-        confidence REAL,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )''')
-    
-    # Chat logs table
-    c.execute('''CREATE TABLE IF NOT EXISTS chat_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        message TEXT NOT NULL,
-        response TEXT NOT NULL,
-        sentiment TEXT,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )''')
+    storage.ensure_schema('users', 'emotion_logs', 'chat_logs', 'emotion_daily', 'chat_daily')
+    if storage.is_postgres():
+        return
     
+    # One-time backfill of the rollups for SQLite databases created before they existed
+    conn = storage.connect()
+    c = conn.cursor()
+    if c.execute('SELECT 1 FROM emotion_daily LIMIT 1').fetchone() is None:
+        c.execute('''INSERT INTO emotion_daily (user_id, day, emotion, count, confidence_sum)
+                     SELECT user_id, date(timestamp), emotion, COUNT(*), COALESCE(SUM(confidence), 0)
+                     FROM emotion_logs GROUP BY user_id, date(timestamp), emotion''')
+    if c.execute('SELECT 1 FROM chat_daily LIMIT 1').fetchone() is None:
+        c.execute('''INSERT INTO chat_daily (user_id, day, sentiment, count)
+                     SELECT user_id, date(timestamp), COALESCE(sentiment, 'neutral'), COUNT(*)
+                     FROM chat_logs GROUP BY user_id, date(timestamp), COALESCE(sentiment, 'neutral')''')
     conn.commit()
     conn.close()
 
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return auth.hash_password(password)
 
 def create_user(username, password, role, parent_id=None, user_type='child'):
-    conn = sqlite3.connect('neurolens.db')
+    conn = storage.connect()
     c = conn.cursor()
     try:
-        c.execute('INSERT INTO users (username, password, role, parent_id, user_type) VALUES (?, ?, ?, ?, ?)',
+        c.execute('INSERT INTO users (username, password, role, parent_id, user_type) VALUES (?, ?, ?, ?, ?) RETURNING id',
                   (username, hash_password(password), role, parent_id, user_type))
+        user_id = c.fetchone()[0]
         conn.commit()
-        return c.lastrowid
-    except sqlite3.IntegrityError:
+        return user_id
+    except storage.backend().IntegrityError:
         return None
     finally:
         conn.close()
 
 def verify_user(username, password):
-    conn = sqlite3.connect('neurolens.db')
+    """(id, role, parent_id, user_type) when the password matches, else None.
+    Legacy SHA-256 hashes are upgraded to the current KDF on success."""
+    conn = storage.connect()
     c = conn.cursor()
-    c.execute('SELECT id, role, parent_id, user_type FROM users WHERE username = ? AND password = ?',
-              (username, hash_password(password)))
-    result = c.fetchone()
+    c.execute('SELECT id, role, parent_id, user_type, password FROM users WHERE username = ?', (username,))
+    row = c.fetchone()
+    if row is None:
+        conn.close()
+        # Unknown usernames take as long as wrong passwords
+        auth.verify_dummy(password)
+        return None
+    matches, needs_rehash = auth.verify_password(password, row[4])
+    if matches and needs_rehash:
+        c.execute('UPDATE users SET password = ? WHERE id = ?', (hash_password(password), row[0]))
+        conn.commit()
     conn.close()
-    return result
+    return row[:4] if matches else None
+
+def get_user(user_id):
+    """{'id', 'username', 'role', 'parent_id', 'user_type'} or None"""
+    conn = storage.connect()
+    c = conn.cursor()
+    c.execute('SELECT id, username, role, parent_id, user_type FROM users WHERE id = ?', (user_id,))
+    row = c.fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return dict(zip(('id', 'username', 'role', 'parent_id', 'user_type'), row))
+
+def update_user(user_id, role=None, parent_id=None, user_type=None):
+    fields = {'role': role, 'parent_id': parent_id, 'user_type': user_type}
+    fields = {k: v for k, v in fields.items() if v is not None}
+    if not fields:
+        return False
+    conn = storage.connect()
+    c = conn.cursor()
+    c.execute(f"UPDATE users SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+              (*fields.values(), user_id))
+    conn.commit()
+    changed = c.rowcount > 0
+    conn.close()
+    for hook in USER_CHANGE_HOOKS:
+        hook(user_id)
+    return changed
 
 def log_emotion(user_id, emotion, confidence):
-    conn = sqlite3.connect('neurolens.db')
+    conn = storage.connect()
     c = conn.cursor()
     c.execute('INSERT INTO emotion_logs (user_id, emotion, confidence) VALUES (?, ?, ?)',
               (user_id, emotion, confidence))
+    c.execute('''INSERT INTO emotion_daily (user_id, day, emotion, count, confidence_sum)
+                 VALUES (?, ?, ?, 1, ?)
+                 ON CONFLICT (user_id, day, emotion)
+                 DO UPDATE SET count = emotion_daily.count + 1,
+                               confidence_sum = emotion_daily.confidence_sum + excluded.confidence_sum''',
+              (user_id, storage.today(), emotion, confidence or 0))
     conn.commit()
     conn.close()
 
+def get_latest_emotion(user_id):
+    """(id, emotion, confidence, timestamp) of the user's newest emotion log, or None"""
+    conn = storage.connect()
+    c = conn.cursor()
+    c.execute('''SELECT id, emotion, confidence, timestamp FROM emotion_logs
+                 WHERE user_id = ? ORDER BY id DESC LIMIT 1''', (user_id,))
+    result = c.fetchone()
+    conn.close()
+    return result
+
 def log_chat(user_id, message, response, sentiment):
-    conn = sqlite3.connect('neurolens.db')
+    conn = storage.connect()
     c = conn.cursor()
     c.execute('INSERT INTO chat_logs (user_id, message, response, sentiment) VALUES (?, ?, ?, ?)',
               (user_id, message, response, sentiment))
+    c.execute('''INSERT INTO chat_daily (user_id, day, sentiment, count) VALUES (?, ?, ?, 1)
+                 ON CONFLICT (user_id, day, sentiment) DO UPDATE SET count = chat_daily.count + 1''',
+              (user_id, storage.today(), sentiment or 'neutral'))
     conn.commit()
     conn.close()
 
 def get_child_emotions(parent_id):
-    conn = sqlite3.connect('neurolens.db')
+    conn = storage.connect()
     c = conn.cursor()
     c.execute('''SELECT u.username, e.emotion, e.confidence, e.timestamp 
                  FROM emotion_logs e 
@@ -95,7 +138,7 @@ def get_child_emotions(parent_id):
     return results
 
 def get_child_chats(parent_id):
-    conn = sqlite3.connect('neurolens.db')
+    conn = storage.connect()
     c = conn.cursor()
     c.execute('''SELECT u.username, c.message, c.response, c.sentiment, c.timestamp 
                  FROM chat_logs c 
@@ -107,11 +150,93 @@ def get_child_chats(parent_id):
     return results
 
 def get_children(parent_id):
-    conn = sqlite3.connect('neurolens.db')
+    conn = storage.connect()
     c = conn.cursor()
     c.execute('SELECT id, username FROM users WHERE parent_id = ?', (parent_id,))
     results = c.fetchall()
     conn.close()
     return results
 
+# --- Parent dashboard API ---
+NEGATIVE_EMOTIONS = ('angry', 'sad', 'fear', 'disgust')
+LOG_TABLES = {
+    # table -> columns returned by get_child_logs (previews only; no chatbot responses)
+    'emotion_logs': 'l.id, l.user_id, u.username, l.emotion, l.confidence, l.timestamp',
+    'chat_logs': 'l.id, l.user_id, u.username, substr(l.message, 1, 200), l.sentiment, l.timestamp'
+}
+
+def get_child_rollups(parent_id, days=14):
+    """Per-day emotion and chat counts of every child over the last `days` days (bounded rows)"""
+    conn = storage.connect()
+    c = conn.cursor()
+    since = (datetime.utcnow() - timedelta(days=int(days) - 1)).strftime('%Y-%m-%d')
+    c.execute('''SELECT d.user_id, d.day, d.emotion, d.count, d.confidence_sum
+                 FROM emotion_daily d JOIN users u ON d.user_id = u.id
+                 WHERE u.parent_id = ? AND d.day >= ?''', (parent_id, since))
+    emotions = c.fetchall()
+    c.execute('''SELECT d.user_id, d.day, d.sentiment, d.count
+                 FROM chat_daily d JOIN users u ON d.user_id = u.id
+                 WHERE u.parent_id = ? AND d.day >= ?''', (parent_id, since))
+    chats = c.fetchall()
+    # Latest log per child: one index seek each on (user_id, id)
+    c.execute('''SELECT u.id,
+                        (SELECT MAX(id) FROM emotion_logs WHERE user_id = u.id),
+                        (SELECT timestamp FROM emotion_logs WHERE user_id = u.id ORDER BY id DESC LIMIT 1),
+                        (SELECT MAX(id) FROM chat_logs WHERE user_id = u.id)
+                 FROM users u WHERE u.parent_id = ?''', (parent_id,))
+    latest = c.fetchall()
+    conn.close()
+    return emotions, chats, latest
+
+def get_child_logs(parent_id, table, child_id=None, before=None, since=None, limit=50):
+    """Keyset page of raw rows for the parent's children.
+
+    before=<id>: older rows, newest first (scrolling back)
+    since=<id>:  rows newer than the cursor, oldest first (delta sync)
+
+    Without child_id each child gets its own (user_id, id) index seek of at
+    most `limit` rows and the pages are merged here, so the database never
+    sorts all of the children's rows together.
+    """
+    conn = storage.connect()
+    c = conn.cursor()
+    if child_id is not None:
+        children = [child_id]
+    else:
+        c.execute('SELECT id FROM users WHERE parent_id = ?', (parent_id,))
+        children = [row[0] for row in c.fetchall()]
+    query = f'''SELECT {LOG_TABLES[table]} FROM {table} l JOIN users u ON l.user_id = u.id
+                WHERE u.parent_id = ? AND l.user_id = ?'''
+    if since is not None:
+        query += ' AND l.id > ? ORDER BY l.id ASC LIMIT ?'
+    elif before is not None:
+        query += ' AND l.id < ? ORDER BY l.id DESC LIMIT ?'
+    else:
+        query += ' ORDER BY l.id DESC LIMIT ?'
+    pages = []
+    for child in children:
+        params = [parent_id, child]
+        if since is not None or before is not None:
+            params.append(since if since is not None else before)
+        c.execute(query, params + [limit])
+        pages.append(c.fetchall())
+    conn.close()
+    if len(pages) == 1:
+        return pages[0]
+    merged = heapq.merge(*pages, key=lambda row: row[0], reverse=since is None)
+    return list(islice(merged, limit))
+
+def iter_emotion_logs(user_id, batch_size=5000):
+    """Yield the user's full emotion history (archived partitions included) as
+    lists of (id, emotion, confidence, timestamp), one keyset query per batch
+    so memory stays bounded and no read transaction stays open between batches"""
+    if storage.is_postgres():
+        # No monthly files on PostgreSQL; one server-side cursor over the table
+        yield from storage.stream('SELECT id, emotion, confidence, timestamp FROM emotion_logs '
+                                  'WHERE user_id = ? ORDER BY id', (user_id,), batch_size)
+        return
+    import emotion_partitions
+    yield from emotion_partitions.iter_rows('emotion_logs', user_id, ('id', 'emotion', 'confidence', 'timestamp'),
+                                            batch_size, db_path=storage.backend().path)
+
 init_db()
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Frozen-backbone embedding cache for transfer-learning phase one
+
+While the backbone is frozen its output for a given (image, augmentation)
+never changes, so it is computed once per augmentation pass and stored
+in a memory-mapped .npy file. The classification head is then trained
+directly on the cached embeddings: an epoch is a few matrix multiplies
+instead of a full 300x300 EfficientNet forward pass per image.
+
+Pass 0 holds the un-augmented images, passes 1..N-1 one seeded
+augmentation each; every training sample draws a random pass per epoch.
+
+    features, head, model = split_transfer_model(base_model, head_layers)
+    train_cache = EmbeddingCache.build(features, train_dir, img_size, subset='training',
+                                       validation_split=0.2, augment=AUGMENT, passes=5)
+    head.fit(train_cache.dataset(64), validation_data=val_cache.dataset(64, shuffle=False), ...)
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+from image_pipeline import flow_from_directory, list_image_files
+
+CACHE_DIR = 'data/embedding_cache'
+
+
+def split_transfer_model(base_model, head_layers):
+    """(feature_model, head, full_model) sharing one set of head weights.
+
+    feature_model: backbone + global average pooling (what gets cached)
+    head: the layers after pooling, as a standalone model on the embedding
+    full_model: feature_model -> head, the model that is saved and fine-tuned
+    """
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import GlobalAveragePooling2D, Input
+
+    pooled = GlobalAveragePooling2D()(base_model.output)
+    feature_model = Model(base_model.input, pooled, name='features')
+
+    embedding = Input(shape=pooled.shape[1:], name='embedding')
+    x = embedding
+    for layer in head_layers:
+        x = layer(x)
+    head = Model(embedding, x, name='head')
+
+    full_model = Model(base_model.input, head(pooled))
+    return feature_model, head, full_model
+
+
+def _fingerprint(feature_model, paths, target_size, color_mode, augment, passes):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([feature_model.name, int(feature_model.count_params()),
+                              list(target_size), color_mode, augment, passes],
+                             sort_keys=True, default=str).encode())
+    for path in paths:
+        digest.update(path.encode())
+        digest.update(str(os.path.getmtime(path)).encode())
+    return digest.hexdigest()[:16]
+
+
+class EmbeddingCache:
+    def __init__(self, cache_path):
+        with open(os.path.join(cache_path, 'manifest.json'), 'r') as f:
+            self.manifest = json.load(f)
+        self.path = cache_path
+        self.class_indices = self.manifest['class_indices']
+        self.num_classes = len(self.class_indices)
+        self.embeddings = np.load(os.path.join(cache_path, 'embeddings.npy'), mmap_mode='r')
+        self.labels = np.load(os.path.join(cache_path, 'labels.npy'))
+        self.passes, self.samples, self.dim = self.embeddings.shape
+
+    @classmethod
+    def build(cls, feature_model, directory, target_size, subset=None, validation_split=0.0,
+              color_mode='rgb', augment=None, passes=1, batch_size=32, cache_dir=CACHE_DIR):
+        """Open the cache for this dataset/backbone/augmentation, computing it on first use"""
+        paths, labels, class_indices = list_image_files(directory, validation_split, subset)
+        passes = passes if augment else 1
+        key = _fingerprint(feature_model, paths, target_size, color_mode, augment, passes)
+        cache_path = os.path.join(cache_dir, f"{subset or 'all'}_{key}")
+        if os.path.exists(os.path.join(cache_path, 'manifest.json')):
+            print(f"✓ Using cached embeddings: {cache_path}")
+            return cls(cache_path)
+
+        os.makedirs(cache_path, exist_ok=True)
+        dim = int(feature_model.output_shape[-1])
+        tmp_path = os.path.join(cache_path, 'embeddings.tmp.npy')
+        embeddings = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float16,
+                                               shape=(passes, len(paths), dim))
+        for p in range(passes):
+            print(f"Computing embeddings, pass {p + 1}/{passes} ({len(paths)} images)...")
+            # Unshuffled so row i is always image i; seed p makes each pass reproducible
+            flow = flow_from_directory(directory, target_size=target_size, batch_size=batch_size,
+                                       subset=subset, validation_split=validation_split,
+                                       color_mode=color_mode, augment=augment if p else None,
+                                       cache=None, shuffle=False, seed=p)
+            offset = 0
+            for x, _ in flow.dataset:
+                batch = feature_model(x, training=False).numpy()
+                embeddings[p, offset:offset + len(batch)] = batch
+                offset += len(batch)
+        embeddings.flush()
+        del embeddings
+        os.replace(tmp_path, os.path.join(cache_path, 'embeddings.npy'))
+        np.save(os.path.join(cache_path, 'labels.npy'), np.asarray(labels, dtype=np.int32))
+
+        # Written last: a cache without a manifest is incomplete and gets rebuilt
+        manifest = {
+            'backbone': feature_model.name,
+            'directory': directory,
+            'subset': subset,
+            'target_size': list(target_size),
+            'color_mode': color_mode,
+            'augment': augment,
+            'passes': passes,
+            'samples': len(paths),
+            'dim': dim,
+            'class_indices': class_indices
+        }
+        with open(os.path.join(cache_path, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        print(f"✓ Embeddings cached: {cache_path}")
+        return cls(cache_path)
+
+    def batches(self, batch_size=64, shuffle=True, seed=None):
+        """One epoch of (embeddings, one-hot labels); each sample uses a random augmentation pass"""
+        rng = np.random.default_rng(seed)
+        eye = np.eye(self.num_classes, dtype=np.float32)
+        order = rng.permutation(self.samples) if shuffle else np.arange(self.samples)
+        for start in range(0, self.samples, batch_size):
+            # Sorted indices turn the memmap gather into mostly sequential reads
+            idx = np.sort(order[start:start + batch_size])
+            passes = rng.integers(self.passes, size=len(idx)) if shuffle else np.zeros(len(idx), dtype=int)
+            yield self.embeddings[passes, idx].astype(np.float32), eye[self.labels[idx]]
+
+    def dataset(self, batch_size=64, shuffle=True, seed=None):
+        """tf.data view over batches(); re-iterated (and reshuffled) every epoch"""
+        import tensorflow as tf
+
+        dataset = tf.data.Dataset.from_generator(
+            lambda: self.batches(batch_size, shuffle, seed),
+            output_signature=(
+                tf.TensorSpec(shape=(None, self.dim), dtype=tf.float32),
+                tf.TensorSpec(shape=(None, self.num_classes), dtype=tf.float32)
+            )
+        )
+        return dataset.prefetch(tf.data.AUTOTUNE)
@@ -1,10 +1,10 @@
-import sqlite3
+import storage
 from datetime import datetime, date
 import uuid
 import base64
 
 class EmotionAnchors:
-    def __init__(self, db_path='neurolens.db'):
+    def __init__(self, db_path=None):
         self.db_path = db_path
         self._init_db()
         self.color_map = {
@@ -18,18 +18,11 @@ class EmotionAnchors:
         }
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS emotion_anchors
-                     (id TEXT PRIMARY KEY, user_id INTEGER, emotion TEXT, 
-                      color TEXT, image_data TEXT, note TEXT, 
-                      confidence REAL, created_at TEXT, capture_date TEXT)''')
-        conn.commit()
-        conn.close()
+        storage.ensure_schema('emotion_anchors', path=self.db_path)
     
     def can_create_anchor_today(self, user_id):
         today = date.today().isoformat()
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''SELECT COUNT(*) FROM emotion_anchors 
                      WHERE user_id=? AND capture_date=?''', (user_id, today))
@@ -46,7 +39,7 @@ class EmotionAnchors:
         created_at = datetime.now().isoformat()
         capture_date = date.today().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''INSERT INTO emotion_anchors 
                      (id, user_id, emotion, color, image_data, note, confidence, created_at, capture_date)
@@ -58,7 +51,7 @@ class EmotionAnchors:
         return {'id': anchor_id, 'emotion': emotion, 'color': color, 'success': True}
     
     def get_anchors(self, user_id, limit=100):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''SELECT id, emotion, color, note, created_at, capture_date 
                      FROM emotion_anchors WHERE user_id=? 
@@ -71,7 +64,7 @@ class EmotionAnchors:
     
     def get_daily_count(self, user_id):
         today = date.today().isoformat()
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''SELECT COUNT(*) FROM emotion_anchors 
                      WHERE user_id=? AND capture_date=?''', (user_id, today))
@@ -80,7 +73,7 @@ class EmotionAnchors:
         return count
     
     def get_anchor(self, anchor_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''SELECT emotion, color, image_data, note, created_at, capture_date 
                      FROM emotion_anchors WHERE id=?''', (anchor_id,))
@@ -99,7 +92,7 @@ class EmotionAnchors:
         return None
     
     def update_anchor_note(self, anchor_id, note):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''UPDATE emotion_anchors SET note=? WHERE id=?''', (note, anchor_id))
         conn.commit()
@@ -107,7 +100,7 @@ class EmotionAnchors:
         return {'success': True}
     
     def get_random_positive_anchor(self, user_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''SELECT id, emotion, color, note 
                      FROM emotion_anchors WHERE user_id=? 
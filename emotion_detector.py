@@ -1,54 +1,111 @@
 import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
-import json
-import os
+import gc
+import threading
+from model_registry import ModelRegistry
 
 class EmotionDetector:
-    def __init__(self):
+    def __init__(self, registry=None, version=None):
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.model = None
         self.emotions = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprised', 'neutral']
-        self.class_indices = {}
-        
-        # Try to load the trained model
-        model_paths = [
-            'checkpoints/best_emotion_model.h5',
-            'checkpoints/emotion_model.h5', 
-            'checkpoints/best_image_model.h5',
-            'emotion_model.h5'
-        ]
-        
-        for model_path in model_paths:
-            if os.path.exists(model_path):
-                try:
-                    self.model = load_model(model_path)
-                    print(f"✅ Emotion model loaded from: {model_path}")
-                    
-                    # Load class indices if available
-                    class_indices_path = 'checkpoints/class_indices.json'
-                    if os.path.exists(class_indices_path):
-                        with open(class_indices_path, 'r') as f:
-                            self.class_indices = json.load(f)
-                        # Reverse mapping for prediction
-                        self.idx_to_emotion = {v: k for k, v in self.class_indices.items()}
-                        print(f"✅ Class indices loaded: {self.class_indices}")
-                    else:
-                        # Use default mapping
-                        self.idx_to_emotion = {i: emotion for i, emotion in enumerate(self.emotions)}
-                    break
-                except Exception as e:
-                    print(f"Failed to load {model_path}: {e}")
-                    continue
+        self.registry = registry or ModelRegistry()
+        self.pinned_version = version
+        
+        # (model, idx_to_emotion, version, input_size) - swapped as one reference
+        # so a request never pairs one model with another model's label map
+        self._active = None
+        self._swap_lock = threading.Lock()
+        self._watcher = None
+        self._watch_stop = threading.Event()
+        
+        self.reload()
         
         if self.model is None:
             print("⚠️ No trained model found. Using pattern-based detection.")
-            self.idx_to_emotion = {i: emotion for i, emotion in enumerate(self.emotions)}
     
-    def preprocess_face(self, face_img):
+    @property
+    def model(self):
+        active = self._active
+        return active[0] if active else None
+    
+    @property
+    def idx_to_emotion(self):
+        active = self._active
+        if active:
+            return active[1]
+        return {i: emotion for i, emotion in enumerate(self.emotions)}
+    
+    @property
+    def model_version(self):
+        active = self._active
+        return active[2] if active else None
+    
+    def _load_entry(self, entry):
+        """Load and warm up a registry entry without touching the active model"""
+        from tensorflow.keras.models import load_model
+        # Inference only: skips restoring optimizer state and custom training losses
+        model = load_model(entry['path'], compile=False)
+        
+        class_indices = entry.get('class_indices')
+        if class_indices:
+            # Reverse mapping for prediction
+            idx_to_emotion = {v: k for k, v in class_indices.items()}
+            print(f"✅ Class indices loaded: {class_indices}")
+        else:
+            # Use default mapping
+            idx_to_emotion = {i: emotion for i, emotion in enumerate(self.emotions)}
+        
+        # Warm-up inference so the first real request doesn't pay graph tracing
+        input_shape = entry.get('input_shape') or model.input_shape[1:]
+        predict_heads(model, np.zeros((1, *input_shape), dtype='float32'))
+        
+        return model, idx_to_emotion, entry['version'], tuple(input_shape[:2])
+    
+    def reload(self):
+        """Swap to the registry's current version if it changed. Returns True on swap."""
+        with self._swap_lock:
+            entry = self.registry.resolve(self.pinned_version)
+            if entry is None or entry['version'] == self.model_version:
+                return False
+            
+            try:
+                new_active = self._load_entry(entry)
+            except Exception as e:
+                print(f"Failed to load {entry['path']}: {e}")
+                return False
+            
+            # In-flight requests keep their own reference to the old tuple;
+            # it is freed as soon as they finish.
+            old_active, self._active = self._active, new_active
+            del old_active
+            gc.collect()
+            print(f"✅ Emotion model loaded from: {entry['path']} ({entry['version']})")
+            return True
+    
+    def start_watcher(self, interval=5.0):
+        """Poll the registry manifest and hot-swap in the background"""
+        if self._watcher is not None:
+            return self._watcher
+        
+        def watch():
+            last_seen = self.registry.manifest_mtime()
+            while not self._watch_stop.wait(interval):
+                mtime = self.registry.manifest_mtime()
+                if mtime != last_seen:
+                    last_seen = mtime
+                    self.reload()
+        
+        self._watcher = threading.Thread(target=watch, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+    
+    def stop_watcher(self):
+        self._watch_stop.set()
+    
+    def preprocess_face(self, face_img, size=(48, 48)):
         """Preprocess face image for emotion detection"""
-        # Resize to 48x48 (standard for emotion detection)
-        face_img = cv2.resize(face_img, (48, 48))
+        # Resize to the model input (48x48 is standard for emotion detection)
+        face_img = cv2.resize(face_img, (size[1], size[0]))
         
         # Ensure grayscale
         if len(face_img.shape) == 3:
@@ -77,44 +134,38 @@ class EmotionDetector:
         
         emotions_detected = []
         
-        for (x, y, w, h) in faces:
-            # Extract face region
-            roi_gray = gray[y:y+h, x:x+w]
-            
-            if self.model:
-                try:
-                    # Preprocess face
-                    processed_face = self.preprocess_face(roi_gray)
-                    
-                    # Predict emotion
-                    prediction = self.model.predict(processed_face, verbose=0)
-                    emotion_idx = np.argmax(prediction[0])
-                    confidence = float(prediction[0][emotion_idx])
-                    
-                    # Map index to emotion name
-                    emotion = self.idx_to_emotion.get(emotion_idx, 'neutral')
-                    
-                    emotions_detected.append({
-                        'emotion': emotion,
-                        'confidence': confidence,
-                        'bbox': [int(x), int(y), int(w), int(h)]
-                    })
-                    
-                except Exception as e:
-                    print(f"Prediction error: {e}")
-                    # Fallback to pattern-based detection
-                    emotion = self.pattern_based_detection(roi_gray)
-                    emotions_detected.append({
-                        'emotion': emotion,
-                        'confidence': 0.7,
-                        'bbox': [int(x), int(y), int(w), int(h)]
-                    })
+        # Pin the active model for the whole frame; a hot swap mid-frame
+        # only affects the next call.
+        active = self._active
+        model, idx_to_emotion, _, input_size = active if active else (None, None, None, None)
+        
+        rois = [gray[y:y+h, x:x+w] for (x, y, w, h) in faces]
+        probabilities = None
+        if model and rois:
+            try:
+                # One forward pass for every face (and every head) in the frame
+                batch = np.concatenate([self.preprocess_face(roi, input_size) for roi in rois])
+                labels = [idx_to_emotion.get(i, str(i)) for i in range(len(idx_to_emotion))]
+                probabilities = combine_heads(predict_heads(model, batch), labels)
+            except Exception as e:
+                print(f"Prediction error: {e}")
+        
+        for n, (x, y, w, h) in enumerate(faces):
+            if probabilities is not None:
+                probs = probabilities[n]
+                emotion_idx = int(np.argmax(probs))
+                emotions_detected.append({
+                    'emotion': idx_to_emotion.get(emotion_idx, 'neutral'),
+                    'confidence': float(probs[emotion_idx]),
+                    'all_emotions': {idx_to_emotion.get(i, str(i)): round(float(p) * 100, 2)
+                                     for i, p in enumerate(probs)},
+                    'bbox': [int(x), int(y), int(w), int(h)]
+                })
             else:
-                # Pattern-based fallback detection
-                emotion = self.pattern_based_detection(roi_gray)
+                # Pattern-based fallback detection (no model, or the model call failed)
                 emotions_detected.append({
-                    'emotion': emotion,
-                    'confidence': 0.6,
+                    'emotion': self.pattern_based_detection(rois[n]),
+                    'confidence': 0.7 if model else 0.6,
                     'bbox': [int(x), int(y), int(w), int(h)]
                 })
         
@@ -122,59 +173,103 @@ class EmotionDetector:
     
     def pattern_based_detection(self, face_roi):
         """Simple pattern-based emotion detection as fallback"""
-        h, w = face_roi.shape
-        
-        # Analyze different face regions
-        mouth_region = face_roi[int(h*0.6):int(h*0.9), int(w*0.3):int(w*0.7)]
-        eye_region = face_roi[int(h*0.2):int(h*0.5), int(w*0.2):int(w*0.8)]
-        
-        # Simple intensity analysis
-        mouth_intensity = np.mean(mouth_region)
-        eye_intensity = np.mean(eye_region)
-        
-        # Basic emotion classification based on intensity patterns
-        if mouth_intensity > 120:
-            return 'happy'
-        elif mouth_intensity < 80:
-            return 'sad'
-        elif eye_intensity < 90:
-            return 'angry'
-        elif np.std(face_roi) > 50:
-            return 'surprised'
-        else:
-            return 'neutral'
+        return pattern_based_detection(face_roi)
 
-# Flask API for real-time detection
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import base64
 
-app = Flask(__name__)
-CORS(app)
-detector = EmotionDetector()
+def predict_heads(model, batch):
+    """{head name: (N, k) probabilities}; single-output models come back as {'emotion': ...}"""
+    outputs = model(batch, training=False)
+    if isinstance(outputs, dict):
+        return {name: np.asarray(value) for name, value in outputs.items()}
+    if isinstance(outputs, (list, tuple)):
+        return {name: np.asarray(value) for name, value in zip(model.output_names, outputs)}
+    return {'emotion': np.asarray(outputs)}
+
+
+def combine_heads(outputs, labels):
+    """Fold the specialist heads of a multi-head model into the 7-way distribution.
+
+    sad_vs_angry decides how the emotion head's angry+sad mass is split;
+    happy is averaged with the emotion head's happy probability and the
+    other emotions are rescaled so each row still sums to 1.
+    """
+    probs = np.array(outputs['emotion'], dtype='float32')
+    if 'sad_vs_angry' in outputs and 'angry' in labels and 'sad' in labels:
+        angry, sad = labels.index('angry'), labels.index('sad')
+        split = outputs['sad_vs_angry']
+        mass = probs[:, angry] + probs[:, sad]
+        probs[:, angry] = mass * split[:, 0]
+        probs[:, sad] = mass * split[:, 1]
+    if 'happy' in outputs and 'happy' in labels:
+        happy = labels.index('happy')
+        target = 0.5 * (probs[:, happy] + outputs['happy'][:, 0])
+        rest = 1.0 - probs[:, happy]
+        scale = np.divide(1.0 - target, rest, out=np.zeros_like(rest), where=rest > 1e-7)
+        probs *= scale[:, None]
+        probs[:, happy] = target
+    return probs
+
+
+def pattern_based_detection(face_roi):
+    """Simple pattern-based emotion detection as fallback (no model needed)"""
+    h, w = face_roi.shape
+    
+    # Analyze different face regions
+    mouth_region = face_roi[int(h*0.6):int(h*0.9), int(w*0.3):int(w*0.7)]
+    eye_region = face_roi[int(h*0.2):int(h*0.5), int(w*0.2):int(w*0.8)]
+    
+    # Simple intensity analysis
+    mouth_intensity = np.mean(mouth_region)
+    eye_intensity = np.mean(eye_region)
+    
+    # Basic emotion classification based on intensity patterns
+    if mouth_intensity > 120:
+        return 'happy'
+    elif mouth_intensity < 80:
+        return 'sad'
+    elif eye_intensity < 90:
+        return 'angry'
+    elif np.std(face_roi) > 50:
+        return 'surprised'
+    else:
+        return 'neutral'
 
-@app.route('/detect_emotion', methods=['POST'])
-def detect_emotion_api():
-    try:
-        data = request.json
-        image_data = data['image'].split(',')[1]
-        image_bytes = base64.b64decode(image_data)
-        
-        # Convert to OpenCV format
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        # Detect emotions
-        emotions = detector.detect_emotion(frame)
-        
-        return jsonify({
-            'success': True,
-            'emotions': emotions,
-            'dominant_emotion': emotions[0]['emotion'] if emotions else 'neutral'
-        })
-    
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+# Flask API for real-time detection
+def create_app(detector=None):
+    from flask import Flask, request, jsonify
+    from flask_cors import CORS
+    import base64
+    
+    app = Flask(__name__)
+    CORS(app)
+    if detector is None:
+        detector = EmotionDetector()
+        detector.start_watcher()
+    
+    @app.route('/detect_emotion', methods=['POST'])
+    def detect_emotion_api():
+        try:
+            data = request.json
+            image_data = data['image'].split(',')[1]
+            image_bytes = base64.b64decode(image_data)
+            
+            # Convert to OpenCV format
+            nparr = np.frombuffer(image_bytes, np.uint8)
+            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            
+            # Detect emotions
+            emotions = detector.detect_emotion(frame)
+            
+            return jsonify({
+                'success': True,
+                'emotions': emotions,
+                'dominant_emotion': emotions[0]['emotion'] if emotions else 'neutral'
+            })
+        
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)})
+    
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    create_app().run(debug=True, port=5000)
@@ -1,16 +1,15 @@
-import sqlite3
-from datetime import datetime, timedelta
+import storage
 from collections import Counter
 import statistics
 
 class EmotionForecast:
-    def __init__(self, db_path='neurolens.db'):
+    def __init__(self, db_path=None):
         self.db_path = db_path
     
     def get_emotion_logs(self, user_id, days=7):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
-        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        cutoff = storage.ago(days=days)
         c.execute('SELECT emotion, timestamp FROM emotion_logs WHERE user_id=? AND timestamp > ? ORDER BY timestamp',
                   (user_id, cutoff))
         logs = c.fetchall()
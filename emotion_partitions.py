@@ -0,0 +1,331 @@
+"""
+Time-partitioned log storage: hot table in the main DB, monthly archive files
+
+Every analytics query reads at most the last 14 days, so the main
+neurolens.db only keeps the hot window of emotion_logs / chat_logs. The
+compaction job moves older rows into one SQLite file per month
+
+    data/partitions/<table>/<YYYY-MM>.db      (NEUROLENS_PARTITION_DIR)
+
+and ages each partition through the table's retention policy:
+
+    hot_days   rows older than this leave the main DB for their month's file
+    raw_days   months that ended before this keep only per-hour aggregates
+               (<table>_hourly: user, hour, label, count, value sum); the raw
+               rows are deleted and the file is VACUUMed
+    keep_days  months that ended before this are deleted, and so are the
+               main DB's daily rollups for those days
+
+Hot queries need no changes: they keep reading the main table, which now
+stays small. Full-history readers (the Emotion DNA export) use iter_rows(),
+which walks the archived raw partitions and then the main table in id order.
+
+Run from cron, e.g. nightly:
+
+    python emotion_partitions.py compact [--dry-run] [--vacuum-main]
+    python emotion_partitions.py status
+
+SQLite only: on PostgreSQL (storage.py) use declarative range partitioning
+of the log tables instead.
+"""
+
+import os
+import sys
+import glob
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+DB_PATH = 'neurolens.db'
+PARTITION_DIR = os.environ.get('NEUROLENS_PARTITION_DIR', 'data/partitions')
+MOVE_CHUNK = 10000
+
+# Per-table retention policy and how its rows fold into hourly aggregates
+RETENTION = {
+    'emotion_logs': {
+        'columns': ('id', 'user_id', 'emotion', 'confidence', 'timestamp'),
+        'label': 'emotion',
+        'value': 'confidence',
+        'rollup': ('emotion_daily', 'day'),
+        'hot_days': 31,
+        'raw_days': 180,
+        'keep_days': 730
+    },
+    'chat_logs': {
+        'columns': ('id', 'user_id', 'message', 'response', 'sentiment', 'timestamp'),
+        'label': 'sentiment',
+        'value': None,
+        'rollup': ('chat_daily', 'day'),
+        'hot_days': 31,
+        'raw_days': 90,
+        'keep_days': 365
+    }
+}
+
+
+def _utcnow():
+    return datetime.utcnow()
+
+
+def _month_end(month):
+    """First instant after the 'YYYY-MM' month"""
+    year, number = map(int, month.split('-'))
+    return datetime(year + number // 12, number % 12 + 1, 1)
+
+
+def partition_path(table, month):
+    return os.path.join(PARTITION_DIR, table, f"{month}.db")
+
+
+def partitions(table):
+    """[(month, path)] of the table's archive files, oldest first"""
+    paths = sorted(glob.glob(os.path.join(PARTITION_DIR, table, '????-??.db')))
+    return [(os.path.basename(path)[:-3], path) for path in paths]
+
+
+def _partition_state(path):
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT value FROM partition_meta WHERE key = 'state'").fetchone()
+        return row[0] if row else 'raw'
+    except sqlite3.OperationalError:
+        return 'raw'
+    finally:
+        conn.close()
+
+
+def _ensure_partition(conn, table, month):
+    """Attach (creating if needed) the month's archive file as schema 'part'"""
+    spec = RETENTION[table]
+    path = partition_path(table, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn.execute('ATTACH DATABASE ? AS part', (path,))
+    # Same column definitions as the main table (incl. the id, so ids stay unique across partitions)
+    create = conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                          (table,)).fetchone()[0]
+    conn.execute(create.replace(f'CREATE TABLE {table}', f'CREATE TABLE IF NOT EXISTS part.{table}', 1))
+    conn.execute(f'CREATE INDEX IF NOT EXISTS part.idx_{table}_user_id ON {table} (user_id, id)')
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS part.{table}_hourly (
+        user_id INTEGER NOT NULL,
+        hour TEXT NOT NULL,
+        {spec['label']} TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        value_sum REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, hour, {spec['label']})
+    )''')
+    conn.execute('CREATE TABLE IF NOT EXISTS part.partition_meta (key TEXT PRIMARY KEY, value TEXT)')
+    conn.execute("INSERT OR IGNORE INTO part.partition_meta (key, value) VALUES ('state', 'raw')")
+    conn.commit()
+
+
+def archive_hot(table, db_path=DB_PATH, now=None, dry_run=False):
+    """Move rows older than hot_days out of the main DB into their month's partition"""
+    spec = RETENTION[table]
+    cutoff = ((now or _utcnow()) - timedelta(days=spec['hot_days'])).strftime('%Y-%m-%d %H:%M:%S')
+    columns = ', '.join(spec['columns'])
+    conn = sqlite3.connect(db_path, timeout=30)
+    moved = {}
+    try:
+        months = [row[0] for row in conn.execute(
+            f'SELECT DISTINCT substr(timestamp, 1, 7) FROM {table} WHERE timestamp < ?', (cutoff,))]
+        for month in months:
+            start = f"{month}-01 00:00:00"
+            end = _month_end(month).strftime('%Y-%m-%d %H:%M:%S')
+            bounds = (start, min(end, cutoff))
+            if dry_run:
+                moved[month] = conn.execute(
+                    f'SELECT COUNT(*) FROM {table} WHERE timestamp >= ? AND timestamp < ?', bounds).fetchone()[0]
+                continue
+            _ensure_partition(conn, table, month)
+            try:
+                total = 0
+                while True:
+                    # Small transactions keep the main DB's write lock short for live requests
+                    conn.execute('BEGIN IMMEDIATE')
+                    ids = [row[0] for row in conn.execute(
+                        f'SELECT id FROM main.{table} WHERE timestamp >= ? AND timestamp < ? LIMIT ?',
+                        (*bounds, MOVE_CHUNK))]
+                    if not ids:
+                        conn.rollback()
+                        break
+                    marks = ','.join('?' * len(ids))
+                    conn.execute(f'INSERT OR IGNORE INTO part.{table} ({columns}) '
+                                 f'SELECT {columns} FROM main.{table} WHERE id IN ({marks})', ids)
+                    conn.execute(f'DELETE FROM main.{table} WHERE id IN ({marks})', ids)
+                    conn.commit()
+                    total += len(ids)
+                moved[month] = total
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.execute('DETACH DATABASE part')
+    finally:
+        conn.close()
+    return moved
+
+
+def compact_partition(table, path):
+    """Fold a partition's raw rows into hourly aggregates, drop them and VACUUM the file"""
+    spec = RETENTION[table]
+    label = spec['label']
+    value = f"COALESCE(SUM({spec['value']}), 0)" if spec['value'] else '0'
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        rows = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        conn.execute(f'''INSERT INTO {table}_hourly (user_id, hour, {label}, count, value_sum)
+                         SELECT user_id, substr(timestamp, 1, 13) || ':00', COALESCE({label}, 'unknown'),
+                                COUNT(*), {value}
+                         FROM {table} WHERE true GROUP BY 1, 2, 3
+                         ON CONFLICT (user_id, hour, {label}) DO UPDATE SET
+                             count = count + excluded.count, value_sum = value_sum + excluded.value_sum''')
+        conn.execute(f'DELETE FROM {table}')
+        conn.execute("UPDATE partition_meta SET value = 'compacted' WHERE key = 'state'")
+        conn.commit()
+        conn.execute('VACUUM')
+        return rows
+    finally:
+        conn.close()
+
+
+def compact(db_path=DB_PATH, now=None, dry_run=False, vacuum_main=False):
+    """Run the retention policy of every table once; returns a report dict"""
+    now = now or _utcnow()
+    report = {}
+    for table, spec in RETENTION.items():
+        if not (spec['hot_days'] <= spec['raw_days'] <= spec['keep_days']):
+            raise ValueError(f"{table}: retention needs hot_days <= raw_days <= keep_days")
+        entry = report[table] = {'archived': archive_hot(table, db_path, now, dry_run),
+                                 'compacted': {}, 'dropped': []}
+
+        raw_cutoff = now - timedelta(days=spec['raw_days'])
+        keep_cutoff = now - timedelta(days=spec['keep_days'])
+        for month, path in partitions(table):
+            if _month_end(month) <= keep_cutoff:
+                entry['dropped'].append(month)
+                if not dry_run:
+                    os.remove(path)
+            elif _month_end(month) <= raw_cutoff and _partition_state(path) == 'raw':
+                entry['compacted'][month] = None if dry_run else compact_partition(table, path)
+
+        rollup, day_column = spec['rollup']
+        if not dry_run:
+            conn = sqlite3.connect(db_path, timeout=30)
+            try:
+                conn.execute(f'DELETE FROM {rollup} WHERE {day_column} < ?', (keep_cutoff.strftime('%Y-%m-%d'),))
+                conn.commit()
+            except sqlite3.OperationalError:
+                pass  # rollup table not created yet
+            finally:
+                conn.close()
+
+    if vacuum_main and not dry_run:
+        # Returns the moved rows' pages to the filesystem; takes an exclusive lock while it runs
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.execute('VACUUM')
+        conn.close()
+    return report
+
+
+def iter_rows(table, user_id, columns, batch_size=5000, db_path=DB_PATH):
+    """Yield the user's raw rows as lists: archived partitions oldest month
+    first, then the main table, each in id order with one keyset query per
+    batch; columns must start with id"""
+    sources = [path for month, path in partitions(table) if _partition_state(path) == 'raw'] + [db_path]
+    select = ', '.join(columns)
+    for path in sources:
+        last_id = 0
+        conn = sqlite3.connect(path)
+        try:
+            while True:
+                try:
+                    rows = conn.execute(f'SELECT {select} FROM {table} WHERE user_id = ? AND id > ? '
+                                        f'ORDER BY id LIMIT ?', (user_id, last_id, batch_size)).fetchall()
+                except sqlite3.OperationalError:
+                    break  # partition without the raw table
+                if rows:
+                    yield rows
+                    last_id = rows[-1][0]
+                if len(rows) < batch_size:
+                    break
+        finally:
+            conn.close()
+
+
+def hourly(table, user_id, since=None):
+    """[(hour, label, count, value_sum)] from compacted partitions, oldest first"""
+    results = []
+    for month, path in partitions(table):
+        if since and _month_end(month).strftime('%Y-%m-%d %H:%M') <= since:
+            continue
+        conn = sqlite3.connect(path)
+        try:
+            results.extend(conn.execute(
+                f'SELECT hour, {RETENTION[table]["label"]}, count, value_sum FROM {table}_hourly '
+                f'WHERE user_id = ? AND hour >= ? ORDER BY hour', (user_id, since or '')).fetchall())
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            conn.close()
+    return results
+
+
+def status(db_path=DB_PATH):
+    report = {'main_db_mb': round(os.path.getsize(db_path) / 1e6, 2) if os.path.exists(db_path) else 0.0}
+    conn = sqlite3.connect(db_path)
+    for table in RETENTION:
+        try:
+            hot_rows = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        except sqlite3.OperationalError:
+            hot_rows = 0
+        report[table] = {
+            'hot_rows': hot_rows,
+            'partitions': [{'month': month, 'state': _partition_state(path),
+                            'mb': round(os.path.getsize(path) / 1e6, 2)}
+                           for month, path in partitions(table)]
+        }
+    conn.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition maintenance for log tables")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('compact', help="Archive, compact and expire partitions")
+    run.add_argument('--dry-run', action='store_true', help="Report what would happen without changing anything")
+    run.add_argument('--vacuum-main', action='store_true', help="VACUUM the main DB afterwards")
+    sub.add_parser('status', help="Show hot row counts and partitions")
+    parser.add_argument('--db', help="SQLite file (default: the one in NEUROLENS_DATABASE_URL)")
+    args = parser.parse_args()
+
+    import storage
+    if storage.is_postgres():
+        print("⚠️ NEUROLENS_DATABASE_URL points at PostgreSQL; partition the log tables there instead")
+        return 1
+    args.db = args.db or storage.backend().path
+
+    print("=" * 80)
+    if args.command == 'status':
+        report = status(args.db)
+        print(f"📦 Main DB: {report.pop('main_db_mb')} MB")
+        for table, info in report.items():
+            print(f"\n{table}: {info['hot_rows']} hot rows")
+            for part in info['partitions']:
+                print(f"   {part['month']}  {part['state']:<10} {part['mb']} MB")
+        return 0
+
+    report = compact(args.db, dry_run=args.dry_run, vacuum_main=args.vacuum_main)
+    prefix = "Would" if args.dry_run else "✓"
+    for table, entry in report.items():
+        print(f"\n{table}")
+        for month, rows in entry['archived'].items():
+            print(f"   {prefix} archive {rows} rows -> {month}")
+        for month, rows in entry['compacted'].items():
+            print(f"   {prefix} compact {month}" + (f" ({rows} raw rows -> hourly)" if rows is not None else ""))
+        for month in entry['dropped']:
+            print(f"   {prefix} drop {month}")
+    print("=" * 80)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -56,7 +56,63 @@ class EmotionPrivacy:
             dna_data['records'].append(record)
         
         return json.dumps(dna_data, indent=2)
-    
+
+    def hash_batch(self, user_id, rows, raw=False):
+        """MoodHash records for a batch of (id, emotion, confidence, timestamp) rows.
+
+        Same construction as generate_moodhash (random 16-byte salt + data +
+        device key), but salts come from one urandom call per batch and the
+        record's own log timestamp is used instead of a fresh isoformat().
+        raw=True returns 32-byte digests instead of hex strings.
+        """
+        salts = os.urandom(16 * len(rows))
+        key = self.device_key
+        sha256 = hashlib.sha256
+        records = []
+        for i, (_, emotion, confidence, timestamp) in enumerate(rows):
+            timestamp = str(timestamp).replace(' ', 'T')
+            data = f"{emotion}:{timestamp}:{user_id}".encode()
+            digest = sha256(salts[16 * i:16 * i + 16] + data + key)
+            records.append((digest.digest() if raw else digest.hexdigest(),
+                            timestamp, round(confidence or 0.0, 2)))
+        return records
+
+    def stream_emotion_dna(self, user_id, batches, fmt='json'):
+        """Yield the .mooddna export chunk by chunk, one chunk per batch of log rows.
+
+        fmt='json'   - same document as export_emotion_dna, emitted as a chunked array
+        fmt='ndjson' - a header line, then one record per line
+        fmt='binary' - columnar mooddna_format blocks (bytes chunks, already compressed)
+        """
+        header = {
+            'user_id_hash': hashlib.sha256(str(user_id).encode()).hexdigest(),
+            'export_date': datetime.now().isoformat()
+        }
+        if fmt == 'binary':
+            from mooddna_format import MoodDNAWriter, to_epoch
+            writer = MoodDNAWriter(header)
+            yield writer.header()
+            for rows in batches:
+                hashes, timestamps, intensities = zip(*self.hash_batch(user_id, rows, raw=True))
+                yield writer.encode_block(hashes, [to_epoch(ts) for ts in timestamps], intensities,
+                                          [row[1] for row in rows])
+            yield writer.end()
+            return
+        if fmt == 'ndjson':
+            yield json.dumps(dict(header, format='mooddna', version=1)) + '\n'
+            line = '{"moodhash":"%s","timestamp":"%s","intensity":%s,"encrypted":true}\n'
+            for rows in batches:
+                yield ''.join([line % record for record in self.hash_batch(user_id, rows)])
+            return
+
+        yield json.dumps(header)[:-1] + ', "records": ['
+        item = '{"moodhash":"%s","timestamp":"%s","intensity":%s,"encrypted":true}'
+        separator = '\n'
+        for rows in batches:
+            yield separator + ',\n'.join([item % record for record in self.hash_batch(user_id, rows)])
+            separator = ',\n'
+        yield '\n]}\n'
+
     def get_privacy_stats(self):
         """Get privacy protection statistics"""
         return {
@@ -67,3 +123,15 @@ class EmotionPrivacy:
             'reversible': False,
             'status': 'Protected 🔒'
         }
+
+
+def gzip_chunks(chunks, level=1):
+    """gzip-encode a stream of str chunks incrementally (constant memory).
+    Level 1: the hex hashes barely compress further at higher levels, which cost 2x the CPU"""
+    import zlib
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
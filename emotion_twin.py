@@ -1,5 +1,5 @@
-import sqlite3
-from datetime import datetime, timedelta
+import storage
+from datetime import datetime
 from collections import Counter
 
 class EmotionTwin:
@@ -15,13 +15,13 @@ class EmotionTwin:
     
     def get_emotion_profile(self, user_id):
         """Build user's emotional fingerprint"""
-        conn = sqlite3.connect('neurolens.db')
+        conn = storage.connect()
         c = conn.cursor()
         
         # Get last 7 days of emotions
         c.execute('''SELECT emotion, timestamp FROM emotion_logs 
-                     WHERE user_id = ? AND datetime(timestamp) >= datetime('now', '-7 days')
-                     ORDER BY timestamp DESC''', (user_id,))
+                     WHERE user_id = ? AND timestamp >= ?
+                     ORDER BY timestamp DESC''', (user_id, storage.ago(days=7)))
         emotions = c.fetchall()
         conn.close()
         
@@ -93,11 +93,11 @@ class EmotionTwin:
     
     def get_weekly_reflection(self, user_id):
         """Generate weekly mood summary"""
-        conn = sqlite3.connect('neurolens.db')
+        conn = storage.connect()
         c = conn.cursor()
         
         c.execute('''SELECT emotion, timestamp FROM emotion_logs 
-                     WHERE user_id = ? AND datetime(timestamp) >= datetime('now', '-7 days')''', (user_id,))
+                     WHERE user_id = ? AND timestamp >= ?''', (user_id, storage.ago(days=7)))
         emotions = c.fetchall()
         conn.close()
         
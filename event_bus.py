@@ -0,0 +1,131 @@
+"""
+Per-user Server-Sent Events channel for the Flask app
+
+The page opens one EventSource('/events') instead of polling a dozen
+endpoints on timers. A stream only sends an event when its payload
+differs from what that connection last received, plus a comment
+heartbeat to keep proxies from closing an idle connection.
+
+Requests that change a user's state call bus.publish(user_id, ...) (or
+bus.notify(user_id) to make the user's streams re-check their state right
+away). Streams also re-check on their own every `poll` seconds, so state
+written by another gunicorn worker still reaches the client, just with up
+to `poll` seconds of delay.
+"""
+
+import json
+import queue
+import threading
+import time
+
+HEARTBEAT_SECONDS = 15.0
+POLL_SECONDS = 5.0
+
+
+def sse(event, data, event_id=None):
+    """One SSE frame"""
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+class EventBus:
+    def __init__(self, queue_size=64):
+        self.queue_size = queue_size
+        self._subscribers = {}  # user id -> set of queues, one per open stream
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues:
+                queues.discard(q)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event, data=None):
+        """Deliver (event, data) to every open stream of the user; a stalled stream drops its oldest item"""
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, ()))
+        for q in queues:
+            while True:
+                try:
+                    q.put_nowait((event, data))
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def notify(self, user_id):
+        """Ask the user's streams to re-check their state now"""
+        self.publish(user_id, None)
+
+    def broadcast(self, event, data=None):
+        with self._lock:
+            users = list(self._subscribers)
+        for user_id in users:
+            self.publish(user_id, event, data)
+
+    def is_connected(self, user_id):
+        with self._lock:
+            return user_id in self._subscribers
+
+    def connected_users(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self, user_id, state=None, poll=POLL_SECONDS, heartbeat=HEARTBEAT_SECONDS):
+        """SSE generator for one connection.
+
+        state: callable returning {event: payload} for the user; it is
+        sent in full on connect, then re-evaluated on notify() and every
+        `poll` seconds, and only changed payloads are sent.
+        """
+        q = self.subscribe(user_id)
+        sent = {}
+        counter = 0
+
+        def changes():
+            nonlocal counter
+            for event, payload in (state() if state else {}).items():
+                encoded = json.dumps(payload, sort_keys=True, default=str)
+                if sent.get(event) != encoded:
+                    sent[event] = encoded
+                    counter += 1
+                    yield sse(event, payload, counter)
+
+        try:
+            yield "retry: 3000\n\n"
+            yield from changes()
+            last_write = last_poll = time.monotonic()
+            while True:
+                timeout = max(0.0, min(last_poll + poll, last_write + heartbeat) - time.monotonic())
+                try:
+                    event, data = q.get(timeout=timeout)
+                except queue.Empty:
+                    event, data = None, None
+                    if time.monotonic() - last_write >= heartbeat:
+                        last_write = time.monotonic()
+                        yield ": keep-alive\n\n"
+                        continue
+                if event is not None:
+                    counter += 1
+                    last_write = time.monotonic()
+                    yield sse(event, data, counter)
+                    continue
+                last_poll = time.monotonic()
+                for frame in changes():
+                    last_write = last_poll
+                    yield frame
+        finally:
+            # Runs when the client disconnects and the server closes the generator
+            self.unsubscribe(user_id, q)
@@ -0,0 +1,184 @@
+"""
+FER2013 CSV -> cached NumPy shards
+
+One-time conversion of data/fer2013.csv into uint8 .npy files per usage
+split (train / public_test / private_test). Later runs open them with
+mmap_mode='r', so loading is a few page-table entries instead of parsing
+35k pixel strings.
+
+Run: python fer2013_shards.py            # convert (or confirm cache is fresh)
+     python fer2013_shards.py --force    # rebuild
+"""
+
+import os
+import io
+import sys
+import json
+import argparse
+import numpy as np
+
+CSV_PATH = 'data/fer2013.csv'
+SHARD_DIR = 'data/fer2013_shards'
+IMG_SIZE = 48
+USAGE_SPLITS = {'Training': 'train', 'PublicTest': 'public_test', 'PrivateTest': 'private_test'}
+CHUNK_ROWS = 4096
+# FER2013 label order
+EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+
+def _csv_signature(csv_path):
+    st = os.stat(csv_path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _meta_path(out_dir):
+    return os.path.join(out_dir, 'meta.json')
+
+
+def shards_fresh(csv_path=CSV_PATH, out_dir=SHARD_DIR):
+    """True if shards exist and were built from the current CSV"""
+    meta_path = _meta_path(out_dir)
+    if not os.path.exists(meta_path):
+        return False
+    if not os.path.exists(csv_path):
+        # Shards shipped without the CSV are still usable
+        return True
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    return meta.get('source') == _csv_signature(csv_path)
+
+
+def _parse_pixels(pixel_strings):
+    """Bulk-parse space separated pixel strings with pandas' C tokenizer"""
+    import pandas as pd
+    table = pd.read_csv(io.StringIO('\n'.join(pixel_strings)), sep=' ', header=None,
+                        dtype=np.uint8, engine='c')
+    return table.to_numpy().reshape(-1, IMG_SIZE, IMG_SIZE)
+
+
+def convert_fer2013(csv_path=CSV_PATH, out_dir=SHARD_DIR):
+    """Parse the CSV in chunks and write <split>_images.npy / <split>_labels.npy"""
+    import pandas as pd
+
+    print(f"Converting {csv_path} to NumPy shards in {out_dir}...")
+    os.makedirs(out_dir, exist_ok=True)
+
+    images = {split: [] for split in USAGE_SPLITS.values()}
+    labels = {split: [] for split in USAGE_SPLITS.values()}
+    for chunk in pd.read_csv(csv_path, chunksize=CHUNK_ROWS):
+        chunk_images = _parse_pixels(chunk['pixels'])
+        chunk_labels = chunk['emotion'].to_numpy(dtype=np.uint8)
+        usage = chunk['Usage'].to_numpy() if 'Usage' in chunk else np.full(len(chunk), 'Training')
+        for name, split in USAGE_SPLITS.items():
+            mask = usage == name
+            if mask.any():
+                images[split].append(chunk_images[mask])
+                labels[split].append(chunk_labels[mask])
+
+    counts = {}
+    for split in USAGE_SPLITS.values():
+        split_images = np.concatenate(images[split]) if images[split] else np.zeros((0, IMG_SIZE, IMG_SIZE), np.uint8)
+        split_labels = np.concatenate(labels[split]) if labels[split] else np.zeros(0, np.uint8)
+        _atomic_save(os.path.join(out_dir, f'{split}_images.npy'), split_images)
+        _atomic_save(os.path.join(out_dir, f'{split}_labels.npy'), split_labels)
+        counts[split] = int(len(split_labels))
+
+    # meta.json is written last; its presence marks a complete conversion
+    meta = {'source': _csv_signature(csv_path), 'image_shape': [IMG_SIZE, IMG_SIZE], 'counts': counts}
+    with open(_meta_path(out_dir) + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(_meta_path(out_dir) + '.tmp', _meta_path(out_dir))
+
+    print(f"✓ Wrote shards: {counts}")
+    return meta
+
+
+def _atomic_save(path, array):
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def ensure_shards(csv_path=CSV_PATH, out_dir=SHARD_DIR):
+    """Convert once; raises FileNotFoundError if neither shards nor CSV exist"""
+    if shards_fresh(csv_path, out_dir):
+        return
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+    convert_fer2013(csv_path, out_dir)
+
+
+def load_fer2013_shards(split='train', csv_path=CSV_PATH, out_dir=SHARD_DIR):
+    """Zero-copy (N, 48, 48) uint8 memmap and uint8 labels for one split"""
+    ensure_shards(csv_path, out_dir)
+    images = np.load(os.path.join(out_dir, f'{split}_images.npy'), mmap_mode='r')
+    labels = np.load(os.path.join(out_dir, f'{split}_labels.npy'), mmap_mode='r')
+    return images, labels
+
+
+def to_model_input(images, img_size=IMG_SIZE, chunk=8192):
+    """uint8 (N, 48, 48) -> float32 (N, S, S, 1) in [0, 1], resized in chunks when S != 48"""
+    out = np.empty((len(images), img_size, img_size, 1), dtype=np.float32)
+    for start in range(0, len(images), chunk):
+        batch = np.asarray(images[start:start + chunk], dtype=np.float32)[..., None]
+        if img_size != IMG_SIZE:
+            import tensorflow as tf
+            batch = tf.image.resize(batch, (img_size, img_size)).numpy()
+        out[start:start + chunk] = batch
+    out /= 255.0
+    return out
+
+
+def load_fer2013_arrays(img_size=IMG_SIZE, splits=('train', 'public_test', 'private_test'),
+                        csv_path=CSV_PATH, out_dir=SHARD_DIR):
+    """Training-ready float32 images and int labels for the given splits"""
+    X, y = [], []
+    for split in splits:
+        images, labels = load_fer2013_shards(split, csv_path, out_dir)
+        X.append(to_model_input(images, img_size))
+        y.append(np.asarray(labels, dtype=np.int64))
+    return np.concatenate(X), np.concatenate(y)
+
+
+def load_train_test(img_size=IMG_SIZE, csv_path=CSV_PATH, out_dir=SHARD_DIR):
+    """X_train, y_train (Training) and X_test, y_test (PublicTest) with int labels"""
+    X_train, y_train = load_fer2013_arrays(img_size, ('train',), csv_path, out_dir)
+    X_test, y_test = load_fer2013_arrays(img_size, ('public_test',), csv_path, out_dir)
+    return X_train, y_train, X_test, y_test
+
+
+def load_training_data(img_size=IMG_SIZE, synthetic_train=20000, synthetic_test=4000,
+                       test_patterns=None, class_weights=None, csv_path=CSV_PATH, out_dir=SHARD_DIR):
+    """X_train, y_train, X_test, y_test (int labels): FER2013 shards when available,
+    synthetic faces otherwise (class_weights only shapes the synthetic training set)"""
+    try:
+        X_train, y_train, X_test, y_test = load_train_test(img_size, csv_path, out_dir)
+        print("Loaded FER2013 from cached shards")
+    except FileNotFoundError:
+        import synthetic_faces
+        print("Generating synthetic training data...")
+        X_train, y_train = synthetic_faces.generate_dataset(synthetic_train, img_size, class_weights=class_weights)
+        X_test, y_test = synthetic_faces.generate_dataset(synthetic_test, img_size, test_patterns)
+    return X_train, y_train, X_test, y_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert FER2013 CSV to NumPy shards")
+    parser.add_argument('--csv', default=CSV_PATH)
+    parser.add_argument('--out', default=SHARD_DIR)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+
+    if not args.force and shards_fresh(args.csv, args.out):
+        with open(_meta_path(args.out), 'r') as f:
+            print(f"✓ Shards up to date: {json.load(f)['counts']}")
+        return 0
+    if not os.path.exists(args.csv):
+        print(f"✗ {args.csv} not found")
+        return 1
+    convert_fer2013(args.csv, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
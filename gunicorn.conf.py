@@ -0,0 +1,15 @@
+"""
+Gunicorn settings for NeuroLens
+Run: gunicorn -c gunicorn.conf.py app:app
+
+Models are loaded per worker after fork (TensorFlow is not fork-safe);
+torch checkpoints are memory-mapped so their pages are still shared
+(see shared_weights.py).
+"""
+
+import os
+
+bind = os.environ.get('NEUROLENS_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('NEUROLENS_WORKERS', '4'))
+threads = int(os.environ.get('NEUROLENS_THREADS', '4'))
+timeout = 120
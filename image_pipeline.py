@@ -0,0 +1,156 @@
+"""
+tf.data input pipeline shared by the image training scripts
+
+Drop-in for ImageDataGenerator.flow_from_directory: same class ordering,
+same per-class validation split and nearest-neighbour resizing, but
+files are decoded by a parallel map, resized uint8 images are cached
+(in memory or in a tf.data cache file on disk) after the first epoch,
+augmentation runs as vectorized Keras layers on whole batches and the
+next batches are prefetched while the model trains.
+
+    train_gen = flow_from_directory(train_dir, target_size=(48, 48), batch_size=32,
+                                    subset='training', validation_split=0.2,
+                                    augment=dict(rotation_range=20, horizontal_flip=True))
+    model.fit(train_gen.dataset, validation_data=val_gen.dataset, ...)
+"""
+
+import os
+import hashlib
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+# 'memory' or a directory for file-backed caches (for datasets larger than RAM)
+DEFAULT_CACHE = os.environ.get('NEUROLENS_IMAGE_CACHE', 'memory')
+SHUFFLE_BUFFER = 4096
+
+
+class ImageFlow:
+    """A batched tf.data.Dataset plus the generator attributes the scripts use"""
+
+    def __init__(self, dataset, class_indices, samples, batch_size):
+        self.dataset = dataset
+        self.class_indices = class_indices
+        self.num_classes = len(class_indices)
+        self.samples = samples
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return -(-self.samples // self.batch_size)
+
+
+def list_image_files(directory, validation_split=0.0, subset=None):
+    """(paths, labels, class_indices) with flow_from_directory's split semantics:
+    the first `validation_split` of each class's sorted files is the validation subset
+    """
+    classes = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    class_indices = {name: i for i, name in enumerate(classes)}
+    paths, labels = [], []
+    for name in classes:
+        class_dir = os.path.join(directory, name)
+        files = sorted(
+            os.path.join(root, f)
+            for root, _, names in os.walk(class_dir, followlinks=True)
+            for f in names if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        split_at = int(validation_split * len(files))
+        if subset == 'validation':
+            files = files[:split_at]
+        elif subset == 'training':
+            files = files[split_at:]
+        paths.extend(files)
+        labels.extend([class_indices[name]] * len(files))
+    return paths, labels, class_indices
+
+
+def build_augmentation(rotation_range=0, width_shift_range=0.0, height_shift_range=0.0,
+                       zoom_range=0.0, horizontal_flip=False, vertical_flip=False,
+                       brightness_range=None, fill_mode='nearest', seed=None, **ignored):
+    """Keras preprocessing layers equivalent to the ImageDataGenerator arguments.
+
+    shear_range and channel_shift_range are accepted but dropped: in the old
+    generators they were applied in degrees / 0-255 units (0.2-0.4), which is
+    below one pixel or one intensity level.
+    """
+    from tensorflow.keras import Sequential, layers
+
+    augmentation = []
+    if horizontal_flip or vertical_flip:
+        mode = 'horizontal_and_vertical' if horizontal_flip and vertical_flip else (
+            'horizontal' if horizontal_flip else 'vertical')
+        augmentation.append(layers.RandomFlip(mode, seed=seed))
+    if rotation_range:
+        augmentation.append(layers.RandomRotation(rotation_range / 360.0, fill_mode=fill_mode, seed=seed))
+    if width_shift_range or height_shift_range:
+        augmentation.append(layers.RandomTranslation(height_shift_range, width_shift_range,
+                                                     fill_mode=fill_mode, seed=seed))
+    if zoom_range:
+        augmentation.append(layers.RandomZoom(zoom_range, fill_mode=fill_mode, seed=seed))
+    if brightness_range:
+        # Additive in [0, 1] space; the generator's multiplicative range maps to the same spread
+        low, high = brightness_range
+        augmentation.append(layers.RandomBrightness((low - 1.0, high - 1.0), value_range=(0.0, 1.0), seed=seed))
+    if not augmentation:
+        return None
+    return Sequential(augmentation, name='augmentation')
+
+
+def _cache_file(cache_dir, paths, target_size, channels):
+    """Cache name that changes whenever the file list or decode settings do"""
+    digest = hashlib.sha256()
+    digest.update(f"{target_size}|{channels}".encode())
+    for path in paths:
+        digest.update(path.encode())
+        digest.update(str(os.path.getmtime(path)).encode())
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, f"images_{digest.hexdigest()[:16]}")
+
+
+def flow_from_directory(directory, target_size=(256, 256), batch_size=32, subset=None,
+                        validation_split=0.0, color_mode='rgb', augment=None, cache=DEFAULT_CACHE,
+                        shuffle=None, seed=None, rescale=1.0 / 255):
+    """tf.data replacement for ImageDataGenerator(...).flow_from_directory(...)
+
+    augment: dict of ImageDataGenerator-style arguments (training data only).
+    cache: 'memory', a directory for an on-disk cache, or None to decode every epoch.
+    """
+    import tensorflow as tf
+
+    AUTOTUNE = tf.data.AUTOTUNE
+    paths, labels, class_indices = list_image_files(directory, validation_split, subset)
+    num_classes = len(class_indices)
+    channels = 1 if color_mode == 'grayscale' else 3
+    height, width = target_size
+    shuffle = subset != 'validation' if shuffle is None else shuffle
+
+    def decode(path, label):
+        image = tf.io.decode_image(tf.io.read_file(path), channels=channels, expand_animations=False)
+        # Nearest matches flow_from_directory's default interpolation and keeps uint8 exact
+        image = tf.image.resize(image, (height, width), method='nearest')
+        image = tf.cast(image, tf.uint8)
+        return image, tf.one_hot(label, num_classes)
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    options = tf.data.Options()
+    options.deterministic = not shuffle
+    dataset = dataset.with_options(options)
+    dataset = dataset.map(decode, num_parallel_calls=AUTOTUNE)
+
+    # Cache the small uint8 images; rescale/augment stay after the cache so they vary per epoch
+    if cache == 'memory':
+        dataset = dataset.cache()
+    elif cache:
+        dataset = dataset.cache(_cache_file(cache, paths, target_size, channels))
+
+    if shuffle:
+        dataset = dataset.shuffle(min(len(paths), SHUFFLE_BUFFER) or 1, seed=seed,
+                                  reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+
+    scale = rescale or 1.0
+    dataset = dataset.map(lambda x, y: (tf.cast(x, tf.float32) * scale, y), num_parallel_calls=AUTOTUNE)
+
+    augmentation = build_augmentation(seed=seed, **augment) if augment else None
+    if augmentation is not None:
+        dataset = dataset.map(lambda x, y: (augmentation(x, training=True), y), num_parallel_calls=AUTOTUNE)
+
+    dataset = dataset.prefetch(AUTOTUNE)
+    return ImageFlow(dataset, class_indices, len(paths), batch_size)
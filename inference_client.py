@@ -0,0 +1,115 @@
+"""
+Thin client for inference_server.py
+
+Each request thread keeps one shared-memory segment that frames are
+written into; only a small JSON header crosses the socket. Calls time
+out quickly and raise InferenceUnavailable so callers can fall back to
+pattern-based detection instead of stalling the request.
+"""
+
+import os
+import time
+import socket
+import threading
+from multiprocessing import shared_memory
+
+from inference_server import DEFAULT_SOCKET, send_message, recv_message
+
+SEGMENT_SIZE = 2 * 1024 * 1024  # comfortably fits a webcam JPEG
+
+
+class InferenceUnavailable(Exception):
+    pass
+
+
+class InferenceClient:
+    def __init__(self, socket_path=None, timeout=2.0, retry_after=5.0):
+        self.socket_path = socket_path or os.environ.get('NEUROLENS_INFERENCE_SOCKET', DEFAULT_SOCKET)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _segment(self, size):
+        """Per-thread segment, grown on demand and unlinked when the thread goes away"""
+        owned = getattr(self._local, 'owned', None)
+        if owned is None or owned.shm.size < size:
+            self._local.owned = owned = _OwnedSegment(max(size, SEGMENT_SIZE))
+        return owned.shm
+
+    def _call(self, header, payload=None):
+        if time.monotonic() < self._down_until:
+            raise InferenceUnavailable("inference server marked down")
+
+        if payload is not None:
+            segment = self._segment(len(payload))
+            segment.buf[:len(payload)] = payload
+            header = {**header, 'shm': segment.name, 'size': len(payload)}
+
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                send_message(sock, header)
+                result = recv_message(sock)
+        except (OSError, ValueError) as e:
+            # socket.timeout is an OSError; back off so every request doesn't wait out the timeout
+            self._down_until = time.monotonic() + self.retry_after
+            raise InferenceUnavailable(str(e)) from e
+
+        if not result.get('ok'):
+            raise InferenceUnavailable(result.get('error', 'inference failed'))
+        return result
+
+    def ping(self):
+        return self._call({'op': 'ping'})
+
+    def detect_face(self, image_bytes):
+        """Encoded image (JPEG/PNG bytes) -> dominant emotion, confidence, per-face results"""
+        return self._call({'op': 'detect_face'}, image_bytes)
+
+    def predict_voice(self, path):
+        return self._call({'op': 'voice', 'path': os.path.abspath(path)})
+
+
+class _OwnedSegment:
+    """Unlinks the segment once the owning thread's local storage drops it"""
+
+    def __init__(self, size):
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+    def __del__(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except (BufferError, FileNotFoundError):
+            pass
+
+
+def fallback_detection(image_bytes):
+    """Pattern-based detection in-process, used when the server is down or slow"""
+    import cv2
+    import numpy as np
+    from emotion_detector import pattern_based_detection
+
+    frame = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    cascade = _face_cascade()
+    faces = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+    if len(faces):
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        roi = gray[y:y+h, x:x+w]
+    else:
+        roi = gray
+    return {'dominant_emotion': pattern_based_detection(roi), 'confidence': 0.6}
+
+
+_cascade = None
+
+
+def _face_cascade():
+    global _cascade
+    if _cascade is None:
+        import cv2
+        _cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    return _cascade
@@ -0,0 +1,279 @@
+"""
+NeuroLens Inference Server
+Standalone worker pool that owns EmotionDetector and the voice model, so
+TensorFlow never runs inside the Flask request threads.
+
+Protocol (Unix socket, one request per connection):
+    request  = 4-byte big-endian length + JSON header [+ inline payload]
+    response = 4-byte big-endian length + JSON body
+
+Frames travel through a shared-memory segment owned by the client
+(header carries the segment name and size), so the image bytes are
+never copied through the socket.
+
+Run: python inference_server.py --workers 2
+     NEUROLENS_INFERENCE_SOCKET=/tmp/neurolens_inference.sock python app.py
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import signal
+import socket
+import struct
+import argparse
+import selectors
+import multiprocessing as mp
+from collections import OrderedDict
+from multiprocessing import shared_memory, resource_tracker
+
+DEFAULT_SOCKET = '/tmp/neurolens_inference.sock'
+HEADER = struct.Struct('>I')
+MAX_HEADER_BYTES = 64 * 1024
+
+
+# ----------------------------------------------------------------------
+# Framing helpers (shared with inference_client.py)
+# ----------------------------------------------------------------------
+def recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    received = 0
+    while received < n:
+        chunk = sock.recv_into(view[received:], n - received)
+        if chunk == 0:
+            raise ConnectionError("peer closed the connection")
+        received += chunk
+    return buf
+
+
+def send_message(sock, body, payload=None):
+    data = json.dumps(body).encode()
+    sock.sendall(HEADER.pack(len(data)) + data)
+    if payload is not None:
+        sock.sendall(payload)
+
+
+def recv_message(sock):
+    (length,) = HEADER.unpack(recv_exact(sock, HEADER.size))
+    if length > MAX_HEADER_BYTES:
+        raise ValueError(f"header too large: {length} bytes")
+    return json.loads(recv_exact(sock, length))
+
+
+def attach_segment(name):
+    """Attach to a client-owned segment without letting this process unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: attach registers the segment with our resource tracker
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+# ----------------------------------------------------------------------
+# Models
+# ----------------------------------------------------------------------
+class VoicePredictor:
+    def __init__(self, model_path='checkpoints/perfect_voice_model.h5',
+                 encoder_path='checkpoints/voice_label_encoder.pkl'):
+        self.model = None
+        self.classes = None
+        if os.path.exists(model_path) and os.path.exists(encoder_path):
+            import pickle
+            from tensorflow.keras.models import load_model
+            self.model = load_model(model_path)
+            with open(encoder_path, 'rb') as f:
+                self.classes = list(pickle.load(f).classes_)
+            print(f"✅ Voice model loaded from: {model_path}")
+
+    def predict(self, path):
+        if self.model is None:
+            return None
+        import numpy as np
+        from voice_features import extract_features
+        features = extract_features(path)
+        if self.model.input_shape[1] != len(features):
+            # Checkpoint was trained on a different feature set
+            return None
+        probs = self.model.predict(features.reshape(1, -1, 1), verbose=0)[0]
+        idx = int(np.argmax(probs))
+        return {
+            'emotion': self.classes[idx],
+            'confidence': float(probs[idx]),
+            'all_emotions': {c: round(float(p) * 100, 2) for c, p in zip(self.classes, probs)}
+        }
+
+
+class InferenceWorker:
+    """One worker process: accepts connections and serves them one request at a time"""
+
+    def __init__(self, listener, max_segments=64):
+        import cv2
+        import numpy as np
+        from shared_weights import get_emotion_detector
+
+        self.cv2 = cv2
+        self.np = np
+        self.listener = listener
+        self.detector = get_emotion_detector()
+        self.detector.start_watcher()
+        self.voice = VoicePredictor()
+        self.segments = OrderedDict()
+        self.max_segments = max_segments
+
+    def _segment(self, name):
+        segment = self.segments.pop(name, None)
+        if segment is None:
+            segment = attach_segment(name)
+        self.segments[name] = segment
+        while len(self.segments) > self.max_segments:
+            _, stale = self.segments.popitem(last=False)
+            stale.close()
+        return segment
+
+    def _payload(self, sock, header):
+        if 'shm' in header:
+            segment = self._segment(header['shm'])
+            return segment.buf[:header['size']]
+        if 'inline' in header:
+            return recv_exact(sock, header['inline'])
+        return None
+
+    def detect_face(self, payload):
+        # Zero-copy view over the client's segment; imdecode reads it in place
+        encoded = self.np.frombuffer(payload, dtype=self.np.uint8)
+        frame = self.cv2.imdecode(encoded, self.cv2.IMREAD_COLOR)
+        del encoded
+        if frame is None:
+            return {'ok': False, 'error': 'could not decode image'}
+
+        faces = self.detector.detect_emotion(frame)
+        if not faces:
+            return {'ok': True, 'faces': [], 'dominant_emotion': 'neutral', 'confidence': 0.0}
+        best = max(faces, key=lambda f: f['confidence'])
+        return {
+            'ok': True,
+            'faces': faces,
+            'dominant_emotion': best['emotion'],
+            'confidence': best['confidence'],
+            'all_emotions': best.get('all_emotions'),
+            'model_version': self.detector.model_version
+        }
+
+    def handle(self, sock):
+        header = recv_message(sock)
+        op = header.get('op')
+        payload = self._payload(sock, header)
+        try:
+            if op == 'ping':
+                result = {'ok': True, 'pid': os.getpid(), 'model_version': self.detector.model_version}
+            elif op == 'detect_face':
+                result = self.detect_face(payload)
+            elif op == 'voice':
+                prediction = self.voice.predict(header['path'])
+                result = {'ok': prediction is not None, **(prediction or {'error': 'no voice model'})}
+            else:
+                result = {'ok': False, 'error': f"unknown op: {op}"}
+        finally:
+            if isinstance(payload, memoryview):
+                try:
+                    payload.release()
+                except BufferError:
+                    # A failed decode may still hold a view; GC frees it
+                    pass
+        send_message(sock, result)
+
+    def serve_forever(self):
+        print(f"✓ Inference worker {os.getpid()} ready")
+        selector = selectors.DefaultSelector()
+        selector.register(self.listener, selectors.EVENT_READ)
+        while True:
+            selector.select()
+            try:
+                conn, _ = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                # Another worker won the accept race
+                continue
+            with conn:
+                conn.setblocking(True)
+                try:
+                    self.handle(conn)
+                except (ConnectionError, OSError, ValueError) as e:
+                    print(f"Inference request failed: {e}")
+                except Exception as e:
+                    try:
+                        send_message(conn, {'ok': False, 'error': str(e)})
+                    except OSError:
+                        pass
+
+
+def _worker_main(listener):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    InferenceWorker(listener).serve_forever()
+
+
+class InferenceServer:
+    def __init__(self, socket_path=DEFAULT_SOCKET, workers=2):
+        self.socket_path = socket_path
+        self.n_workers = workers
+        self.workers = []
+
+    def _bind(self):
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        listener.listen(128)
+        listener.setblocking(False)
+        return listener
+
+    def _spawn(self, ctx, listener):
+        proc = ctx.Process(target=_worker_main, args=(listener,), daemon=True)
+        proc.start()
+        return proc
+
+    def serve_forever(self):
+        ctx = mp.get_context('fork')
+        listener = self._bind()
+        print("=" * 60)
+        print(f"🧠 NeuroLens inference server on {self.socket_path} ({self.n_workers} workers)")
+        print("=" * 60)
+        self.workers = [self._spawn(ctx, listener) for _ in range(self.n_workers)]
+        try:
+            while True:
+                time.sleep(1)
+                for i, proc in enumerate(self.workers):
+                    if not proc.is_alive():
+                        print(f"⚠️  Worker {proc.pid} exited ({proc.exitcode}), restarting")
+                        self.workers[i] = self._spawn(ctx, listener)
+        except KeyboardInterrupt:
+            print("\nShutting down inference server...")
+        finally:
+            for proc in self.workers:
+                proc.terminate()
+            listener.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NeuroLens inference server")
+    parser.add_argument('--socket', default=os.environ.get('NEUROLENS_INFERENCE_SOCKET', DEFAULT_SOCKET))
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+    InferenceServer(args.socket, args.workers).serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
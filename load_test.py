@@ -0,0 +1,422 @@
+"""
+Load test: N simulated webcam users against app.py
+Replays the frontend's traffic mix with an asyncio HTTP client (stdlib only):
+
+    every 1.5 s   POST /detect_emotion (synthetic JPEG frame), then POST /log_emotion
+    every 20 s    POST /chat
+    every 30 s    MyMind Hub: /get_weekly_emotions, /get_resilience_score,
+                  /get_emotion_forecast, /get_user_stats + /admin/emotion_cloud
+    held open     GET /events (the page's single SSE subscription)
+
+Users are added in stages (--users 1 2 4 8 ...); every stage reports
+throughput and p50/p95/p99 per route. The saturation point is the first
+stage where throughput stops scaling with users (< 80% of linear), the
+error rate passes 1%, or /detect_emotion's p95 exceeds the frame interval
+(the server can no longer keep up with the camera).
+
+By default a server is started from this checkout in a temp directory, so
+it gets a fresh neurolens.db and uploads/ and never touches real data.
+
+Run: python load_test.py --users 1 2 4 8 16 --stage-seconds 30
+     python load_test.py --server gunicorn --users 4 8 16 32 --json bench_output/load_test.json
+     python load_test.py --server none --url http://127.0.0.1:5000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from urllib.parse import urlparse
+
+FRAME_INTERVAL = 1.5
+CHAT_INTERVAL = 20.0
+HUB_INTERVAL = 30.0
+HUB_ROUTES = ['/get_weekly_emotions', '/get_resilience_score', '/get_emotion_forecast',
+              '/get_user_stats', '/admin/emotion_cloud']
+CHAT_MESSAGES = ["I feel stressed about my exam", "Today was a good day", "I can't focus",
+                 "Any tips to relax?", "I'm tired"]
+SATURATION_SCALING = 0.8
+MAX_ERROR_RATE = 0.01
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ----------------------------------------------------------------------
+# Minimal HTTP/1.1 client (one connection per request, like the browser's fetch without keep-alive)
+# ----------------------------------------------------------------------
+def _encode_request(host, method, path, body, cookies, accept='application/json'):
+    payload = json.dumps(body).encode() if body is not None else b''
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: close", f"Accept: {accept}"]
+    if body is not None:
+        lines += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+    if cookies:
+        lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in cookies.items()))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + payload
+
+
+def _parse_head(head, cookies):
+    lines = head.decode('latin-1').split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(':')
+        key, value = key.strip().lower(), value.strip()
+        if key == 'set-cookie' and cookies is not None:
+            name, _, rest = value.partition('=')
+            cookies[name] = rest.split(';', 1)[0]
+        headers[key] = value
+    return status, headers
+
+
+def _dechunk(body):
+    out = b''
+    while body:
+        size_line, _, body = body.partition(b"\r\n")
+        size = int(size_line.split(b';')[0], 16)
+        if size == 0:
+            break
+        out += body[:size]
+        body = body[size + 2:]
+    return out
+
+
+async def http_request(host, port, method, path, body=None, cookies=None, timeout=30.0):
+    """(status, parsed JSON or None); updates `cookies` from Set-Cookie"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(_encode_request(f"{host}:{port}", method, path, body, cookies))
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    status, headers = _parse_head(head, cookies)
+    if headers.get('transfer-encoding') == 'chunked':
+        content = _dechunk(content)
+    try:
+        return status, json.loads(content) if content else None
+    except ValueError:
+        return status, None
+
+
+# ----------------------------------------------------------------------
+# Synthetic webcam frames
+# ----------------------------------------------------------------------
+def make_frames(count=16, size=(640, 480), seed=0):
+    """Base64 JPEG data URLs (what canvas.toDataURL sends) with a synthetic face in the middle"""
+    import base64
+    import cv2
+    import numpy as np
+    import synthetic_faces
+
+    width, height = size
+    face_size = min(width, height) // 2
+    faces, _ = synthetic_faces.generate_dataset(count, face_size, seed=seed)
+    rng = np.random.default_rng(seed)
+    frames = []
+    for face in faces:
+        frame = rng.integers(60, 120, size=(height, width, 3), dtype=np.uint8)
+        top, left = (height - face_size) // 2, (width - face_size) // 2
+        frame[top:top + face_size, left:left + face_size] = (face * 255).astype(np.uint8)
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        frames.append("data:image/jpeg;base64," + base64.b64encode(jpeg.tobytes()).decode())
+    return frames
+
+
+# ----------------------------------------------------------------------
+# Virtual users
+# ----------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.events = 0
+
+    def record(self, route, seconds, ok):
+        self.latencies.setdefault(route, []).append(seconds * 1000)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return round(sorted_values[index], 1)
+
+
+class VirtualUser:
+    def __init__(self, host, port, index, frames, recorder, timeout):
+        self.host, self.port = host, port
+        self.index = index
+        self.frames = frames
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = {}
+        self.rng = random.Random(index)
+
+    async def call(self, method, path, body=None, route=None):
+        start = time.perf_counter()
+        try:
+            status, data = await http_request(self.host, self.port, method, path, body, self.cookies, self.timeout)
+            ok = status < 400
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            status, data, ok = None, None, False
+        self.recorder.record(route or path, time.perf_counter() - start, ok)
+        return data
+
+    async def login(self, run_id):
+        username, password = f"load_{run_id}_{self.index}", "loadtest"
+        await http_request(self.host, self.port, 'POST', '/register',
+                           {'username': username, 'password': password, 'role': 'child',
+                            'parent_code': None, 'user_type': 'student'}, self.cookies, self.timeout)
+        await http_request(self.host, self.port, 'POST', '/login',
+                           {'username': username, 'password': password}, self.cookies, self.timeout)
+
+    async def detection_loop(self):
+        # Stagger users so they don't all post frames in lockstep
+        await asyncio.sleep(self.rng.uniform(0, FRAME_INTERVAL))
+        while True:
+            started = time.perf_counter()
+            result = await self.call('POST', '/detect_emotion', {'image': self.rng.choice(self.frames)})
+            if result and result.get('success'):
+                await self.call('POST', '/log_emotion', {'emotion': result['dominant_emotion'],
+                                                         'confidence': result['confidence']})
+            # setInterval fires on schedule regardless of how long the request took
+            await asyncio.sleep(max(0.0, FRAME_INTERVAL - (time.perf_counter() - started)))
+
+    async def chat_loop(self):
+        await asyncio.sleep(self.rng.uniform(0, CHAT_INTERVAL))
+        while True:
+            await self.call('POST', '/chat', {'message': self.rng.choice(CHAT_MESSAGES), 'emotion': None})
+            await asyncio.sleep(CHAT_INTERVAL)
+
+    async def hub_loop(self):
+        await asyncio.sleep(self.rng.uniform(0, HUB_INTERVAL))
+        while True:
+            await asyncio.gather(*(self.call('GET', route) for route in HUB_ROUTES))
+            await asyncio.sleep(HUB_INTERVAL)
+
+    async def events_loop(self):
+        """Hold the SSE subscription open and count pushed events"""
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(_encode_request(f"{self.host}:{self.port}", 'GET', '/events', None,
+                                             self.cookies, accept='text/event-stream'))
+                await writer.drain()
+                try:
+                    while True:
+                        line = await reader.readline()
+                        if not line:
+                            break
+                        if line.startswith(b'event:'):
+                            self.recorder.events += 1
+                finally:
+                    writer.close()
+            except OSError:
+                pass
+            await asyncio.sleep(3.0)  # EventSource retry
+
+    def tasks(self, events):
+        loops = [self.detection_loop(), self.chat_loop(), self.hub_loop()]
+        if events:
+            loops.append(self.events_loop())
+        return [asyncio.ensure_future(loop) for loop in loops]
+
+
+async def run_stage(host, port, users, seconds, frames, run_id, events, timeout):
+    recorder = Recorder()
+    vusers = [VirtualUser(host, port, i, frames, recorder, timeout) for i in range(users)]
+    await asyncio.gather(*(u.login(f"{run_id}_{users}") for u in vusers))
+    recorder.__init__()  # registration/login is setup, not load
+
+    tasks = [t for u in vusers for t in u.tasks(events)]
+    started = time.perf_counter()
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    total = errors = 0
+    for route, values in sorted(recorder.latencies.items()):
+        values.sort()
+        route_errors = recorder.errors.get(route, 0)
+        total += len(values)
+        errors += route_errors
+        routes[route] = {
+            'requests': len(values),
+            'errors': route_errors,
+            'rps': round(len(values) / elapsed, 2),
+            'p50_ms': percentile(values, 50),
+            'p95_ms': percentile(values, 95),
+            'p99_ms': percentile(values, 99),
+            'max_ms': round(values[-1], 1)
+        }
+    return {
+        'users': users,
+        'seconds': round(elapsed, 1),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2),
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'sse_events': recorder.events,
+        'routes': routes
+    }
+
+
+def saturation_point(stages):
+    """First stage where the server stops keeping up, plus the reason"""
+    for i, stage in enumerate(stages):
+        detect = stage['routes'].get('/detect_emotion', {})
+        reasons = []
+        if stage['error_rate'] > MAX_ERROR_RATE:
+            reasons.append(f"error rate {stage['error_rate']*100:.1f}%")
+        if detect.get('p95_ms') and detect['p95_ms'] > FRAME_INTERVAL * 1000:
+            reasons.append(f"/detect_emotion p95 {detect['p95_ms']:.0f} ms > {FRAME_INTERVAL*1000:.0f} ms frame interval")
+        if i > 0 and stages[i - 1]['throughput_rps'] > 0:
+            previous = stages[i - 1]
+            linear = previous['throughput_rps'] * stage['users'] / previous['users']
+            if stage['throughput_rps'] < SATURATION_SCALING * linear:
+                reasons.append(f"throughput {stage['throughput_rps']} rps < {SATURATION_SCALING:.0%} "
+                               f"of linear ({linear:.1f} rps)")
+        if reasons:
+            return {
+                'saturated_at_users': stage['users'],
+                'max_sustainable_users': stages[i - 1]['users'] if i > 0 else 0,
+                'reasons': reasons
+            }
+    return {'saturated_at_users': None, 'max_sustainable_users': stages[-1]['users'] if stages else 0,
+            'reasons': ["not saturated; add larger --users stages"]}
+
+
+# ----------------------------------------------------------------------
+# Server under test
+# ----------------------------------------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, workdir):
+    """Launch app.py from this checkout with `workdir` as cwd (fresh neurolens.db / uploads)"""
+    env = {**os.environ, 'PYTHONPATH': REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''),
+           'PYTHONUNBUFFERED': '1'}
+    if kind == 'gunicorn':
+        env['NEUROLENS_BIND'] = f"127.0.0.1:{port}"
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(REPO_DIR, 'gunicorn.conf.py'), 'app:app']
+    else:
+        cmd = [sys.executable, '-c',
+               f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"]
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    return subprocess.Popen(cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(host, port, process=None, timeout=120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"✗ Server exited with code {process.returncode}")
+        try:
+            status, _ = asyncio.run(http_request(host, port, 'GET', '/get_user_info', timeout=5.0))
+            if status < 500:
+                return
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"✗ Server on {host}:{port} not ready after {timeout:.0f}s")
+
+
+def print_stage(stage):
+    print(f"\n👥 {stage['users']} users: {stage['throughput_rps']} req/s, "
+          f"errors {stage['error_rate']*100:.2f}%, SSE events {stage['sse_events']}")
+    print(f"   {'Route':<26} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for route, r in stage['routes'].items():
+        print(f"   {route:<26} {r['rps']:>7} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent webcam users against app.py")
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--stage-seconds', type=float, default=30.0)
+    parser.add_argument('--server', choices=['flask', 'gunicorn', 'none'], default='flask',
+                        help="Server to start in a temp dir ('none': use --url)")
+    parser.add_argument('--url', default=None, help="Existing server (with --server none)")
+    parser.add_argument('--frame-size', default='640x480')
+    parser.add_argument('--no-events', action='store_true', help="Don't hold /events SSE connections")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.frame_size.lower().split('x'))
+    print("=" * 80)
+    print("🔥 NEUROLENS LOAD TEST")
+    print("=" * 80)
+    print(f"Generating synthetic {width}x{height} frames...")
+    frames = make_frames(size=(width, height))
+
+    process, workdir = None, None
+    if args.server == 'none':
+        if not args.url:
+            raise SystemExit("✗ --server none needs --url")
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        workdir = tempfile.mkdtemp(prefix='neurolens_load_')
+        host, port = '127.0.0.1', free_port()
+        print(f"Starting {args.server} server on {host}:{port} (cwd {workdir}, fresh database)...")
+        process = start_server(args.server, port, workdir)
+
+    stages = []
+    try:
+        wait_until_ready(host, port, process)
+        run_id = str(int(time.time()))
+        for users in args.users:
+            stage = asyncio.run(run_stage(host, port, users, args.stage_seconds, frames, run_id,
+                                          not args.no_events, args.timeout))
+            stages.append(stage)
+            print_stage(stage)
+            if saturation_point(stages)['saturated_at_users'] == users:
+                print("\n⚠️  Saturated; skipping larger stages")
+                break
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    saturation = saturation_point(stages)
+    print("\n" + "=" * 80)
+    if saturation['saturated_at_users']:
+        print(f"📈 Saturation at {saturation['saturated_at_users']} users "
+              f"(max sustainable: {saturation['max_sustainable_users']}): {'; '.join(saturation['reasons'])}")
+    else:
+        print(f"📈 No saturation up to {saturation['max_sustainable_users']} users")
+    print("=" * 80)
+
+    results = {
+        'config': {**vars(args), 'frame_interval_s': FRAME_INTERVAL, 'chat_interval_s': CHAT_INTERVAL,
+                   'hub_interval_s': HUB_INTERVAL, 'server_log': os.path.join(workdir, 'server.log') if workdir else None},
+        'stages': stages,
+        'saturation': saturation
+    }
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or '.', exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,445 @@
+"""
+Request / database / inference instrumentation served in Prometheus text format
+
+    import metrics
+    metrics.init_app(app)                      # per-route counters, latency, in-flight, DB time + GET /metrics
+    with metrics.time_inference('deepface'):   # model time
+        result = DeepFace.analyze(...)
+
+init_app() also wraps sqlite3.connect so every connection any module opens
+(database.py, resilience_builder.py, ...) times its execute/fetch/commit
+calls, and hooks the same timers into storage.py's PostgreSQL cursors;
+each request's total lands in neurolens_request_db_seconds{route}.
+
+The hot path is a perf_counter pair, a few dict lookups and one lock per
+observation (a few microseconds against millisecond requests).
+
+Under gunicorn every worker has its own counters. Set NEUROLENS_METRICS_DIR
+to a shared directory: workers snapshot their registry there (at most every
+SNAPSHOT_INTERVAL seconds) and /metrics serves the sum over all workers.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_DIR_ENV = 'NEUROLENS_METRICS_DIR'
+SNAPSHOT_INTERVAL = 5.0
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def samples(self):
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1.0, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1.0, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount=1.0, *labels):
+        self.inc(-amount, *labels)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = float(value)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        # Per-bucket (non-cumulative) counts; render() accumulates
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _copy(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def snapshot(self):
+        """JSON-able state of every metric (what workers write to NEUROLENS_METRICS_DIR)"""
+        return {
+            'pid': os.getpid(),
+            'metrics': {
+                m.name: {
+                    'kind': m.kind,
+                    'help': m.help,
+                    'labels': list(m.labels),
+                    'buckets': list(getattr(m, 'buckets', ())),
+                    'samples': [[list(key), value] for key, value in m.samples()]
+                }
+                for m in self._metrics.values()
+            }
+        }
+
+
+def merge_snapshots(snapshots):
+    """Sum snapshots from several processes into one"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot['metrics'].items():
+            target = merged.setdefault(name, {**metric, 'samples': {}})
+            for key, value in metric['samples']:
+                key = tuple(key)
+                current = target['samples'].get(key)
+                if current is None:
+                    target['samples'][key] = value
+                elif metric['kind'] == 'histogram':
+                    target['samples'][key] = [[a + b for a, b in zip(current[0], value[0])],
+                                              current[1] + value[1], current[2] + value[2]]
+                else:
+                    target['samples'][key] = current + value
+    for metric in merged.values():
+        metric['samples'] = [[list(key), value] for key, value in metric['samples'].items()]
+    return {'metrics': merged}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    """Prometheus text exposition format (0.0.4)"""
+    lines = []
+    for name, metric in sorted(snapshot['metrics'].items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric['labels']
+        for key, value in sorted(metric['samples']):
+            if metric['kind'] == 'histogram':
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(list(metric['buckets']) + [float('inf')], counts):
+                    cumulative += bucket_count
+                    le = 'le="' + _number(float(bound)) + '"'
+                    lines.append(f"{name}_bucket{_label_text(names, key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(names, key)} {_number(float(total))}")
+                lines.append(f"{name}_count{_label_text(names, key)} {count}")
+            else:
+                lines.append(f"{name}{_label_text(names, key)} {_number(float(value))}")
+    return '\n'.join(lines) + '\n'
+
+
+# ----------------------------------------------------------------------
+# NeuroLens metrics
+# ----------------------------------------------------------------------
+REGISTRY = Registry()
+REQUESTS = REGISTRY.counter('neurolens_requests_total', 'HTTP requests by route, method and status',
+                            ('route', 'method', 'status'))
+LATENCY = REGISTRY.histogram('neurolens_request_seconds', 'Request latency by route (time to response)',
+                             ('route', 'method'))
+IN_FLIGHT = REGISTRY.gauge('neurolens_requests_in_flight', 'Requests currently being handled')
+REQUEST_DB = REGISTRY.histogram('neurolens_request_db_seconds', 'Database time spent inside one request',
+                                ('route',))
+DB_QUERIES = REGISTRY.counter('neurolens_db_queries_total', 'Database statements by operation', ('operation',))
+DB_SECONDS = REGISTRY.counter('neurolens_db_seconds_total', 'Database time (execute + fetch + commit) by operation',
+                              ('operation',))
+INFERENCE = REGISTRY.histogram('neurolens_inference_seconds', 'Model inference time', ('model',))
+ERRORS = REGISTRY.counter('neurolens_errors_total', 'Handled errors by location', ('where',))
+
+_local = threading.local()
+
+
+def record_error(where):
+    ERRORS.inc(1.0, where)
+
+
+@contextmanager
+def time_inference(model):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        INFERENCE.observe(time.perf_counter() - start, model)
+
+
+# ----------------------------------------------------------------------
+# Database timing (sqlite3.connect wrapper; storage.QUERY_HOOKS for PostgreSQL)
+# ----------------------------------------------------------------------
+def _db_time(seconds, operation=None):
+    DB_SECONDS.inc(seconds, operation or 'FETCH')
+    if operation is not None:
+        DB_QUERIES.inc(1.0, operation)
+    if getattr(_local, 'db_seconds', None) is not None:
+        _local.db_seconds += seconds
+
+
+def _operation(sql):
+    return sql.lstrip().split(None, 1)[0].upper() if sql and sql.strip() else 'OTHER'
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _db_time(time.perf_counter() - start, _operation(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _db_time(time.perf_counter() - start, _operation(sql))
+
+    # SQLite steps lazily: most of a SELECT's work happens while fetching
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _db_time(time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            _db_time(time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _db_time(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _db_time(time.perf_counter() - start, 'COMMIT')
+
+
+def _storage_time(seconds, sql=None):
+    _db_time(seconds, None if sql is None else _operation(sql))
+
+
+def instrument_storage():
+    """Time PostgreSQL statements run through storage.py (idempotent; SQLite is covered by instrument_sqlite)"""
+    import storage
+    if _storage_time not in storage.QUERY_HOOKS:
+        storage.QUERY_HOOKS.append(_storage_time)
+
+
+def instrument_sqlite():
+    """Make every later sqlite3.connect() return a TimedConnection (idempotent)"""
+    if getattr(sqlite3.connect, 'instrumented', False):
+        return
+    original = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        if len(args) < 6:  # factory (6th parameter) not given positionally
+            kwargs.setdefault('factory', TimedConnection)
+        return original(*args, **kwargs)
+
+    connect.instrumented = True
+    sqlite3.connect = connect
+
+
+# ----------------------------------------------------------------------
+# Multi-worker snapshots
+# ----------------------------------------------------------------------
+_last_snapshot = [0.0]
+_process = {'pid': None, 'token': None}
+
+
+def _start_time(pid):
+    """Start time of the process in clock ticks since boot (Linux /proc), or None"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _process_token():
+    """Identifies this process even after its pid is reused by a later worker"""
+    pid = os.getpid()
+    if _process['pid'] != pid:
+        _process['pid'] = pid
+        _process['token'] = _start_time(pid) or uuid.uuid4().hex[:12]
+    return _process['token']
+
+
+def _alive(snapshot):
+    if not _pid_alive(snapshot['pid']):
+        return False
+    started = _start_time(snapshot['pid'])
+    return started is None or started == snapshot.get('token')
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def write_snapshot(directory, force=False):
+    now = time.monotonic()
+    if not force and now - _last_snapshot[0] < SNAPSHOT_INTERVAL:
+        return
+    _last_snapshot[0] = now
+    os.makedirs(directory, exist_ok=True)
+    snapshot = REGISTRY.snapshot()
+    snapshot['token'] = _process_token()
+    # One file per process, not per pid: a new worker that gets a dead
+    # worker's pid must not overwrite (and so lose) the dead worker's counts
+    path = os.path.join(directory, f"{snapshot['pid']}-{snapshot['token']}.json")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def collect(directory=None):
+    """This process's metrics, or the sum over every worker snapshot in `directory`"""
+    if not directory:
+        return REGISTRY.snapshot()
+    write_snapshot(directory, force=True)
+    snapshots = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not _alive(snapshot):
+            # A dead worker's requests still count; its in-flight gauge doesn't
+            snapshot['metrics'] = {n: m for n, m in snapshot['metrics'].items() if m['kind'] != 'gauge'}
+        snapshots.append(snapshot)
+    return merge_snapshots(snapshots)
+
+
+# ----------------------------------------------------------------------
+# Flask integration
+# ----------------------------------------------------------------------
+def init_app(app, metrics_dir=None):
+    """Instrument every request of a Flask app and serve GET /metrics"""
+    from flask import Response, g, request
+
+    metrics_dir = metrics_dir or os.environ.get(METRICS_DIR_ENV)
+    instrument_sqlite()
+    instrument_storage()
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_start = time.perf_counter()
+        g.metrics_status = 500
+        _local.db_seconds = 0.0
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def _metrics_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        # Rule pattern, not the raw path, so /get_anchor/<id> stays one series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUESTS.inc(1.0, route, request.method, str(g.pop('metrics_status', 500)))
+        LATENCY.observe(elapsed, route, request.method)
+        REQUEST_DB.observe(_local.db_seconds or 0.0, route)
+        _local.db_seconds = None
+        IN_FLIGHT.dec()
+        if metrics_dir:
+            write_snapshot(metrics_dir)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(render(collect(metrics_dir)), content_type=CONTENT_TYPE)
+
+    return app
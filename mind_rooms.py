@@ -1,10 +1,9 @@
-import sqlite3
-from datetime import datetime, timedelta
+import storage
 from collections import Counter
 import random
 
 class MindRooms:
-    def __init__(self, db_path='neurolens.db'):
+    def __init__(self, db_path=None):
         self.db_path = db_path
         self.rooms = {
             'serenity': {'name': 'Serenity Space', 'emotions': ['calm', 'happy', 'neutral'], 'color': '#4FC3F7', 'sound': 'ocean', 'bpm': 60},
@@ -14,9 +13,9 @@ class MindRooms:
         }
     
     def get_user_emotion_vector(self, user_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
-        cutoff = (datetime.now() - timedelta(hours=6)).isoformat()
+        cutoff = storage.ago(hours=6)
         c.execute('SELECT emotion FROM emotion_logs WHERE user_id=? AND timestamp > ?', (user_id, cutoff))
         emotions = [row[0] for row in c.fetchall()]
         conn.close()
@@ -0,0 +1,284 @@
+"""
+NeuroLens Model Registry
+Versioned checkpoints with a manifest and an atomic "current" pointer.
+
+Layout:
+    checkpoints/manifest.json          - versions + current pointer
+    checkpoints/versions/<version>/    - one immutable directory per version
+
+Run: python model_registry.py list
+     python model_registry.py register checkpoints/best_emotion_model.h5 --script train_real_model.py --promote
+     python model_registry.py promote v0002
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Checkpoints probed before the registry existed, in priority order
+LEGACY_MODEL_PATHS = [
+    'checkpoints/best_emotion_model.h5',
+    'checkpoints/emotion_model.h5',
+    'checkpoints/best_image_model.h5',
+    'emotion_model.h5'
+]
+LEGACY_CLASS_INDICES = 'checkpoints/class_indices.json'
+
+
+class ModelRegistry:
+    def __init__(self, checkpoint_dir='checkpoints', results_path='training_results.json'):
+        self.checkpoint_dir = checkpoint_dir
+        self.versions_dir = os.path.join(checkpoint_dir, 'versions')
+        self.manifest_path = os.path.join(checkpoint_dir, 'manifest.json')
+        self.results_path = results_path
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Manifest I/O
+    # ------------------------------------------------------------------
+    def load_manifest(self):
+        """Read the manifest, or an empty one if nothing was registered yet"""
+        if not os.path.exists(self.manifest_path):
+            return {'current': None, 'versions': {}}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        """Write to a temp file and os.replace() it so readers never see a partial manifest"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    @contextmanager
+    def _exclusive(self):
+        """Cross-process lock around read-modify-write of the manifest"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            with open(self.manifest_path + '.lock', 'w') as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def manifest_mtime(self):
+        """Cheap change detector for watchers"""
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+    def _next_version(self, manifest):
+        numbers = [int(v[1:]) for v in manifest['versions'] if v[1:].isdigit()]
+        return f"v{(max(numbers) + 1 if numbers else 1):04d}"
+
+    def _training_metrics(self, script):
+        """Latest successful entry for `script` from training_results.json"""
+        if not script or not os.path.exists(self.results_path):
+            return {}
+        try:
+            with open(self.results_path, 'r') as f:
+                results = json.load(f).get('results', [])
+        except (OSError, ValueError):
+            return {}
+        matches = [r for r in results if r.get('script') == script and r.get('success')]
+        if not matches:
+            return {}
+        latest = max(matches, key=lambda r: r.get('timestamp', ''))
+        return {k: v for k, v in latest.items() if k not in ('script', 'name', 'success')}
+
+    def register(self, model_path, class_indices=None, input_shape=None, metrics=None,
+                 script=None, kind='emotion', heads=None, promote=None):
+        """Copy a trained checkpoint into an immutable version directory.
+
+        promote=True makes it current, False never does, and None (default)
+        makes it current only when nothing is registered as current yet."""
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(model_path)
+
+        if class_indices is None and os.path.exists(LEGACY_CLASS_INDICES):
+            with open(LEGACY_CLASS_INDICES, 'r') as f:
+                class_indices = json.load(f)
+
+        if input_shape is None:
+            input_shape = self._probe_input_shape(model_path)
+
+        all_metrics = self._training_metrics(script)
+        all_metrics.update(metrics or {})
+
+        with self._exclusive():
+            manifest = self.load_manifest()
+            version = self._next_version(manifest)
+            version_dir = os.path.join(self.versions_dir, version)
+            os.makedirs(version_dir, exist_ok=True)
+
+            # Always a real copy: a hard link would follow the next training run's
+            # overwrite of the checkpoint and silently change this version
+            target = os.path.join(version_dir, os.path.basename(model_path))
+            tmp = target + '.tmp'
+            shutil.copy2(model_path, tmp)
+            os.replace(tmp, target)
+
+            entry = {
+                'version': version,
+                'path': target,
+                'kind': kind,
+                'source': model_path,
+                'script': script,
+                'sha256': _file_sha256(target),
+                'class_indices': class_indices,
+                'input_shape': list(input_shape) if input_shape else None,
+                'heads': heads,
+                'metrics': all_metrics,
+                'created_at': datetime.now().isoformat()
+            }
+            with open(os.path.join(version_dir, 'metadata.json'), 'w') as f:
+                json.dump(entry, f, indent=2)
+
+            manifest['versions'][version] = entry
+            if promote or (promote is None and manifest.get('current') is None):
+                manifest['previous'] = manifest.get('current')
+                manifest['current'] = version
+            self._write_manifest(manifest)
+
+        print(f"📦 Registered {model_path} as {version}" + (" (current)" if manifest['current'] == version else ""))
+        return entry
+
+    def promote(self, version):
+        """Atomically move the current pointer to `version`"""
+        with self._exclusive():
+            manifest = self.load_manifest()
+            if version not in manifest['versions']:
+                raise KeyError(f"Unknown model version: {version}")
+            manifest['previous'] = manifest.get('current')
+            manifest['current'] = version
+            self._write_manifest(manifest)
+        print(f"🔀 Current model is now {version}")
+        return manifest['versions'][version]
+
+    def rollback(self):
+        """Point back at the version that was current before the last promote"""
+        previous = self.load_manifest().get('previous')
+        if not previous:
+            raise KeyError("No previous version to roll back to")
+        return self.promote(previous)
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+    def resolve(self, version=None):
+        """Entry for `version` (default: current), falling back to the legacy checkpoint paths"""
+        manifest = self.load_manifest()
+        version = version or manifest.get('current')
+        if version and version in manifest['versions']:
+            return manifest['versions'][version]
+
+        for model_path in LEGACY_MODEL_PATHS:
+            if os.path.exists(model_path):
+                class_indices = None
+                if os.path.exists(LEGACY_CLASS_INDICES):
+                    with open(LEGACY_CLASS_INDICES, 'r') as f:
+                        class_indices = json.load(f)
+                return {
+                    'version': f"legacy:{model_path}",
+                    'path': model_path,
+                    'kind': 'emotion',
+                    'class_indices': class_indices,
+                    'input_shape': None,
+                    'metrics': {}
+                }
+        return None
+
+    def list_versions(self):
+        manifest = self.load_manifest()
+        return manifest.get('current'), sorted(manifest['versions'].values(), key=lambda e: e['version'])
+
+    def _probe_input_shape(self, model_path):
+        try:
+            from tensorflow.keras.models import load_model
+            return load_model(model_path, compile=False).input_shape[1:]
+        except Exception as e:
+            print(f"⚠️  Could not read input shape from {model_path}: {e}")
+            return None
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NeuroLens model registry")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('list', help="Show registered versions")
+
+    register_cmd = sub.add_parser('register', help="Register a trained checkpoint")
+    register_cmd.add_argument('model_path')
+    register_cmd.add_argument('--script', help="Training script, used to pull metrics from training_results.json")
+    register_cmd.add_argument('--class-indices', help="Path to a class_indices.json")
+    register_cmd.add_argument('--kind', default='emotion')
+    register_cmd.add_argument('--promote', action='store_true')
+
+    promote_cmd = sub.add_parser('promote', help="Switch the current pointer")
+    promote_cmd.add_argument('version')
+
+    sub.add_parser('rollback', help="Switch back to the previous version")
+
+    args = parser.parse_args()
+    registry = ModelRegistry()
+
+    if args.command == 'list':
+        current, versions = registry.list_versions()
+        if not versions:
+            print("⚠️  No registered models. Legacy checkpoint:", (registry.resolve() or {}).get('path'))
+            return
+        print(f"{'':2}{'Version':<10} {'Kind':<10} {'Input':<15} {'Accuracy':<10} {'Created':<20} Path")
+        print("─" * 100)
+        for e in versions:
+            marker = '→ ' if e['version'] == current else '  '
+            acc = e.get('metrics', {}).get('accuracy')
+            acc = f"{acc}%" if acc is not None else 'N/A'
+            shape = 'x'.join(str(d) for d in e['input_shape']) if e.get('input_shape') else '?'
+            print(f"{marker}{e['version']:<10} {e.get('kind', 'emotion'):<10} {shape:<15} {acc:<10} "
+                  f"{e['created_at'][:19]:<20} {e['path']}")
+    elif args.command == 'register':
+        class_indices = None
+        if args.class_indices:
+            with open(args.class_indices, 'r') as f:
+                class_indices = json.load(f)
+        registry.register(args.model_path, class_indices=class_indices, script=args.script,
+                          kind=args.kind, promote=args.promote or None)
+    elif args.command == 'promote':
+        registry.promote(args.version)
+    elif args.command == 'rollback':
+        registry.rollback()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Compact binary .mooddna export (columnar, versioned)
+
+The JSON export repeats four keys and a 64-char hex hash per record. This
+format stores the same records column by column in independently
+compressed blocks, so it can be written and read as a stream:
+
+    file   := MAGIC  version:u8  codec:u8  meta_len:u32  meta(JSON)  block*  end
+    block  := payload_len:u32  count:u32  compress(payload)
+    end    := payload_len=0, count=0
+    payload:= dict_len:u16 emotions(JSON list)  base_ts:i64
+              hashes[count * 32 bytes]                raw SHA-256 digests
+              deltas[(count - 1) * i32]               epoch seconds, delta-encoded
+              intensities[count * u8]                 round(confidence * 100)
+              emotion_codes[count * u8]               index into the block's emotion list
+
+Everything is little-endian. Blocks are compressed with zstd when the
+`zstandard` package is installed, zlib otherwise; the codec is recorded in
+the header.
+
+    writer = MoodDNAWriter({'user_id_hash': ...})
+    out.write(writer.header())
+    out.write(writer.encode_block(hashes, timestamps, intensities, emotions))
+    out.write(writer.end())
+
+    reader = MoodDNAReader(open(path, 'rb'))
+    reader.metadata; reader.columns(); reader.records()
+"""
+
+import sys
+import json
+import zlib
+import struct
+from array import array
+from datetime import datetime, timezone
+from itertools import accumulate
+
+MAGIC = b'MOODDNA\x00'
+VERSION = 1
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+HASH_SIZE = 32
+MAX_EMOTIONS = 256
+
+_HEADER = struct.Struct('<BBI')
+_BLOCK = struct.Struct('<II')
+_BASE = struct.Struct('<Hq')
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def default_codec():
+    return CODEC_ZSTD if _zstd() is not None else CODEC_ZLIB
+
+
+def _compressor(codec, level):
+    if codec == CODEC_ZSTD:
+        zstandard = _zstd()
+        if zstandard is None:
+            raise ValueError("this .mooddna file is zstd-compressed; install the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=level or 3).compress, zstandard.ZstdDecompressor().decompress
+    if codec == CODEC_ZLIB:
+        # Level 1: most of a block is SHA-256 digests, which no level can shrink
+        return (lambda data: zlib.compress(data, level or 1)), zlib.decompress
+    raise ValueError(f"unknown .mooddna codec {codec}")
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def to_epoch(timestamp):
+    """'YYYY-MM-DD HH:MM:SS' (SQLite CURRENT_TIMESTAMP, UTC), ISO string or datetime -> epoch seconds"""
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.fromisoformat(str(timestamp))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp())
+
+
+def to_iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+class MoodDNAWriter:
+    """Encodes the header, blocks and end marker as bytes (caller decides where they go)"""
+
+    def __init__(self, metadata, codec=None, level=None):
+        self.metadata = metadata
+        self.codec = default_codec() if codec is None else codec
+        self._compress, _ = _compressor(self.codec, level)
+
+    def header(self):
+        meta = json.dumps(self.metadata).encode()
+        return MAGIC + _HEADER.pack(VERSION, self.codec, len(meta)) + meta
+
+    def encode_block(self, hashes, timestamps, intensities, emotions):
+        """One block from equal-length columns: raw 32-byte digests, epoch
+        seconds, intensities in [0, 1] and emotion labels"""
+        count = len(hashes)
+        if not count:
+            return b''
+        if not (len(timestamps) == len(intensities) == len(emotions) == count):
+            raise ValueError("all columns must have the same length")
+
+        labels = list(dict.fromkeys(emotions))
+        if len(labels) > MAX_EMOTIONS:
+            raise ValueError(f"at most {MAX_EMOTIONS} distinct emotions per block")
+        index = {label: i for i, label in enumerate(labels)}
+        names = json.dumps(labels).encode()
+
+        digests = b''.join(hashes)
+        if len(digests) != count * HASH_SIZE:
+            raise ValueError(f"hashes must be raw {HASH_SIZE}-byte digests")
+        deltas = array('i', [b - a for a, b in zip(timestamps, timestamps[1:])])
+        levels = bytes([min(max(int(round((value or 0.0) * 100)), 0), 100) for value in intensities])
+        codes = bytes([index[label] for label in emotions])
+
+        payload = b''.join([_BASE.pack(len(names), timestamps[0]), names, digests,
+                            _little_endian(deltas).tobytes(), levels, codes])
+        compressed = self._compress(payload)
+        return _BLOCK.pack(len(compressed), count) + compressed
+
+    def end(self):
+        return _BLOCK.pack(0, 0)
+
+
+class MoodDNAReader:
+    """Streaming reader over a binary file object"""
+
+    def __init__(self, fileobj):
+        self.file = fileobj
+        magic = self._read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError("not a binary .mooddna file")
+        self.version, self.codec, meta_len = _HEADER.unpack(self._read(_HEADER.size))
+        if self.version > VERSION:
+            raise ValueError(f".mooddna version {self.version} is newer than this reader ({VERSION})")
+        _, self._decompress = _compressor(self.codec, None)
+        self.metadata = json.loads(self._read(meta_len))
+
+    def _read(self, size):
+        data = self.file.read(size)
+        if len(data) != size:
+            raise ValueError("truncated .mooddna file")
+        return data
+
+    def blocks(self):
+        """Yield (hashes, timestamps, intensities, emotions) columns per block"""
+        while True:
+            length, count = _BLOCK.unpack(self._read(_BLOCK.size))
+            if not length:
+                return
+            payload = self._decompress(self._read(length))
+            names_len, base = _BASE.unpack_from(payload)
+            offset = _BASE.size
+            labels = json.loads(payload[offset:offset + names_len])
+            offset += names_len
+
+            digests = payload[offset:offset + count * HASH_SIZE]
+            offset += count * HASH_SIZE
+            deltas = array('i')
+            deltas.frombytes(payload[offset:offset + (count - 1) * 4])
+            offset += (count - 1) * 4
+            levels = payload[offset:offset + count]
+            codes = payload[offset + count:offset + 2 * count]
+            if len(codes) != count:
+                raise ValueError("corrupt .mooddna block")
+
+            hashes = [digests[i:i + HASH_SIZE] for i in range(0, len(digests), HASH_SIZE)]
+            timestamps = list(accumulate(_little_endian(deltas), initial=base))
+            intensities = [level / 100 for level in levels]
+            emotions = [labels[code] for code in codes]
+            yield hashes, timestamps, intensities, emotions
+
+    def columns(self):
+        """All blocks concatenated into one dict of columns"""
+        result = {'hashes': [], 'timestamps': [], 'intensities': [], 'emotions': []}
+        for hashes, timestamps, intensities, emotions in self.blocks():
+            result['hashes'].extend(hashes)
+            result['timestamps'].extend(timestamps)
+            result['intensities'].extend(intensities)
+            result['emotions'].extend(emotions)
+        return result
+
+    def records(self):
+        """Records shaped like the JSON export (plus the emotion label)"""
+        for hashes, timestamps, intensities, emotions in self.blocks():
+            for digest, epoch, intensity, emotion in zip(hashes, timestamps, intensities, emotions):
+                yield {
+                    'moodhash': digest.hex(),
+                    'timestamp': to_iso(epoch),
+                    'intensity': intensity,
+                    'emotion': emotion,
+                    'encrypted': True
+                }
+
+
+def read_mooddna(path):
+    """(metadata, columns) of a binary .mooddna file"""
+    with open(path, 'rb') as f:
+        reader = MoodDNAReader(f)
+        return reader.metadata, reader.columns()
@@ -1,4 +1,4 @@
-import sqlite3
+import storage
 import random
 from datetime import datetime
 
@@ -59,23 +59,7 @@ class NeuroChallenges:
         self.init_db()
     
     def init_db(self):
-        conn = sqlite3.connect('neurolens.db')
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS user_stats (
-            user_id INTEGER PRIMARY KEY,
-            coins INTEGER DEFAULT 0,
-            streak INTEGER DEFAULT 0,
-            last_challenge DATE
-        )''')
-        c.execute('''CREATE TABLE IF NOT EXISTS challenge_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            challenge_id INTEGER,
-            completed INTEGER,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )''')
-        conn.commit()
-        conn.close()
+        storage.ensure_schema('user_stats', 'challenge_logs')
     
     def get_daily_challenge(self):
         return random.choice(self.challenges)
@@ -102,7 +86,7 @@ class NeuroChallenges:
         elif accuracy >= 75:
             earned_coins += 3
         
-        conn = sqlite3.connect('neurolens.db')
+        conn = storage.connect()
         c = conn.cursor()
         
         # Update user stats
@@ -113,12 +97,12 @@ class NeuroChallenges:
             new_coins = result[0] + earned_coins
             new_streak = result[1] + 1
             c.execute('UPDATE user_stats SET coins = ?, streak = ?, last_challenge = ? WHERE user_id = ?',
-                     (new_coins, new_streak, datetime.now().date(), user_id))
+                     (new_coins, new_streak, datetime.now().date().isoformat(), user_id))
         else:
             new_coins = earned_coins
             new_streak = 1
             c.execute('INSERT INTO user_stats (user_id, coins, streak, last_challenge) VALUES (?, ?, ?, ?)',
-                     (user_id, new_coins, new_streak, datetime.now().date()))
+                     (user_id, new_coins, new_streak, datetime.now().date().isoformat()))
         
         # Log challenge completion
         c.execute('INSERT INTO challenge_logs (user_id, challenge_id, completed) VALUES (?, ?, 1)',
@@ -136,7 +120,7 @@ class NeuroChallenges:
         }
     
     def get_user_stats(self, user_id):
-        conn = sqlite3.connect('neurolens.db')
+        conn = storage.connect()
         c = conn.cursor()
         c.execute('SELECT coins, streak FROM user_stats WHERE user_id = ?', (user_id,))
         result = c.fetchone()
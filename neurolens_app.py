@@ -4,11 +4,15 @@ import torchaudio
 import numpy as np
 import sounddevice as sd
 import queue
+import json
 import torch.nn.functional as F
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from shared_weights import load_torch_model
+from fusion_engine.fusion import FusionEngine
+from capture_service import CaptureService
 
 # ======================
 # Setup App
@@ -20,14 +24,30 @@ templates = Jinja2Templates(directory="templates")
 # ======================
 # Load Models
 # ======================
-image_model = torch.load("models/image_model.pth", map_location="cpu")
-voice_model = torch.load("models/voice_model.pth", map_location="cpu")
+# Memory-mapped so every worker process shares the same weight pages
+image_model = load_torch_model("models/image_model.pth")
+voice_model = load_torch_model("models/voice_model.pth")
 image_model.eval()
 voice_model.eval()
 
 image_classes = ["angry", "disgust", "fear", "happy"]
 voice_classes = ["sad", "euphoric", "joyful", "surprised"]
 
+# Both heads are mapped onto one emotion taxonomy and fused as they arrive
+fusion = FusionEngine()
+SESSION = "local"  # one camera + one microphone per process
+
+# The camera stays open; handlers read the newest frame and infer on a thread pool
+capture = CaptureService(device=0)
+
+@app.on_event("startup")
+async def start_capture():
+    capture.start()
+
+@app.on_event("shutdown")
+async def stop_capture():
+    capture.stop()
+
 # ======================
 # Audio Setup
 # ======================
@@ -37,23 +57,21 @@ def audio_callback(indata, frames, time, status):
     q.put(indata.copy())
 
 sd.InputStream(callback=audio_callback, channels=1, samplerate=sr).start()
+mfcc_transform = torchaudio.transforms.MFCC(n_mfcc=40)
 
 def get_audio_prediction():
     if not q.empty():
         audio = q.get().flatten()
         waveform = torch.tensor(audio, dtype=torch.float32).unsqueeze(0)
-        mfcc = torchaudio.transforms.MFCC(n_mfcc=40)(waveform).unsqueeze(0)
+        mfcc = mfcc_transform(waveform).unsqueeze(0)
         with torch.no_grad():
             out = voice_model(mfcc)
             probs = F.softmax(out, dim=1).numpy()[0]
         return {cls: float(p) for cls, p in zip(voice_classes, probs)}
     return None
 
-def get_image_prediction():
-    cap = cv2.VideoCapture(0)
-    ret, frame = cap.read()
-    cap.release()
-    if not ret:
+def get_image_prediction(frame):
+    if frame is None:
         return None
     img = cv2.resize(frame, (128,128))
     img = torch.tensor(img, dtype=torch.float32).permute(2,0,1).unsqueeze(0) / 255.0
@@ -69,8 +87,29 @@ def get_image_prediction():
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+def predict_frame(frame, timestamp=None):
+    """Blocking inference for one frame + any queued audio (runs on the capture thread pool)"""
+    image_probs = get_image_prediction(frame)
+    voice_probs = get_audio_prediction()
+    if image_probs:
+        fusion.update(SESSION, "face", image_probs, timestamp=timestamp)
+    if voice_probs:
+        fusion.update(SESSION, "voice", voice_probs)
+    return {"image": image_probs, "voice": voice_probs, "fused": fusion.current(SESSION)}
+
 @app.get("/predict")
 async def predict():
-    image_probs = get_image_prediction()
-    voice_probs = get_audio_prediction()
-    return JSONResponse({"image": image_probs, "voice": voice_probs})
+    frame, seq, timestamp = capture.latest()
+    return JSONResponse(await capture.run(predict_frame, frame, timestamp))
+
+@app.get("/predict/stream")
+async def predict_stream(request: Request, interval: float = 0.5):
+    """Server-Sent Events: one prediction per new camera frame, at most every `interval` seconds"""
+    async def events():
+        async for frame, seq, timestamp in capture.frames(min_interval=interval):
+            if await request.is_disconnected():
+                break
+            result = await capture.run(predict_frame, frame, timestamp)
+            yield f"id: {seq}\ndata: {json.dumps({**result, 'timestamp': timestamp})}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -1,31 +1,21 @@
-import sqlite3
-from datetime import datetime, timedelta
+import storage
+from datetime import datetime
 import statistics
 
 class ResilienceBuilder:
-    def __init__(self, db_path='neurolens.db'):
+    def __init__(self, db_path=None):
         self.db_path = db_path
         self._init_db()
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS resilience_metrics
-                     (user_id INTEGER, week_start TEXT, score REAL, 
-                      volatility REAL, recovery_speed REAL, positive_ratio REAL,
-                      PRIMARY KEY (user_id, week_start))''')
-        c.execute('''CREATE TABLE IF NOT EXISTS weekly_goals
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
-                      week_start TEXT, goal_text TEXT, completed INTEGER DEFAULT 0)''')
-        conn.commit()
-        conn.close()
+        storage.ensure_schema('resilience_metrics', 'weekly_goals', path=self.db_path)
     
     def calculate_resilience_score(self, user_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         
         # Get last 7 days of emotions
-        week_ago = (datetime.now() - timedelta(days=7)).isoformat()
+        week_ago = storage.ago(days=7)
         c.execute('''SELECT emotion, timestamp FROM emotion_logs 
                      WHERE user_id=? AND timestamp > ? ORDER BY timestamp''',
                   (user_id, week_ago))
@@ -78,17 +68,21 @@ class ResilienceBuilder:
     
     def save_weekly_metrics(self, user_id, metrics):
         week_start = datetime.now().strftime('%Y-%W')
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
-        c.execute('''INSERT OR REPLACE INTO resilience_metrics 
+        c.execute('''INSERT INTO resilience_metrics 
                      (user_id, week_start, score, volatility, recovery_speed, positive_ratio)
-                     VALUES (?, ?, ?, ?, ?, ?)''',
+                     VALUES (?, ?, ?, ?, ?, ?)
+                     ON CONFLICT (user_id, week_start) DO UPDATE SET
+                     score = excluded.score, volatility = excluded.volatility,
+                     recovery_speed = excluded.recovery_speed, positive_ratio = excluded.positive_ratio''',
                   (user_id, week_start, metrics['score'], metrics['volatility'],
                    metrics['recovery_speed'], metrics['positive_ratio']))
         conn.commit()
         conn.close()
     
-    def generate_weekly_goal(self, user_id, metrics):
+    def weekly_goal(self, metrics):
+        """Goal text for the metrics, without recording it"""
         score = metrics['score']
         recovery = metrics['recovery_speed']
         positive = metrics['positive_ratio']
@@ -103,9 +97,12 @@ class ResilienceBuilder:
             goal = "Start small: take 3 deep breaths when you feel overwhelmed."
         else:
             goal = "Keep building resilience — try a 5-minute mindfulness break today."
-        
+        return goal
+    
+    def generate_weekly_goal(self, user_id, metrics):
+        goal = self.weekly_goal(metrics)
         week_start = datetime.now().strftime('%Y-%W')
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('INSERT INTO weekly_goals (user_id, week_start, goal_text) VALUES (?, ?, ?)',
                   (user_id, week_start, goal))
@@ -115,7 +112,7 @@ class ResilienceBuilder:
         return goal
     
     def get_weekly_trend(self, user_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = storage.connect(self.db_path)
         c = conn.cursor()
         c.execute('''SELECT week_start, score FROM resilience_metrics 
                      WHERE user_id=? ORDER BY week_start DESC LIMIT 4''', (user_id,))
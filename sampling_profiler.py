@@ -0,0 +1,263 @@
+"""
+In-process sampling profiler for live Flask workers
+
+A daemon thread snapshots the Python stacks of the request threads
+(sys._current_frames) every `interval` seconds and counts identical
+stacks, so a profile shows where wall time goes: DeepFace, cv2.imdecode,
+EmotionTwin's loops, waiting on SQLite locks, ...
+
+Overhead is capped: the sampler times itself and, whenever sampling costs
+more than `max_overhead` of wall time, doubles its interval.
+
+Disabled unless NEUROLENS_PROFILER_TOKEN is set; every call must send that
+token in an X-Admin-Token header.
+
+    GET /admin/profile?seconds=10&format=speedscope    all request threads for N seconds
+    any route with "X-Profile: 1"                        just that request; the response
+                                                         carries X-Profile-Result: /admin/profile/result/<id>
+    GET /admin/profile/result/<id>                       download it (last RESULTS_KEPT kept)
+
+One profile of either kind runs per worker at a time; the others get 409.
+
+Open .speedscope.json files at https://www.speedscope.app; collapsed output
+works with flamegraph.pl / inferno.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import hmac
+import threading
+from collections import Counter, OrderedDict
+
+TOKEN_ENV = 'NEUROLENS_PROFILER_TOKEN'
+DEFAULT_INTERVAL = 0.01
+MAX_OVERHEAD = 0.01
+MAX_SECONDS = 60.0
+RESULTS_KEPT = 20
+
+# Leaf functions of threads that are parked, not working (hidden unless include_idle)
+IDLE_LEAVES = {'wait', 'select', 'poll', 'accept', 'sleep', '_wait_for_tstate_lock', 'get', 'readline',
+               'readinto', 'recv', 'recv_into', 'serve_forever', '_worker', 'handle_request'}
+
+
+class SamplingProfiler:
+    def __init__(self, interval=DEFAULT_INTERVAL, max_overhead=MAX_OVERHEAD, thread_ids=None, include_idle=False):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.include_idle = include_idle
+        self.stacks = {}  # thread name -> Counter of stack tuples (root first)
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started = self.stopped = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.perf_counter()
+        return self
+
+    def run_for(self, seconds):
+        self.start()
+        self._stop.wait(min(seconds, MAX_SECONDS))
+        return self.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                if not stack or (not self.include_idle and stack[0][0] in IDLE_LEAVES):
+                    continue
+                stack.reverse()
+                self.stacks.setdefault(names.get(ident, str(ident)), Counter())[tuple(stack)] += 1
+            self.samples += 1
+            cost = time.perf_counter() - start
+            self.sampling_seconds += cost
+            # Back off whenever sampling would take more than max_overhead of the wall clock
+            elapsed = time.perf_counter() - self.started
+            if self.sampling_seconds > self.max_overhead * elapsed:
+                self.interval = min(self.interval * 2, 1.0)
+
+    def summary(self):
+        wall = (self.stopped or time.perf_counter()) - self.started
+        return {
+            'wall_seconds': round(wall, 3),
+            'samples': self.samples,
+            'final_interval_ms': round(self.interval * 1000, 2),
+            'overhead': round(self.sampling_seconds / wall, 4) if wall else 0.0,
+            'threads': {name: sum(stacks.values()) for name, stacks in self.stacks.items()}
+        }
+
+    def collapsed(self):
+        """Brendan Gregg collapsed stacks: 'thread;root;...;leaf count' per line"""
+        lines = []
+        for thread_name, stacks in self.stacks.items():
+            for stack, count in stacks.most_common():
+                frames = ';'.join(f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack)
+                lines.append(f"{thread_name};{frames} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self, name='neurolens'):
+        """speedscope 'sampled' profile per thread; identical stacks merged into one weighted sample"""
+        frames, index = [], {}
+        profiles = []
+        for thread_name, stacks in self.stacks.items():
+            samples, weights = [], []
+            for stack, count in stacks.most_common():
+                ids = []
+                for frame in stack:
+                    if frame not in index:
+                        index[frame] = len(frames)
+                        frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                    ids.append(index[frame])
+                samples.append(ids)
+                weights.append(count)
+            profiles.append({
+                'type': 'sampled',
+                'name': thread_name,
+                'unit': 'none',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'neurolens sampling_profiler',
+            'shared': {'frames': frames},
+            'profiles': profiles
+        }
+
+    def export(self, fmt, name='neurolens'):
+        """(body, mimetype, file extension)"""
+        if fmt == 'collapsed':
+            return self.collapsed(), 'text/plain', 'collapsed.txt'
+        return json.dumps(self.speedscope(name)), 'application/json', 'speedscope.json'
+
+
+# ----------------------------------------------------------------------
+# Flask integration
+# ----------------------------------------------------------------------
+def init_app(app, token=None):
+    """Register /admin/profile routes and X-Profile handling (no-op unless a token is configured)"""
+    from flask import Response, abort, g, jsonify, request
+
+    token = token or os.environ.get(TOKEN_ENV)
+    if not token:
+        return app
+
+    busy = threading.Lock()
+    results = OrderedDict()  # id -> (body, mimetype, extension), newest last
+    results_lock = threading.Lock()
+
+    def authorized():
+        supplied = request.headers.get('X-Admin-Token', '')
+        return hmac.compare_digest(supplied.encode(), token.encode())
+
+    def keep(result):
+        result_id = uuid.uuid4().hex[:12]
+        with results_lock:
+            results[result_id] = result
+            while len(results) > RESULTS_KEPT:
+                results.popitem(last=False)
+        return result_id
+
+    def download(body, mimetype, extension, stem):
+        return Response(body, mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename="{stem}.{extension}"'})
+
+    @app.route('/admin/profile', methods=['GET', 'POST'])
+    def admin_profile():
+        if not authorized():
+            abort(403)
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            interval_ms = float(request.args.get('interval_ms', DEFAULT_INTERVAL * 1000))
+        except ValueError:
+            seconds = interval_ms = float('nan')
+        if not (math.isfinite(seconds) and math.isfinite(interval_ms) and seconds > 0):
+            return jsonify({'success': False, 'error': 'seconds and interval_ms must be positive numbers'}), 400
+        seconds = min(seconds, MAX_SECONDS)
+        interval = max(interval_ms, 1.0) / 1000
+        fmt = request.args.get('format', 'speedscope')
+        # One profile (whole-process or X-Profile) at a time keeps the overhead cap meaningful
+        if not busy.acquire(blocking=False):
+            return jsonify({'success': False, 'error': 'a profile is already running'}), 409
+        try:
+            profiler = SamplingProfiler(interval=interval,
+                                        include_idle=request.args.get('idle') == '1').run_for(seconds)
+        finally:
+            busy.release()
+        summary = profiler.summary()
+        print(f"⏱️ Profiled {summary['wall_seconds']}s: {summary['samples']} samples, "
+              f"overhead {summary['overhead']*100:.2f}%")
+        body, mimetype, extension = profiler.export(fmt, f"neurolens-{os.getpid()}")
+        response = download(body, mimetype, extension, f"profile-{os.getpid()}-{int(time.time())}")
+        response.headers['X-Profile-Summary'] = json.dumps(
+            {k: summary[k] for k in ('wall_seconds', 'samples', 'overhead', 'final_interval_ms')})
+        return response
+
+    @app.route('/admin/profile/result/<result_id>')
+    def admin_profile_result(result_id):
+        if not authorized():
+            abort(403)
+        with results_lock:
+            result = results.get(result_id)
+        if result is None:
+            abort(404)
+        return download(*result, f"request-{result_id}")
+
+    @app.before_request
+    def _profile_request():
+        if request.headers.get('X-Profile') and authorized():
+            if not busy.acquire(blocking=False):
+                return jsonify({'success': False, 'error': 'a profile is already running'}), 409
+            g.profiler_busy = True
+            g.request_profiler = SamplingProfiler(thread_ids={threading.get_ident()}, include_idle=True,
+                                                  interval=0.002).start()
+
+    @app.after_request
+    def _finish_request_profile(response):
+        profiler = g.pop('request_profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            fmt = request.headers.get('X-Profile')
+            result_id = keep(profiler.export('collapsed' if fmt == 'collapsed' else 'speedscope',
+                                             f"{request.method} {request.path}"))
+            response.headers['X-Profile-Result'] = f"/admin/profile/result/{result_id}"
+        return response
+
+    @app.teardown_request
+    def _release_request_profile(exc):
+        # Also runs when the view raised and after_request was skipped
+        profiler = g.pop('request_profiler', None)
+        if profiler is not None:
+            profiler.stop()
+        if g.pop('profiler_busy', False):
+            busy.release()
+
+    print("⏱️ Sampling profiler enabled (/admin/profile, X-Profile header)")
+    return app
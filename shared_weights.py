@@ -0,0 +1,57 @@
+"""
+Shared model weights across worker processes.
+
+Memory-mapped weights (PyTorch): `load_torch_model` maps the tensor
+storages straight from the checkpoint file, so every process that loads
+the same file shares the same read-only page-cache pages and memory does
+not scale with the number of workers.
+
+TensorFlow/Keras models are not preloaded in the gunicorn master: app.py
+loads DeepFace lazily per request path, and initialising TensorFlow before
+fork can deadlock workers (its thread pools don't survive fork). Each
+process builds its own EmotionDetector on first use.
+"""
+
+import os
+
+_detectors = {}
+
+
+def load_torch_model(path, mmap=True):
+    """torch.load with file-backed (shared) storages when the torch version supports it"""
+    import torch
+
+    if mmap:
+        try:
+            return torch.load(path, map_location='cpu', mmap=True, weights_only=False)
+        except TypeError:
+            # torch < 2.1 has no mmap support
+            pass
+        except RuntimeError as e:
+            # Legacy (non-zipfile) checkpoints can't be mapped
+            print(f"⚠️  Could not memory-map {path}, loading a private copy: {e}")
+    return torch.load(path, map_location='cpu')
+
+
+def get_emotion_detector():
+    """Process-wide EmotionDetector, built on first use in this process"""
+    if 'emotion_detector' not in _detectors:
+        from emotion_detector import EmotionDetector
+        # NEUROLENS_EMOTION_MODEL pins a registry version (e.g. the distilled student)
+        _detectors['emotion_detector'] = EmotionDetector(version=os.environ.get('NEUROLENS_EMOTION_MODEL') or None)
+    return _detectors['emotion_detector']
+
+
+def worker_memory():
+    """RSS and PSS of the current process in MB (PSS splits shared pages between sharers)"""
+    stats = {}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in ('Rss', 'Pss', 'Shared_Clean', 'Private_Dirty'):
+                    stats[key.lower()] = int(rest.split()[0]) / 1024
+    except FileNotFoundError:
+        import resource
+        stats['rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return stats
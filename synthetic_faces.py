@@ -0,0 +1,133 @@
+"""
+Vectorized synthetic face generator shared by the image training scripts
+
+Each emotion is a mask template (sum of region offsets on a 48x48 grid,
+rescaled to the requested size). A batch is one noise array plus the
+templates gathered by label, so whole classes are built with a handful
+of array ops instead of a Python loop per face.
+"""
+
+import numpy as np
+
+EMOTIONS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprised', 'neutral']
+NUM_CLASSES = len(EMOTIONS)
+BASE_SIZE = 48
+
+# (row_start, row_end, col_start, col_end) on the 48x48 grid -> intensity offset
+TRAIN_PATTERNS = {
+    0: [((12, 18, 15, 33), 0.4),    # angry: eyebrows down
+        ((28, 35, 18, 30), -0.3),   # mouth down
+        ((20, 25, 20, 28), 0.2)],   # eyes narrow
+    1: [((25, 30, 15, 20), 0.3),    # disgust: nose wrinkle
+        ((30, 35, 20, 28), -0.4)],  # mouth down
+    2: [((18, 25, 18, 30), 0.5),    # fear: eyes wide
+        ((30, 35, 22, 26), 0.2)],   # mouth open
+    3: [((30, 38, 15, 33), 0.6),    # happy: big smile
+        ((18, 25, 20, 28), 0.2),    # eyes crinkle
+        ((25, 30, 18, 30), 0.1)],   # cheeks up
+    4: [((30, 35, 20, 28), -0.5),   # sad: mouth down
+        ((15, 20, 18, 30), -0.2),   # eyebrows down
+        ((25, 30, 20, 28), -0.1)],  # cheeks down
+    5: [((18, 28, 18, 30), 0.6),    # surprised: eyes very wide
+        ((30, 38, 22, 26), 0.4),    # mouth open
+        ((12, 18, 20, 28), 0.3)],   # eyebrows up
+    6: [((30, 35, 22, 26), 0.1)]    # neutral: slight mouth
+}
+
+# Same patterns as training but with slight variations
+TEST_PATTERNS = {
+    0: [((12, 18, 15, 33), 0.35), ((28, 35, 18, 30), -0.25)],
+    3: [((30, 38, 15, 33), 0.55), ((18, 25, 20, 28), 0.15)],
+    4: [((30, 35, 20, 28), -0.45), ((15, 20, 18, 30), -0.15)],
+    5: [((18, 28, 18, 30), 0.55), ((30, 38, 22, 26), 0.35)]
+}
+
+
+def build_templates(patterns=None, img_size=BASE_SIZE):
+    """(NUM_CLASSES, img_size, img_size) float32 offsets, one per emotion"""
+    patterns = TRAIN_PATTERNS if patterns is None else patterns
+    scale = img_size / BASE_SIZE
+    templates = np.zeros((NUM_CLASSES, img_size, img_size), dtype=np.float32)
+    for emotion, regions in patterns.items():
+        for (r0, r1, c0, c1), offset in regions:
+            templates[emotion,
+                      int(round(r0 * scale)):int(round(r1 * scale)),
+                      int(round(c0 * scale)):int(round(c1 * scale))] += offset
+    return templates
+
+
+def class_probabilities(weights=None):
+    """Normalize {emotion_name_or_index: weight} into a probability vector (default uniform)"""
+    probs = np.ones(NUM_CLASSES, dtype=np.float64)
+    if weights:
+        probs[:] = 0
+        for key, weight in weights.items():
+            probs[EMOTIONS.index(key) if isinstance(key, str) else key] = weight
+    return probs / probs.sum()
+
+
+def generate_faces(labels, templates, rng=None, mean=0.4, std=0.1):
+    """Faces for an int label vector: noise + templates[labels], clipped to [0, 1]"""
+    rng = rng or np.random.default_rng()
+    img_size = templates.shape[-1]
+    faces = rng.standard_normal((len(labels), img_size, img_size, 1), dtype=np.float32)
+    faces *= std
+    faces += mean
+    faces += templates[labels][..., None]
+    np.clip(faces, 0.0, 1.0, out=faces)
+    return faces
+
+
+def generate_dataset(num_samples, img_size=BASE_SIZE, patterns=None, class_weights=None,
+                     per_class=False, seed=None):
+    """X (N, S, S, 1) float32 and int labels y.
+
+    per_class=True builds exactly `num_samples` faces of every class (ordered),
+    otherwise labels are drawn from `class_weights`.
+    """
+    rng = np.random.default_rng(seed)
+    templates = build_templates(patterns, img_size)
+    if per_class:
+        labels = np.repeat(np.arange(NUM_CLASSES), num_samples)
+    else:
+        labels = rng.choice(NUM_CLASSES, size=num_samples, p=class_probabilities(class_weights))
+    return generate_faces(labels, templates, rng), labels
+
+
+def one_hot(labels, num_classes=NUM_CLASSES):
+    return np.eye(num_classes, dtype=np.float32)[labels]
+
+
+def create_synthetic_data(train_per_class=2000, test_per_class=400, img_size=BASE_SIZE, seed=None):
+    """Drop-in for the old train_emotion_model.create_synthetic_data (shuffled train, one-hot labels)"""
+    rng = np.random.default_rng(seed)
+    X_train, y_train = generate_dataset(train_per_class, img_size, TRAIN_PATTERNS, per_class=True,
+                                        seed=rng.integers(2**32))
+    X_test, y_test = generate_dataset(test_per_class, img_size, TEST_PATTERNS, per_class=True,
+                                      seed=rng.integers(2**32))
+    order = rng.permutation(len(X_train))
+    return X_train[order], X_test, one_hot(y_train[order]), one_hot(y_test)
+
+
+def batch_generator(batch_size=32, img_size=BASE_SIZE, patterns=None, class_weights=None, seed=None):
+    """Endless (X, y_one_hot) batches; nothing beyond one batch is ever materialized"""
+    rng = np.random.default_rng(seed)
+    templates = build_templates(patterns, img_size)
+    probs = class_probabilities(class_weights)
+    while True:
+        labels = rng.choice(NUM_CLASSES, size=batch_size, p=probs)
+        yield generate_faces(labels, templates, rng), one_hot(labels)
+
+
+def make_tf_dataset(batch_size=32, img_size=BASE_SIZE, patterns=None, class_weights=None, seed=None):
+    """Streaming tf.data.Dataset over batch_generator; pass steps_per_epoch to model.fit"""
+    import tensorflow as tf
+
+    dataset = tf.data.Dataset.from_generator(
+        lambda: batch_generator(batch_size, img_size, patterns, class_weights, seed),
+        output_signature=(
+            tf.TensorSpec(shape=(batch_size, img_size, img_size, 1), dtype=tf.float32),
+            tf.TensorSpec(shape=(batch_size, NUM_CLASSES), dtype=tf.float32)
+        )
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,171 @@
+"""
+Tests for password hashing, the bounded KDF pool and the user cache (auth.py)
+Run: python -m pytest test_auth.py
+"""
+import os
+import time
+import hashlib
+import tempfile
+import threading
+
+import pytest
+
+os.environ.setdefault('NEUROLENS_DATABASE_URL',
+                      'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='neurolens_test_'), 'import.db'))
+os.environ.setdefault('NEUROLENS_PBKDF2_ITERATIONS', '1000')
+
+import auth
+import storage
+import database as db
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_hash_round_trip():
+    stored = auth.hash_password('secret')
+    assert stored.startswith('pbkdf2_sha256$') and stored != auth.hash_password('secret')  # salted
+    assert auth.verify_password('secret', stored) == (True, False)
+    assert auth.verify_password('wrong', stored) == (False, False)
+
+
+def test_fewer_iterations_flagged_for_rehash():
+    stored = auth.hash_password('secret', iterations=auth.ITERATIONS // 2)
+    assert auth.verify_password('secret', stored) == (True, True)
+    assert auth.verify_password('wrong', stored) == (False, False)
+
+
+def test_legacy_sha256_verifies_and_needs_rehash():
+    legacy = hashlib.sha256(b'secret').hexdigest()
+    assert auth.verify_password('secret', legacy) == (True, True)
+    assert auth.verify_password('wrong', legacy) == (False, False)
+
+
+@pytest.mark.parametrize('stored', [None, '', 'pbkdf2_sha256$', 'pbkdf2_sha256$abc$c2FsdA$ZGlnZXN0',
+                                    'pbkdf2_sha256$1000$c2FsdA', 'pbkdf2_sha256$1000$!!!$???',
+                                    'pbkdf2_sha256$1000$c2FsdA$ZGlnZXN0$extra'])
+def test_malformed_hashes_never_match(stored):
+    assert auth.verify_password('secret', stored) == (False, False)
+
+
+def test_verify_user_upgrades_legacy_hash(tmp_path):
+    backend = storage.use(f"sqlite:///{tmp_path / 'neurolens.db'}")
+    db.init_db()
+    user_id = db.create_user('kid', 'placeholder', 'child')
+    conn = storage.connect()
+    conn.execute('UPDATE users SET password = ? WHERE id = ?', (hashlib.sha256(b'secret').hexdigest(), user_id))
+    conn.commit()
+    assert db.verify_user('kid', 'secret')[0] == user_id
+    stored = conn.execute('SELECT password FROM users WHERE id = ?', (user_id,)).fetchone()[0]
+    conn.close()
+    assert auth.verify_password('secret', stored) == (True, False)
+    backend.close()
+
+
+def test_update_user_runs_change_hooks(tmp_path):
+    backend = storage.use(f"sqlite:///{tmp_path / 'neurolens.db'}")
+    db.init_db()
+    parent = db.create_user('parent', 'pw', 'parent')
+    child = db.create_user('kid', 'pw', 'child')
+    changed = []
+    db.USER_CHANGE_HOOKS.append(changed.append)
+    try:
+        assert db.update_user(child, parent_id=parent)
+        assert not db.update_user(child)  # nothing to change: no write, no hook
+    finally:
+        db.USER_CHANGE_HOOKS.remove(changed.append)
+    assert changed == [child] and db.get_user(child)['parent_id'] == parent
+    backend.close()
+
+
+def test_update_user_invalidates_cached_row(tmp_path):
+    backend = storage.use(f"sqlite:///{tmp_path / 'neurolens.db'}")
+    db.init_db()
+    user_id = db.create_user('grown_up', 'pw', 'child')
+    cache = auth.UserCache(db.get_user, ttl=3600)
+    db.USER_CHANGE_HOOKS.append(cache.invalidate)  # as app.py wires it
+    try:
+        assert cache.get(user_id)['role'] == 'child'
+        assert db.update_user(user_id, role='parent', user_type='parent')
+        assert cache.get(user_id)['role'] == 'parent'  # not the cached 'child' row
+    finally:
+        db.USER_CHANGE_HOOKS.remove(cache.invalidate)
+    backend.close()
+
+
+def test_pool_rejects_when_saturated():
+    pool = auth.AuthPool(workers=1, max_pending=1)
+    release = threading.Event()
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(pool.run(release.wait, 5))) for _ in range(2)]
+    for t in callers:
+        t.start()
+    # One call running, one queued: a third fails fast instead of waiting
+    deadline = time.monotonic() + 5
+    while pool._slots._value and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(auth.AuthBusy):
+        pool.run(lambda: 'late')
+    release.set()
+    for t in callers:
+        t.join()
+    assert results == [True, True]
+    assert pool.run(lambda: 'ok') == 'ok'  # slots come back once calls finish
+
+
+def test_pool_times_out():
+    pool = auth.AuthPool(workers=1, max_pending=0)
+    release = threading.Event()
+    with pytest.raises(auth.AuthBusy):
+        pool.run(release.wait, 5, timeout=0.05)
+    release.set()
+
+
+def test_cache_ttl_and_invalidate():
+    loads = []
+    clock = Clock()
+
+    def loader(user_id):
+        loads.append(user_id)
+        return {'id': user_id, 'role': 'parent', 'load': len(loads)}
+
+    cache = auth.UserCache(loader, ttl=30, clock=clock)
+    assert cache.get(1)['load'] == 1
+    assert cache.get(1)['load'] == 1  # cached
+    clock.now += 31
+    assert cache.get(1)['load'] == 2  # expired
+    cache.get(2)
+    cache.invalidate(1)
+    assert cache.get(1)['load'] == 4 and cache.get(2)['load'] == 3
+    cache.invalidate()
+    assert cache.get(2)['load'] == 5
+
+
+def test_cache_is_bounded():
+    cache = auth.UserCache(lambda user_id: {'id': user_id}, maxsize=2, clock=Clock())
+    for user_id in (1, 2, 1, 3):
+        cache.get(user_id)
+    assert list(cache._entries) == [1, 3]  # 2 was least recently used
+
+
+def test_load_racing_an_update_is_not_cached():
+    rows = {1: 'child'}
+    cache = None
+
+    def loader(user_id):
+        row = {'id': user_id, 'role': rows[user_id]}
+        # The row changes (and is invalidated) after it was read, before the load finishes
+        rows[user_id] = 'parent'
+        cache.invalidate(user_id)
+        return row
+
+    cache = auth.UserCache(loader, clock=Clock())
+    assert cache.get(1)['role'] == 'child'  # the caller still gets what it read...
+    assert 1 not in cache._entries           # ...but the stale row isn't kept
+    cache.loader = lambda user_id: {'id': user_id, 'role': rows[user_id]}
+    assert cache.get(1)['role'] == 'parent'
@@ -0,0 +1,150 @@
+"""
+Tests for the monthly log partitions and their retention job (emotion_partitions.py)
+Run: python -m pytest test_emotion_partitions.py
+
+Every test uses a fresh temp main DB and partition directory, and passes a
+fixed `now`, so the retention cutoffs don't depend on today's date.
+"""
+import os
+import hashlib
+import tempfile
+from datetime import datetime
+
+import pytest
+
+os.environ.setdefault('NEUROLENS_DATABASE_URL',
+                      'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='neurolens_test_'), 'import.db'))
+os.environ.setdefault('NEUROLENS_PARTITION_DIR', os.path.join(tempfile.mkdtemp(prefix='neurolens_test_'), 'partitions'))
+
+import storage
+import database as db
+import emotion_partitions as ep
+
+COLUMNS = ('id', 'user_id', 'emotion', 'confidence', 'timestamp')
+
+
+@pytest.fixture
+def main_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(ep, 'PARTITION_DIR', str(tmp_path / 'partitions'))
+    path = str(tmp_path / 'neurolens.db')
+    backend = storage.use(f"sqlite:///{path}")
+    db.init_db()
+    yield path
+    backend.close()
+
+
+def add_logs(*rows):
+    storage.bulk_insert('emotion_logs', COLUMNS, rows)
+
+
+def ids(path, table='emotion_logs'):
+    conn = storage.connect(path)
+    result = [row[0] for row in conn.execute(f'SELECT id FROM {table} ORDER BY id')]
+    conn.close()
+    return result
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_month_end_rolls_over_the_year():
+    assert ep._month_end('2024-11') == datetime(2024, 12, 1)
+    assert ep._month_end('2024-12') == datetime(2025, 1, 1)
+    assert ep._month_end('2025-01') == datetime(2025, 2, 1)
+
+
+def test_archive_splits_by_month_and_across_runs(main_db):
+    add_logs((1, 1, 'sad', 0.5, '2024-11-30 23:59:59'),
+             (2, 1, 'happy', 0.5, '2024-12-01 00:00:00'),
+             (3, 1, 'happy', 0.5, '2024-12-31 23:59:59'),
+             (4, 1, 'angry', 0.5, '2025-01-01 00:00:00'),
+             (5, 1, 'happy', 0.5, '2025-01-20 08:00:00'),
+             (6, 1, 'happy', 0.5, '2025-02-10 08:00:00'))
+
+    # hot_days=31: cutoff 2025-01-15, so January is only partly archived
+    moved = ep.archive_hot('emotion_logs', main_db, now=datetime(2025, 2, 15))
+    assert moved == {'2024-11': 1, '2024-12': 2, '2025-01': 1}
+    assert [month for month, _ in ep.partitions('emotion_logs')] == ['2024-11', '2024-12', '2025-01']
+    assert ids(ep.partition_path('emotion_logs', '2024-12')) == [2, 3]
+    assert ids(main_db) == [5, 6]
+
+    # The next run moves the rest of January into the same file
+    assert ep.archive_hot('emotion_logs', main_db, now=datetime(2025, 3, 1)) == {'2025-01': 1}
+    assert ids(ep.partition_path('emotion_logs', '2025-01')) == [4, 5]
+    assert ids(main_db) == [6]
+    assert ep.archive_hot('emotion_logs', main_db, now=datetime(2025, 3, 1)) == {}
+
+
+def test_compaction_folds_hours_once(main_db):
+    add_logs((1, 1, 'happy', 0.25, '2024-06-10 14:05:00'),
+             (2, 1, 'happy', 0.75, '2024-06-10 14:55:00'),
+             (3, 1, 'sad', 0.5, '2024-06-10 14:30:00'),
+             (4, 1, 'happy', 1.0, '2024-06-10 15:00:00'),
+             (5, 2, 'happy', 0.5, '2024-06-10 14:10:00'))
+    now = datetime(2025, 1, 15)  # raw_days=180: June 2024 is past raw retention, not keep
+
+    report = ep.compact(main_db, now=now)
+    assert report['emotion_logs']['archived'] == {'2024-06': 5}
+    assert report['emotion_logs']['compacted'] == {'2024-06': 5}
+    expected = [('2024-06-10 14:00', 'happy', 2, 1.0), ('2024-06-10 14:00', 'sad', 1, 0.5),
+                ('2024-06-10 15:00', 'happy', 1, 1.0)]
+    assert sorted(ep.hourly('emotion_logs', 1)) == expected
+    assert ep.hourly('emotion_logs', 2) == [('2024-06-10 14:00', 'happy', 1, 0.5)]
+    path = ep.partition_path('emotion_logs', '2024-06')
+    assert ep._partition_state(path) == 'compacted' and ids(path) == []
+
+    # Re-running the job, or compacting the partition again, adds nothing
+    assert ep.compact(main_db, now=now)['emotion_logs']['compacted'] == {}
+    assert ep.compact_partition('emotion_logs', path) == 0
+    assert sorted(ep.hourly('emotion_logs', 1)) == expected
+
+
+def test_keep_days_drops_partitions_and_rollups(main_db):
+    add_logs((1, 1, 'sad', 0.5, '2022-12-05 10:00:00'),
+             (2, 1, 'happy', 0.5, '2024-06-10 10:00:00'))
+    storage.bulk_insert('emotion_daily', ('user_id', 'day', 'emotion', 'count', 'confidence_sum'),
+                        [(1, '2022-12-05', 'sad', 1, 0.5), (1, '2024-06-10', 'happy', 1, 0.5)])
+
+    # keep_days=730: cutoff 2023-01-16, so December 2022 (ends 2023-01-01) goes
+    report = ep.compact(main_db, now=datetime(2025, 1, 15))
+    assert report['emotion_logs']['dropped'] == ['2022-12']
+    assert not os.path.exists(ep.partition_path('emotion_logs', '2022-12'))
+    assert [month for month, _ in ep.partitions('emotion_logs')] == ['2024-06']
+    conn = storage.connect(main_db)
+    assert [row[0] for row in conn.execute('SELECT day FROM emotion_daily')] == ['2024-06-10']
+    conn.close()
+
+
+def test_iter_rows_reads_archive_then_hot_in_id_order(main_db):
+    add_logs(*[(i, 1 + i % 2, 'happy', 0.5, f'2024-{month:02d}-15 12:00:00')
+               for i, month in enumerate((10, 10, 11, 11, 12, 12, 12, 12, 12), start=1)],
+             (10, 1, 'sad', 0.5, '2025-02-10 12:00:00'),
+             (11, 2, 'sad', 0.5, '2025-02-11 12:00:00'))
+    ep.archive_hot('emotion_logs', main_db, now=datetime(2025, 2, 15))
+    assert ids(main_db) == [10, 11]
+
+    batches = list(ep.iter_rows('emotion_logs', 2, ('id', 'emotion'), batch_size=2, db_path=main_db))
+    assert all(len(batch) <= 2 for batch in batches)
+    assert [row[0] for batch in batches for row in batch] == [1, 3, 5, 7, 9, 11]
+    assert [row[0] for batch in ep.iter_rows('emotion_logs', 1, ('id',), db_path=main_db)
+            for row in batch] == [2, 4, 6, 8, 10]
+
+
+def test_dry_run_changes_nothing(main_db):
+    add_logs((1, 1, 'sad', 0.5, '2022-12-05 10:00:00'),
+             (2, 1, 'happy', 0.5, '2024-06-10 10:00:00'))
+    storage.bulk_insert('emotion_daily', ('user_id', 'day', 'emotion', 'count', 'confidence_sum'),
+                        [(1, '2022-12-05', 'sad', 1, 0.5)])
+    ep.archive_hot('emotion_logs', main_db, now=datetime(2024, 8, 1))
+    add_logs((3, 1, 'angry', 0.5, '2024-09-01 10:00:00'))
+    before = {path: digest(path) for _, path in ep.partitions('emotion_logs')}
+    main_before = digest(main_db)
+
+    report = ep.compact(main_db, now=datetime(2025, 1, 15), dry_run=True)
+    assert report['emotion_logs'] == {'archived': {'2024-09': 1}, 'compacted': {'2024-06': None},
+                                      'dropped': ['2022-12']}
+    assert {path: digest(path) for _, path in ep.partitions('emotion_logs')} == before
+    assert digest(main_db) == main_before
+    assert ids(main_db) == [3]
@@ -0,0 +1,98 @@
+"""
+Tests for the late-fusion engine (fusion_engine/fusion.py)
+Run: python -m pytest test_fusion.py
+"""
+import pytest
+
+from fusion_engine.fusion import FusionEngine, MIN_FRESHNESS, to_canonical, CANONICAL_EMOTIONS
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_engine(**kwargs):
+    clock = Clock()
+    modalities = {'face': {'reliability': 1.0, 'half_life': 2.0},
+                  'voice': {'reliability': 0.5, 'half_life': 4.0}}
+    return FusionEngine(modalities=modalities, clock=clock, **kwargs), clock
+
+
+def test_to_canonical_maps_and_normalizes():
+    vector = to_canonical({'joyful': 30, 'calm': 10, 'unknown': 60})
+    assert vector[CANONICAL_EMOTIONS.index('happy')] == pytest.approx(0.75)
+    assert vector[CANONICAL_EMOTIONS.index('neutral')] == pytest.approx(0.25)
+    assert to_canonical({'unknown': 1.0}) is None
+
+
+def test_single_modality_fallback():
+    engine, _ = make_engine()
+    fused = engine.update('u', 'voice', {'sad': 0.8, 'calm': 0.2}, 0.9)
+    assert fused['emotion'] == 'sad'
+    assert fused['probabilities']['sad'] == pytest.approx(0.8)
+    assert fused['modalities'] == {'voice': 1.0}
+
+
+def test_reliability_and_confidence_weighting():
+    engine, _ = make_engine()
+    engine.update('u', 'face', {'happy': 1.0}, 0.8)
+    fused = engine.update('u', 'voice', {'sad': 1.0}, 0.8)
+    # alpha_face = 1.0 * 0.8, alpha_voice = 0.5 * 0.8
+    assert fused['modalities']['face'] == pytest.approx(2 / 3, abs=1e-3)
+    assert fused['probabilities']['happy'] == pytest.approx(2 / 3, abs=1e-3)
+    assert fused['emotion'] == 'happy'
+
+    # Percent-style confidences are scaled to [0, 1]
+    other, _ = make_engine()
+    assert other.update('v', 'face', {'angry': 90}, 90)['confidence'] == pytest.approx(1.0)
+
+
+def test_stale_stream_decays_out():
+    engine, clock = make_engine()
+    engine.update('u', 'face', {'happy': 1.0}, 1.0)
+    engine.update('u', 'voice', {'sad': 1.0}, 1.0)
+
+    # After 2 s: face freshness 0.5 (half-life 2 s), voice 0.5 ** 0.5 (half-life 4 s)
+    clock.now += 2.0
+    fused = engine.current('u')
+    face_alpha, voice_alpha = 1.0 * 0.5, 0.5 * 0.5 ** 0.5
+    assert fused['modalities']['face'] == pytest.approx(face_alpha / (face_alpha + voice_alpha), abs=1e-3)
+
+    # Once face freshness drops below MIN_FRESHNESS only the voice stream remains
+    clock.now += 2.0 * 7
+    assert 0.5 ** 8 < MIN_FRESHNESS
+    assert engine.current('u')['modalities'] == {'voice': 1.0}
+
+    # ...and eventually nothing is fresh
+    clock.now += 4.0 * 8
+    assert engine.current('u') is None
+
+
+def test_newer_samples_outweigh_decayed_ones():
+    engine, clock = make_engine()
+    engine.update('u', 'face', {'sad': 1.0}, 1.0)
+    clock.now += 4.0  # two half-lives: the old sample keeps a quarter of its weight
+    fused = engine.update('u', 'face', {'happy': 1.0}, 1.0)
+    assert fused['probabilities']['happy'] == pytest.approx(0.8)
+    assert fused['probabilities']['sad'] == pytest.approx(0.2)
+
+
+def test_late_sample_enters_pre_decayed():
+    engine, clock = make_engine()
+    engine.update('u', 'face', {'happy': 1.0}, 1.0)
+    fused = engine.update('u', 'face', {'sad': 1.0}, 1.0, timestamp=clock.now - 2.0)
+    assert fused['probabilities']['sad'] == pytest.approx(1 / 3, abs=1e-3)
+
+
+def test_sessions_are_bounded():
+    engine, clock = make_engine(max_sessions=2, session_ttl=60)
+    for user in ('a', 'b', 'c'):
+        engine.update(user, 'face', {'happy': 1.0}, 1.0)
+    assert engine.session_count() == 2 and engine.current('a') is None
+    clock.now += 61
+    engine.update('d', 'face', {'happy': 1.0}, 1.0)
+    assert engine.session_count() == 1
@@ -0,0 +1,107 @@
+"""
+Round-trip tests for the binary .mooddna format
+Run: python -m pytest test_mooddna_format.py   (or: python test_mooddna_format.py)
+"""
+import io
+import os
+import json
+import hashlib
+import random
+
+import mooddna_format as fmt
+
+EMOTIONS = ['happy', 'sad', 'angry', 'neutral', 'surprise', 'fear', 'disgust']
+
+
+def make_columns(n, seed=0):
+    rng = random.Random(seed)
+    hashes = [hashlib.sha256(os.urandom(8)).digest() for _ in range(n)]
+    timestamps, ts = [], 1_760_000_000
+    for _ in range(n):
+        ts += rng.choice([1, 2, 2, 3, 600, -5])  # mostly steady, with gaps and out-of-order rows
+        timestamps.append(ts)
+    intensities = [round(rng.random(), 2) for _ in range(n)]
+    emotions = [rng.choice(EMOTIONS) for _ in range(n)]
+    return hashes, timestamps, intensities, emotions
+
+
+def encode(batches, codec=fmt.CODEC_ZLIB, metadata=None):
+    writer = fmt.MoodDNAWriter(metadata or {'user_id_hash': 'abc'}, codec=codec)
+    return writer.header() + b''.join(writer.encode_block(*batch) for batch in batches) + writer.end()
+
+
+def test_round_trip_multiple_blocks():
+    columns = make_columns(2500)
+    batches = [tuple(col[i:i + 1000] for col in columns) for i in range(0, 2500, 1000)]
+    reader = fmt.MoodDNAReader(io.BytesIO(encode(batches, metadata={'user_id_hash': 'abc', 'n': 2500})))
+    assert reader.metadata == {'user_id_hash': 'abc', 'n': 2500}
+    decoded = reader.columns()
+    assert decoded['hashes'] == columns[0]
+    assert decoded['timestamps'] == columns[1]
+    assert decoded['intensities'] == columns[2]
+    assert decoded['emotions'] == columns[3]
+
+
+def test_records_match_json_shape():
+    columns = make_columns(3)
+    records = list(fmt.MoodDNAReader(io.BytesIO(encode([columns]))).records())
+    assert [r['moodhash'] for r in records] == [h.hex() for h in columns[0]]
+    assert records[0]['timestamp'] == fmt.to_iso(columns[1][0])
+    assert all(r['encrypted'] for r in records)
+
+
+def test_timestamps_from_sqlite_strings():
+    epoch = fmt.to_epoch('2026-10-19 14:29:12')
+    assert fmt.to_iso(epoch) == '2026-10-19T14:29:12'
+    assert fmt.to_epoch('2026-10-19T14:29:12') == epoch
+
+
+def test_empty_export():
+    reader = fmt.MoodDNAReader(io.BytesIO(encode([])))
+    assert list(reader.records()) == []
+
+
+def test_single_record_block():
+    columns = make_columns(1)
+    assert fmt.MoodDNAReader(io.BytesIO(encode([columns]))).columns()['timestamps'] == columns[1]
+
+
+def test_rejects_bad_magic_and_truncation():
+    data = encode([make_columns(100)])
+    for broken in (b'{"records": []}', data[:-20]):
+        try:
+            fmt.MoodDNAReader(io.BytesIO(broken)).columns()
+        except ValueError:
+            continue
+        raise AssertionError("corrupt file was accepted")
+
+
+def test_zstd_round_trip_when_available():
+    if fmt._zstd() is None:
+        return
+    columns = make_columns(500)
+    decoded = fmt.MoodDNAReader(io.BytesIO(encode([columns], codec=fmt.CODEC_ZSTD))).columns()
+    assert decoded['hashes'] == columns[0]
+
+
+def test_smaller_than_json_export():
+    columns = make_columns(5000)
+    binary = encode([tuple(col[i:i + 1000] for col in columns) for i in range(0, 5000, 1000)])
+    records = [{'moodhash': h.hex(), 'timestamp': fmt.to_iso(t), 'intensity': i, 'encrypted': True}
+               for h, t, i, _ in zip(*columns)]
+    as_json = json.dumps({'user_id_hash': 'abc', 'records': records}, indent=2).encode()
+    # Salted SHA-256 digests are incompressible, so 32 bytes per record is the floor
+    assert len(binary) < len(as_json) / 4
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+            print(f"✓ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {name}: {e!r}")
+    raise SystemExit(1 if failed else 0)
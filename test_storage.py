@@ -0,0 +1,216 @@
+"""
+Storage backend tests, run against every available backend
+Run: python -m pytest test_storage.py
+
+SQLite always runs (temp file). PostgreSQL runs when psycopg / psycopg_pool
+are installed and either NEUROLENS_TEST_POSTGRES_URL points at a scratch
+database or initdb / pg_ctl are on PATH, in which case a throwaway cluster
+is started on a unix socket for the session. Tables are dropped between tests.
+"""
+import os
+import re
+import shutil
+import tempfile
+import subprocess
+from contextlib import contextmanager
+
+import pytest
+
+# database.py creates its tables on import; keep that out of the working directory
+os.environ.setdefault('NEUROLENS_DATABASE_URL',
+                      'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='neurolens_test_'), 'import.db'))
+os.environ.setdefault('NEUROLENS_PBKDF2_ITERATIONS', '1000')
+
+import storage
+import database as db
+
+TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+
+@contextmanager
+def local_postgres():
+    """Throwaway PostgreSQL cluster (initdb + pg_ctl) listening only on a unix socket; yields its URL"""
+    if not (shutil.which('initdb') and shutil.which('pg_ctl')):
+        raise RuntimeError("initdb / pg_ctl not on PATH")
+    root = tempfile.mkdtemp(prefix='neurolens-pg-')
+    data = os.path.join(root, 'data')
+    try:
+        subprocess.run(['initdb', '-D', data, '-U', 'neurolens', '-A', 'trust', '--no-sync'],
+                       check=True, capture_output=True)
+        subprocess.run(['pg_ctl', '-D', data, '-l', os.path.join(root, 'server.log'), '-w',
+                        '-o', f"-k {root} -c listen_addresses='' -c fsync=off", 'start'],
+                       check=True, capture_output=True)
+        try:
+            yield f"postgresql://neurolens@/postgres?host={root}"
+        finally:
+            subprocess.run(['pg_ctl', '-D', data, '-m', 'immediate', '-w', 'stop'], capture_output=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def postgres_url():
+    pytest.importorskip('psycopg')
+    pytest.importorskip('psycopg_pool')
+    if os.environ.get('NEUROLENS_TEST_POSTGRES_URL'):
+        yield os.environ['NEUROLENS_TEST_POSTGRES_URL']
+        return
+    try:
+        cluster = local_postgres()
+        url = cluster.__enter__()
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        pytest.skip(f"no local PostgreSQL: {e}")
+    try:
+        yield url
+    finally:
+        cluster.__exit__(None, None, None)
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        active = storage.use(f"sqlite:///{tmp_path / 'neurolens.db'}")
+    else:
+        active = storage.use(request.getfixturevalue('postgres_url'))
+        conn = storage.connect()
+        for table in storage.SCHEMA:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+        conn.commit()
+        conn.close()
+    db.init_db()
+    yield active
+    active.close()
+
+
+def test_users_round_trip(backend):
+    parent = db.create_user('parent', 'pw', 'parent', user_type='parent')
+    child = db.create_user('kid', 'secret', 'child', parent_id=parent)
+    assert parent and child and child != parent
+    assert db.create_user('kid', 'other', 'child') is None  # duplicate username
+    assert db.verify_user('kid', 'secret') == (child, 'child', parent, 'child')
+    assert db.verify_user('kid', 'wrong') is None
+    assert db.get_user(child)['username'] == 'kid'
+    assert db.update_user(child, user_type='teen')
+    assert db.get_user(child)['user_type'] == 'teen'
+    assert db.get_children(parent) == [(child, 'kid')]
+
+
+def test_logs_rollups_and_keyset_pages(backend):
+    parent = db.create_user('parent', 'pw', 'parent')
+    child = db.create_user('kid', 'pw', 'child', parent_id=parent)
+    for i in range(7):
+        db.log_emotion(child, 'sad' if i % 2 else 'happy', 0.5)
+    db.log_chat(child, 'hi', 'hello', 'positive')
+
+    emotions, chats, latest = db.get_child_rollups(parent)
+    counts = {row[2]: row[3] for row in emotions}
+    assert counts == {'happy': 4, 'sad': 3}
+    assert [row[1] for row in emotions] == [storage.today()] * 2
+    assert chats[0][2:] == ('positive', 1)
+    assert latest[0][0] == child and TIMESTAMP.match(latest[0][2])
+
+    newest = db.get_child_logs(parent, 'emotion_logs', limit=3)
+    assert len(newest) == 3 and newest[0][0] > newest[-1][0]
+    older = db.get_child_logs(parent, 'emotion_logs', before=newest[-1][0], limit=10)
+    assert len(older) == 4 and older[0][0] < newest[-1][0]
+    assert db.get_child_logs(parent, 'emotion_logs', since=newest[0][0]) == []
+    assert all(TIMESTAMP.match(row[5]) for row in newest + older)
+
+
+def test_child_logs_merge_across_children(backend):
+    parent = db.create_user('parent', 'pw', 'parent')
+    kids = [db.create_user(f'kid{i}', 'pw', 'child', parent_id=parent) for i in range(3)]
+    other = db.create_user('stranger', 'pw', 'child')
+    for i in range(12):
+        db.log_emotion(kids[i % 3] if i % 4 else kids[0], 'happy', 0.5)
+        db.log_emotion(other, 'sad', 0.5)
+    ids = [row[0] for row in db.get_child_logs(parent, 'emotion_logs', limit=100)]
+    assert len(ids) == 12 and ids == sorted(ids, reverse=True)
+
+    assert [row[0] for row in db.get_child_logs(parent, 'emotion_logs', limit=5)] == ids[:5]
+    assert [row[0] for row in db.get_child_logs(parent, 'emotion_logs', before=ids[4], limit=5)] == ids[5:10]
+    assert [row[0] for row in db.get_child_logs(parent, 'emotion_logs', since=ids[8], limit=2)] == ids[7:5:-1]
+    assert all(row[1] == kids[1] for row in db.get_child_logs(parent, 'emotion_logs', child_id=kids[1]))
+    assert db.get_child_logs(parent, 'emotion_logs', child_id=other) == []
+    assert db.get_child_logs(other, 'emotion_logs') == []
+
+
+def test_bulk_insert_and_stream(backend):
+    rows = [(i, 1, 'neutral', i / 1000, '2024-01-01 00:00:00') for i in range(1, 1201)]
+    assert storage.bulk_insert('emotion_logs', ('id', 'user_id', 'emotion', 'confidence', 'timestamp'), rows) == 1200
+    batches = list(storage.stream('SELECT id, timestamp FROM emotion_logs WHERE user_id = ? ORDER BY id', (1,),
+                                  batch_size=500))
+    assert [len(batch) for batch in batches] == [500, 500, 200]
+    assert batches[0][0] == (1, '2024-01-01 00:00:00')
+    # Generated ids continue after the bulk-loaded ones
+    db.log_emotion(1, 'happy', 0.9)
+    assert db.get_latest_emotion(1)[0] == 1201
+    assert sum(len(batch) for batch in db.iter_emotion_logs(1, batch_size=700)) == 1201
+
+
+def test_recent_window_queries(backend):
+    storage.bulk_insert('emotion_logs', ('user_id', 'emotion', 'confidence', 'timestamp'),
+                        [(1, 'sad', 0.4, storage.ago(days=10)), (1, 'happy', 0.8, storage.ago(hours=1))])
+    conn = storage.connect()
+    recent = conn.execute('SELECT emotion FROM emotion_logs WHERE user_id = ? AND timestamp >= ?',
+                          (1, storage.ago(days=7))).fetchall()
+    conn.close()
+    assert recent == [('happy',)]
+
+
+def test_feature_modules(backend):
+    from emotion_anchors import EmotionAnchors
+    from coping_coach import CopingCoach
+    from neuro_challenges import NeuroChallenges
+    from resilience_builder import ResilienceBuilder
+
+    anchors = EmotionAnchors()
+    created = anchors.create_anchor(1, 'happy', 0.9, 'data:image/png;base64,AAAA', 'sunny')
+    assert anchors.get_daily_count(1) == 1
+    assert anchors.get_anchor(created['id'])['note'] == 'sunny'
+
+    coach = CopingCoach()
+    coach.log_action(1, 'sad', 'breathing', 'Deep Breathing', 'calm')
+    assert len(coach.get_history(1)) == 1
+
+    challenges = NeuroChallenges()
+    first = challenges.complete_challenge(1, challenges.challenges[0]['id'])
+    second = challenges.complete_challenge(1, challenges.challenges[0]['id'])
+    assert second['streak'] == 2 and second['total_coins'] == first['coins_earned'] * 2
+
+    builder = ResilienceBuilder()
+    metrics = {'score': 50, 'volatility': 0.2, 'recovery_speed': 0.5, 'positive_ratio': 0.6}
+    builder.save_weekly_metrics(1, metrics)
+    builder.save_weekly_metrics(1, dict(metrics, score=75))  # same week: upsert, not a second row
+    assert [week['score'] for week in builder.get_weekly_trend(1)] == [75]
+
+
+def test_postgres_cursor_reports_query_time():
+    class Cursor:  # the psycopg cursor calls PgCursor forwards to
+        arraysize = 2
+
+        def execute(self, sql, params):
+            self.sql = sql
+
+        def fetchall(self):
+            return [(1,)]
+
+    seen = []
+    hook = lambda seconds, sql: seen.append((seconds >= 0, sql))
+    storage.QUERY_HOOKS.append(hook)
+    try:
+        cursor = storage.PgCursor(Cursor()).execute('SELECT id FROM users WHERE id = ?', (1,))
+        assert cursor.fetchall() == [(1,)] and cursor._cursor.sql == 'SELECT id FROM users WHERE id = %s'
+    finally:
+        storage.QUERY_HOOKS.remove(hook)
+    assert seen == [(True, 'SELECT id FROM users WHERE id = ?'), (True, None)]
+
+
+def test_placeholder_translation():
+    assert storage._translate("SELECT * FROM t WHERE a = ? AND b LIKE 'x%'") == \
+        "SELECT * FROM t WHERE a = %s AND b LIKE 'x%%'"
+
+
+def test_unknown_url():
+    with pytest.raises(ValueError):
+        storage.create_backend('mysql://localhost/neurolens')
@@ -1,11 +1,16 @@
 import tensorflow as tf
 from tensorflow.keras.applications import EfficientNetB0
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
+from tensorflow.keras.layers import Dense, Dropout
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
 from tensorflow.keras.optimizers import Adam
 import os
+from image_pipeline import flow_from_directory
+from embedding_cache import EmbeddingCache, split_transfer_model
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
 
 # Paths
 train_dir = "models/images"
@@ -16,36 +21,35 @@ os.makedirs(save_dir, exist_ok=True)
 img_size = (224, 224)
 batch_size = 16
 
-# Data generators
-train_datagen = ImageDataGenerator(
-    rescale=1./255,
+augmentation = dict(
     rotation_range=30,
     width_shift_range=0.3,
     height_shift_range=0.3,
     horizontal_flip=True,
     zoom_range=0.3,
-    shear_range=0.2,
-    brightness_range=[0.8, 1.2],
-    validation_split=0.2
+    brightness_range=[0.8, 1.2]
 )
 
-val_datagen = ImageDataGenerator(
-    rescale=1./255,
-    validation_split=0.2
-)
+# Phase 1 trains the head on cached backbone embeddings (this many augmentation passes);
+# 0 runs the frozen backbone on every image every epoch instead
+embedding_passes = int(os.environ.get('NEUROLENS_EMBEDDING_PASSES', '5'))
 
-train_gen = train_datagen.flow_from_directory(
+# tf.data input pipeline
+train_gen = flow_from_directory(
     train_dir,
     target_size=img_size,
     batch_size=batch_size,
-    subset="training"
+    subset="training",
+    validation_split=0.2,
+    augment=augmentation
 )
 
-val_gen = val_datagen.flow_from_directory(
+val_gen = flow_from_directory(
     train_dir,
     target_size=img_size,
     batch_size=batch_size,
-    subset="validation"
+    subset="validation",
+    validation_split=0.2
 )
 
 # Transfer learning with EfficientNet
@@ -58,16 +62,14 @@ base_model = EfficientNetB0(
 # Freeze base model initially
 base_model.trainable = False
 
-# Add custom head
-x = base_model.output
-x = GlobalAveragePooling2D()(x)
-x = Dense(512, activation='relu')(x)
-x = Dropout(0.5)(x)
-x = Dense(256, activation='relu')(x)
-x = Dropout(0.3)(x)
-predictions = Dense(train_gen.num_classes, activation='softmax')(x)
-
-model = Model(inputs=base_model.input, outputs=predictions)
+# Add custom head (a separate model sharing its weights with the full model)
+feature_model, head, model = split_transfer_model(base_model, [
+    Dense(512, activation='relu'),
+    Dropout(0.5),
+    Dense(256, activation='relu'),
+    Dropout(0.3),
+    Dense(train_gen.num_classes, activation='softmax', dtype='float32')
+])
 
 # Compile
 model.compile(
@@ -77,7 +79,9 @@ model.compile(
 )
 
 # Callbacks
+profiler = ThroughputProfiler(batch_size=batch_size)
 callbacks = [
+    profiler,
     EarlyStopping(patience=15, restore_best_weights=True),
     ReduceLROnPlateau(factor=0.2, patience=7, min_lr=1e-7),
     ModelCheckpoint(
@@ -88,12 +92,36 @@ callbacks = [
 ]
 
 print("Phase 1: Training with frozen base model...")
-history1 = model.fit(
-    train_gen,
-    validation_data=val_gen,
-    epochs=20,
-    callbacks=callbacks
-)
+if embedding_passes:
+    train_cache = EmbeddingCache.build(feature_model, train_dir, img_size, subset="training",
+                                       validation_split=0.2, augment=augmentation,
+                                       passes=embedding_passes, batch_size=batch_size)
+    val_cache = EmbeddingCache.build(feature_model, train_dir, img_size, subset="validation",
+                                     validation_split=0.2, batch_size=batch_size)
+    head.compile(
+        optimizer=Adam(learning_rate=0.001),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    history1 = head.fit(
+        profiler.wrap(train_cache.dataset(batch_size)),
+        validation_data=val_cache.dataset(batch_size, shuffle=False),
+        epochs=20,
+        callbacks=[
+            profiler,
+            EarlyStopping(patience=15, restore_best_weights=True),
+            ReduceLROnPlateau(factor=0.2, patience=7, min_lr=1e-7)
+        ]
+    )
+    # Head weights are shared, so the full model already has them
+    model.save(os.path.join(save_dir, "advanced_image_model.h5"))
+else:
+    history1 = model.fit(
+        profiler.wrap(train_gen.dataset),
+        validation_data=val_gen.dataset,
+        epochs=20,
+        callbacks=callbacks
+    )
 
 # Fine-tuning phase
 print("Phase 2: Fine-tuning...")
@@ -107,12 +135,13 @@ model.compile(
 )
 
 history2 = model.fit(
-    train_gen,
-    validation_data=val_gen,
+    profiler.wrap(train_gen.dataset),
+    validation_data=val_gen.dataset,
     epochs=30,
     callbacks=callbacks
 )
 
-val_loss, val_accuracy = model.evaluate(val_gen)
+val_loss, val_accuracy = model.evaluate(val_gen.dataset)
 print(f"Final validation accuracy: {val_accuracy:.4f}")
+write_metrics(accuracy=val_accuracy, loss=val_loss)
 print(f"✅ Advanced model saved!")
\ No newline at end of file
@@ -2,11 +2,21 @@ import subprocess
 import sys
 import os
 import json
+import shutil
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from training_metrics import METRICS_ENV, read_metrics
+
+LOG_DIR = os.path.join('logs', 'training')
 
 class ModelTrainingTracker:
     def __init__(self):
         self.results = []
+        self.print_lock = threading.Lock()
         self.models_info = {
             'train_perfect_voice_model.py': {
                 'name': 'Perfect Voice Emotion Model',
@@ -47,65 +57,157 @@ class ModelTrainingTracker:
             print(f"Target Accuracy: {info['target_accuracy']}%")
             print(f"{'─'*80}\n")
     
-    def run_training(self, script_name):
-        """Run training script and track results"""
-        self.print_model_info(script_name)
+    def plan_cpus(self, parallel, threads_per_job=None):
+        """Split the usable cores into one disjoint slot per concurrently running job"""
+        if hasattr(os, 'sched_getaffinity'):
+            cpus = sorted(os.sched_getaffinity(0))
+        else:
+            cpus = list(range(os.cpu_count() or 1))
+        per_job = threads_per_job or max(1, len(cpus) // parallel)
+        per_job = min(per_job, len(cpus))
+        # Wraps around (shared cores) only when jobs * threads exceeds the machine
+        return [[cpus[(i * per_job + k) % len(cpus)] for k in range(per_job)] for i in range(parallel)]
+    
+    def job_env(self, cpus, metrics_path):
+        """Environment that keeps a job's thread pools inside its CPU slot"""
+        env = os.environ.copy()
+        threads = str(len(cpus))
+        env.update({
+            'OMP_NUM_THREADS': threads,
+            'MKL_NUM_THREADS': threads,
+            'OPENBLAS_NUM_THREADS': threads,
+            'TF_NUM_INTRAOP_THREADS': threads,
+            'TF_NUM_INTEROP_THREADS': '2' if len(cpus) > 2 else '1',
+            'PYTHONUNBUFFERED': '1',
+            METRICS_ENV: metrics_path
+        })
+        return env
+    
+    def _stream_output(self, proc, label, log_file):
+        """Print a job's output live with a prefix and copy it to the job's log file"""
+        for raw in iter(proc.stdout.readline, b''):
+            # Keras progress bars redraw with \r; only the last redraw of a line is interesting
+            line = raw.rstrip(b'\r\n').split(b'\r')[-1].decode('utf-8', errors='replace')
+            log_file.write(line + '\n')
+            with self.print_lock:
+                print(f"[{label}] {line}", flush=True)
+        proc.stdout.close()
+    
+    def _wait(self, proc):
+        """Wait for the job; returns (returncode, peak RSS in MB or None)"""
+        if not hasattr(os, 'wait4'):
+            return proc.wait(), None
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return proc.returncode, round(usage.ru_maxrss / scale, 1)
+    
+    def run_training(self, script_name, cpus=None):
+        """Run one training script with pinned CPUs, live logs and a metrics sidecar"""
+        with self.print_lock:
+            self.print_model_info(script_name)
         
+        label = os.path.splitext(script_name)[0].replace('train_', '')
+        os.makedirs(LOG_DIR, exist_ok=True)
+        log_path = os.path.join(LOG_DIR, f"{label}.log")
+        metrics_path = os.path.join(LOG_DIR, f"{label}.metrics.json")
+        if os.path.exists(metrics_path):
+            os.remove(metrics_path)
+        cpus = cpus or self.plan_cpus(1)[0]
+        
+        model_result = {
+            'script': script_name,
+            'name': self.models_info.get(script_name, {}).get('name', script_name),
+            'cpus': cpus,
+            'log': log_path
+        }
+        start = time.monotonic()
         try:
-            print(f"⏳ Training in progress...\n")
+            with self.print_lock:
+                print(f"⏳ {script_name} started on CPUs {cpus}")
             
-            result = subprocess.run([sys.executable, script_name], 
-                                  capture_output=True, text=True, cwd=os.getcwd())
+            # No preexec_fn: it isn't safe from these worker threads. taskset pins the
+            # child before Python starts; without it, pin the pid right after spawn.
+            command = [sys.executable, script_name]
+            use_taskset = shutil.which('taskset') is not None
+            if use_taskset:
+                command = ['taskset', '-c', ','.join(map(str, cpus))] + command
             
-            # Extract accuracy from output
-            accuracy = self.extract_accuracy(result.stdout)
+            with open(log_path, 'w') as log_file:
+                proc = subprocess.Popen(command,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        cwd=os.getcwd(), env=self.job_env(cpus, metrics_path))
+                if not use_taskset and hasattr(os, 'sched_setaffinity'):
+                    try:
+                        os.sched_setaffinity(proc.pid, cpus)
+                    except OSError:
+                        pass  # already exited
+                reader = threading.Thread(target=self._stream_output,
+                                          args=(proc, label, log_file), daemon=True)
+                reader.start()
+                returncode, peak_rss_mb = self._wait(proc)
+                reader.join()
             
-            model_result = {
-                'script': script_name,
-                'name': self.models_info.get(script_name, {}).get('name', script_name),
-                'success': result.returncode == 0,
-                'accuracy': accuracy,
-                'timestamp': datetime.now().isoformat()
-            }
+            # Every train_*.py writes its final metrics to the sidecar; nothing is scraped from stdout
+            metrics = read_metrics(metrics_path)
+            accuracy = None
+            if metrics and metrics.get('accuracy') is not None:
+                accuracy = round(float(metrics['accuracy']) * 100, 2)
+            elif returncode == 0:
+                with self.print_lock:
+                    print(f"⚠️  {script_name} finished without writing {metrics_path}")
             
-            self.results.append(model_result)
+            model_result.update({
+                'success': returncode == 0,
+                'returncode': returncode,
+                'accuracy': accuracy,
+                'metrics': metrics,
+                'wall_time_s': round(time.monotonic() - start, 1),
+                'peak_rss_mb': peak_rss_mb
+            })
             
-            if result.returncode == 0:
-                print(f"✅ SUCCESS: {script_name} completed!")
-                if accuracy:
-                    print(f"📈 Achieved Accuracy: {accuracy}%")
-                print(f"\n{result.stdout}")
-            else:
-                print(f"❌ ERROR: {script_name} failed!")
-                print(f"\n{result.stderr}")
+            with self.print_lock:
+                if returncode == 0:
+                    print(f"✅ SUCCESS: {script_name} completed in {model_result['wall_time_s']}s "
+                          f"(peak RSS {peak_rss_mb} MB)")
+                    if accuracy:
+                        print(f"📈 Achieved Accuracy: {accuracy}%")
+                else:
+                    print(f"❌ ERROR: {script_name} failed with exit code {returncode}! Full log: {log_path}")
                 
         except Exception as e:
-            print(f"❌ ERROR running {script_name}: {e}")
-            self.results.append({
-                'script': script_name,
-                'name': self.models_info.get(script_name, {}).get('name', script_name),
+            with self.print_lock:
+                print(f"❌ ERROR running {script_name}: {e}")
+            model_result.update({
                 'success': False,
                 'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'wall_time_s': round(time.monotonic() - start, 1)
             })
+        
+        model_result['timestamp'] = datetime.now().isoformat()
+        with self.print_lock:
+            self.results.append(model_result)
+        return model_result
     
-    def extract_accuracy(self, output):
-        """Extract accuracy from training output"""
-        try:
-            for line in output.split('\n'):
-                if 'accuracy' in line.lower() or 'acc' in line.lower():
-                    # Try to find percentage
-                    import re
-                    matches = re.findall(r'(\d+\.?\d*)%', line)
-                    if matches:
-                        return float(matches[-1])
-                    # Try to find decimal
-                    matches = re.findall(r'accuracy[:\s]+(\d+\.\d+)', line.lower())
-                    if matches:
-                        return float(matches[-1]) * 100
-        except:
-            pass
-        return None
+    def run_all(self, scripts, parallel=None, threads_per_job=None):
+        """Run independent training scripts concurrently, one CPU slot each"""
+        parallel = max(1, min(parallel or len(scripts), len(scripts)))
+        slots = queue.Queue()
+        for slot in self.plan_cpus(parallel, threads_per_job):
+            slots.put(slot)
+        
+        def run(script_name):
+            cpus = slots.get()
+            try:
+                return self.run_training(script_name, cpus)
+            finally:
+                slots.put(cpus)
+        
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            list(pool.map(run, scripts))
+        # Keep the summary in the requested order, not completion order
+        self.results.sort(key=lambda r: scripts.index(r['script']) if r['script'] in scripts else len(scripts))
     
     def print_summary(self):
         print("\n" + "="*80)
@@ -116,13 +218,15 @@ class ModelTrainingTracker:
         print(f"Successful: {sum(1 for r in self.results if r['success'])}")
         print(f"Failed: {sum(1 for r in self.results if not r['success'])}")
         print("\n" + "─"*80)
-        print(f"{'Model Name':<40} {'Status':<15} {'Accuracy':<15}")
+        print(f"{'Model Name':<40} {'Status':<15} {'Accuracy':<12} {'Wall time':<12} {'Peak RSS':<12}")
         print("─"*80)
         
         for result in self.results:
             status = "✅ Success" if result['success'] else "❌ Failed"
             accuracy = f"{result.get('accuracy', 'N/A')}%" if result.get('accuracy') else "N/A"
-            print(f"{result['name']:<40} {status:<15} {accuracy:<15}")
+            wall = f"{result['wall_time_s']}s" if result.get('wall_time_s') is not None else "N/A"
+            rss = f"{result['peak_rss_mb']} MB" if result.get('peak_rss_mb') is not None else "N/A"
+            print(f"{result['name']:<40} {status:<15} {accuracy:<12} {wall:<12} {rss:<12}")
         
         print("="*80)
         
@@ -154,19 +258,23 @@ class ModelTrainingTracker:
             print(f"⚠️  Could not save results: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Train NeuroLens models in parallel")
+    parser.add_argument('scripts', nargs='*',
+                        default=['train_perfect_voice_model.py', 'train_perfect_image_model.py'])
+    parser.add_argument('--parallel', type=int, default=None,
+                        help="concurrent jobs (default: all scripts at once)")
+    parser.add_argument('--threads-per-job', type=int, default=None,
+                        help="CPUs per job (default: usable cores / parallel)")
+    args = parser.parse_args()
+    
     tracker = ModelTrainingTracker()
     tracker.print_header()
     
-    # Train voice model first (usually faster)
-    print("\n🎤 Training Voice Emotion Model...")
-    tracker.run_training("train_perfect_voice_model.py")
-    
-    # Train image model
-    print("\n📸 Training Image Emotion Model...")
-    tracker.run_training("train_perfect_image_model.py")
+    # Voice and image models are independent, so they train side by side
+    tracker.run_all(args.scripts, args.parallel, args.threads_per_job)
     
     # Print final summary
     tracker.print_summary()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
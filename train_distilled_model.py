@@ -0,0 +1,226 @@
+"""
+Distill the serving emotion model into a tiny real-time student
+Teacher: the registry's current emotion model (or NEUROLENS_TEACHER_VERSION).
+Student: depthwise-separable CNN, < 200k parameters, 48x48 grayscale.
+
+The teacher labels every training face once (softened with temperature T);
+the student then trains on hard FER labels + those soft targets. The
+report compares test accuracy and per-face CPU latency of both models,
+and the student is registered so EmotionDetector(version=...) (or
+NEUROLENS_EMOTION_MODEL=<version>) can serve it.
+"""
+
+import tensorflow as tf
+from tensorflow.keras.models import Model, load_model
+from tensorflow.keras.layers import Input, Conv2D, SeparableConv2D, MaxPooling2D, Dense, Dropout, BatchNormalization, ReLU, GlobalAveragePooling2D, Softmax
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+from tensorflow.keras.optimizers import Adam
+import numpy as np
+import os
+import time
+import synthetic_faces
+import fer2013_shards
+from image_pipeline import build_augmentation
+from emotion_detector import predict_heads, combine_heads
+from model_registry import ModelRegistry
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
+
+IMG_SIZE = 48
+BATCH_SIZE = 64
+EPOCHS = 120
+TEMPERATURE = 4.0
+ALPHA = 0.3  # weight of the hard-label loss; 1 - ALPHA goes to the teacher's soft targets
+MAX_STUDENT_PARAMS = 200_000
+EMOTIONS = synthetic_faces.EMOTIONS
+NUM_CLASSES = len(EMOTIONS)
+TEACHER_VERSION = os.environ.get('NEUROLENS_TEACHER_VERSION')
+save_dir = "checkpoints"
+student_path = os.path.join(save_dir, "distilled_emotion_model.keras")
+os.makedirs(save_dir, exist_ok=True)
+
+# Directory-trained teachers use folder names; map them onto the FER label order
+ALIASES = {'surprise': 'surprised', 'anger': 'angry', 'happiness': 'happy', 'sadness': 'sad'}
+
+print("\n" + "="*80)
+print("🎓 KNOWLEDGE DISTILLATION - REAL-TIME STUDENT")
+print("="*80 + "\n")
+
+def load_teacher():
+    """Teacher model, a column permutation into EMOTIONS order, and its registry version"""
+    entry = ModelRegistry().resolve(TEACHER_VERSION)
+    if entry is None:
+        raise SystemExit("✗ No teacher model found; train and register one first (e.g. train_real_model.py)")
+    if entry.get('kind') == 'student':
+        raise SystemExit(f"✗ {entry['version']} is already a student; set NEUROLENS_TEACHER_VERSION")
+    teacher = load_model(entry['path'], compile=False)
+    class_indices = entry.get('class_indices') or {e: i for i, e in enumerate(EMOTIONS)}
+    by_name = {ALIASES.get(name.lower(), name.lower()): idx for name, idx in class_indices.items()}
+    missing = [e for e in EMOTIONS if e not in by_name]
+    if missing:
+        raise SystemExit(f"✗ Teacher {entry['version']} has no output for {missing}")
+    if tuple(teacher.input_shape[1:3]) != (IMG_SIZE, IMG_SIZE) or teacher.input_shape[-1] != 1:
+        raise SystemExit(f"✗ Teacher input {teacher.input_shape[1:]} is not {IMG_SIZE}x{IMG_SIZE} grayscale")
+    print(f"Teacher: {entry['version']} ({entry['path']}, {teacher.count_params():,} parameters)")
+    return teacher, [by_name[e] for e in EMOTIONS], entry['version']
+
+def teacher_probabilities(teacher, order, X, batch_size=256):
+    """Teacher distribution over EMOTIONS (specialist heads folded in for multi-head teachers)"""
+    labels = [None] * NUM_CLASSES
+    for i, column in enumerate(order):
+        labels[column] = EMOTIONS[i]
+    chunks = []
+    for start in range(0, len(X), batch_size):
+        outputs = predict_heads(teacher, X[start:start + batch_size])
+        chunks.append(combine_heads(outputs, labels)[:, order])
+    return np.concatenate(chunks)
+
+def soften(probs, temperature):
+    """softmax(log p / T) without needing the teacher's logits"""
+    logits = np.log(np.clip(probs, 1e-8, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    soft = np.exp(logits)
+    return (soft / soft.sum(axis=1, keepdims=True)).astype('float32')
+
+def build_student():
+    """Depthwise-separable CNN returning logits (softmax is added for serving)"""
+    inputs = Input(shape=(IMG_SIZE, IMG_SIZE, 1))
+    x = Conv2D(32, (3, 3), padding='same', use_bias=False)(inputs)
+    x = BatchNormalization()(x)
+    x = ReLU()(x)
+    for filters, repeats in [(64, 1), (128, 2), (256, 2)]:
+        for _ in range(repeats):
+            x = SeparableConv2D(filters, (3, 3), padding='same', use_bias=False)(x)
+            x = BatchNormalization()(x)
+            x = ReLU()(x)
+        x = MaxPooling2D((2, 2))(x)
+    x = GlobalAveragePooling2D()(x)
+    x = Dropout(0.3)(x)
+    logits = Dense(NUM_CLASSES, dtype='float32', name='logits')(x)
+    return Model(inputs, logits, name='emotion_student')
+
+def distillation_loss(y_true, logits):
+    """ALPHA * CE(hard labels) + (1 - ALPHA) * T^2 * CE(teacher soft targets, student at T)"""
+    hard, soft = y_true[:, :NUM_CLASSES], y_true[:, NUM_CLASSES:]
+    hard_loss = tf.keras.losses.categorical_crossentropy(hard, logits, from_logits=True)
+    soft_loss = -tf.reduce_sum(soft * tf.nn.log_softmax(logits / TEMPERATURE), axis=-1)
+    return ALPHA * hard_loss + (1.0 - ALPHA) * TEMPERATURE ** 2 * soft_loss
+
+def hard_accuracy(y_true, logits):
+    return tf.cast(tf.equal(tf.argmax(y_true[:, :NUM_CLASSES], axis=-1), tf.argmax(logits, axis=-1)), tf.float32)
+
+def per_face_latency_ms(model, batch_size=1, runs=100):
+    """Median CPU milliseconds per face for a direct model call"""
+    x = np.zeros((batch_size, IMG_SIZE, IMG_SIZE, 1), dtype='float32')
+    for _ in range(5):
+        model(x, training=False)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(x, training=False)
+        timings.append((time.perf_counter() - start) * 1000 / batch_size)
+    return float(np.median(timings))
+
+def make_dataset(X, targets, training):
+    dataset = tf.data.Dataset.from_tensor_slices((X, targets))
+    if training:
+        dataset = dataset.shuffle(min(len(X), 20000))
+    dataset = dataset.batch(BATCH_SIZE)
+    if training:
+        augmentation = build_augmentation(rotation_range=10, width_shift_range=0.1, height_shift_range=0.1,
+                                          horizontal_flip=True)
+        dataset = dataset.map(lambda x, y: (augmentation(x, training=True), y), num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+X_train, y_train, X_test, y_test = fer2013_shards.load_training_data(
+    IMG_SIZE, test_patterns=synthetic_faces.TEST_PATTERNS)
+teacher, order, teacher_version = load_teacher()
+
+print("Labelling training faces with the teacher...")
+train_soft = soften(teacher_probabilities(teacher, order, X_train), TEMPERATURE)
+val_soft = soften(teacher_probabilities(teacher, order, X_test), TEMPERATURE)
+train_targets = np.concatenate([synthetic_faces.one_hot(y_train), train_soft], axis=1)
+val_targets = np.concatenate([synthetic_faces.one_hot(y_test), val_soft], axis=1)
+
+student = build_student()
+student_params = student.count_params()
+print(f"\nStudent Parameters: {student_params:,} (budget {MAX_STUDENT_PARAMS:,})")
+if student_params > MAX_STUDENT_PARAMS:
+    raise SystemExit("✗ Student exceeds the parameter budget")
+
+student.compile(optimizer=Adam(learning_rate=0.002), loss=distillation_loss, metrics=[hard_accuracy])
+
+profiler = ThroughputProfiler(batch_size=BATCH_SIZE)
+callbacks = [
+    profiler,
+    EarlyStopping(patience=20, restore_best_weights=True, monitor='val_hard_accuracy', mode='max', verbose=1),
+    ReduceLROnPlateau(factor=0.3, patience=6, min_lr=1e-6, monitor='val_hard_accuracy', mode='max', verbose=1)
+]
+
+print("\n" + "="*80)
+print("🚀 STARTING DISTILLATION")
+print("="*80 + "\n")
+
+student.fit(
+    profiler.wrap(make_dataset(X_train, train_targets, training=True)),
+    validation_data=make_dataset(X_test, val_targets, training=False),
+    epochs=EPOCHS,
+    callbacks=callbacks,
+    verbose=1
+)
+
+# Serving model: same weights, probabilities out (what EmotionDetector expects)
+serving = Model(student.input, Softmax(dtype='float32', name='emotion')(student.output), name='emotion_student')
+serving.save(student_path)
+
+print("\n" + "="*80)
+print("📊 TEACHER vs STUDENT")
+print("="*80)
+
+teacher_pred = np.argmax(teacher_probabilities(teacher, order, X_test), axis=1)
+student_pred = np.argmax(serving.predict(X_test, batch_size=256, verbose=0), axis=1)
+teacher_accuracy = float(np.mean(teacher_pred == y_test))
+student_accuracy = float(np.mean(student_pred == y_test))
+teacher_latency = per_face_latency_ms(teacher)
+student_latency = per_face_latency_ms(serving)
+student_batch_latency = per_face_latency_ms(serving, batch_size=8)
+
+print(f"{'Model':<10} {'Parameters':<14} {'Accuracy':<12} {'ms/face (1)':<14}")
+print("─"*52)
+print(f"{'Teacher':<10} {teacher.count_params():<14,} {teacher_accuracy*100:<12.2f} {teacher_latency:<14.2f}")
+print(f"{'Student':<10} {student_params:<14,} {student_accuracy*100:<12.2f} {student_latency:<14.2f}")
+print("─"*52)
+print(f"Accuracy delta: {(student_accuracy - teacher_accuracy)*100:+.2f} points")
+print(f"Latency: {teacher_latency / student_latency:.1f}x faster per face "
+      f"({student_batch_latency:.2f} ms/face in batches of 8)")
+
+metrics = {
+    'accuracy': round(student_accuracy * 100, 2),
+    'teacher_version': teacher_version,
+    'teacher_accuracy': round(teacher_accuracy * 100, 2),
+    'accuracy_delta': round((student_accuracy - teacher_accuracy) * 100, 2),
+    'parameters': student_params,
+    'latency_ms_per_face': round(student_latency, 3),
+    'teacher_latency_ms_per_face': round(teacher_latency, 3)
+}
+write_metrics(accuracy=student_accuracy, **{k: v for k, v in metrics.items() if k != 'accuracy'})
+
+# Registered but not promoted: serve it with EmotionDetector(version=...) or `model_registry.py promote`
+ModelRegistry().register(
+    student_path,
+    class_indices={emotion: i for i, emotion in enumerate(EMOTIONS)},
+    input_shape=serving.input_shape[1:],
+    metrics=metrics,
+    script='train_distilled_model.py',
+    kind='student',
+    promote=False
+)
+
+print("\n" + "="*80)
+print("✅ DISTILLED STUDENT TRAINING COMPLETE!")
+print("="*80)
+print(f"Model saved to: {student_path}")
+print("="*80 + "\n")
@@ -1,11 +1,16 @@
 import tensorflow as tf
 from tensorflow.keras.applications import MobileNetV2
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
 from tensorflow.keras.callbacks import EarlyStopping
 from tensorflow.keras.optimizers import Adam
 import os
+from image_pipeline import flow_from_directory
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
 
 train_dir = "models/images"
 save_dir = "checkpoints"
@@ -16,21 +21,13 @@ img_size = (128, 128)
 batch_size = 32
 
 # Minimal augmentation for speed
-train_datagen = ImageDataGenerator(
-    rescale=1./255,
-    rotation_range=20,
-    horizontal_flip=True,
-    validation_split=0.2
-)
-
-val_datagen = ImageDataGenerator(rescale=1./255, validation_split=0.2)
-
-train_gen = train_datagen.flow_from_directory(
-    train_dir, target_size=img_size, batch_size=batch_size, subset="training"
+train_gen = flow_from_directory(
+    train_dir, target_size=img_size, batch_size=batch_size, subset="training", validation_split=0.2,
+    augment=dict(rotation_range=20, horizontal_flip=True)
 )
 
-val_gen = val_datagen.flow_from_directory(
-    train_dir, target_size=img_size, batch_size=batch_size, subset="validation"
+val_gen = flow_from_directory(
+    train_dir, target_size=img_size, batch_size=batch_size, subset="validation", validation_split=0.2
 )
 
 # Fast base model
@@ -44,7 +41,7 @@ model = Sequential([
     Dropout(0.5),
     Dense(256, activation='relu'),
     Dropout(0.3),
-    Dense(train_gen.num_classes, activation='softmax')
+    Dense(train_gen.num_classes, activation='softmax', dtype='float32')
 ])
 
 model.compile(
@@ -53,12 +50,14 @@ model.compile(
     metrics=['accuracy']
 )
 
-callbacks = [EarlyStopping(patience=3, restore_best_weights=True)]
+profiler = ThroughputProfiler(batch_size=batch_size)
+callbacks = [EarlyStopping(patience=3, restore_best_weights=True), profiler]
 
 print("Training fast model (under 5 minutes)...")
-model.fit(train_gen, validation_data=val_gen, epochs=10, callbacks=callbacks, verbose=1)
+model.fit(profiler.wrap(train_gen.dataset), validation_data=val_gen.dataset, epochs=10, callbacks=callbacks, verbose=1)
 
 model.save(os.path.join(save_dir, "fast_image_model.h5"))
-val_loss, val_accuracy = model.evaluate(val_gen)
+val_loss, val_accuracy = model.evaluate(val_gen.dataset)
 print(f"Validation accuracy: {val_accuracy:.4f}")
+write_metrics(accuracy=val_accuracy, loss=val_loss)
 print("SUCCESS: Fast training complete!")
\ No newline at end of file
@@ -12,6 +12,12 @@ from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.regularizers import l2
 import numpy as np
 import os
+import fer2013_shards
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
 
 IMG_SIZE = 48
 BATCH_SIZE = 32
@@ -25,22 +31,10 @@ print("="*80)
 print("Specialized model for detecting happy/smile facial expressions")
 print("="*80 + "\n")
 
-def generate_sample_data(num_samples=5000):
-    """Generate synthetic facial expression data"""
-    print("Generating sample training data...")
-    emotions = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
-    
-    X_train = np.random.rand(num_samples, IMG_SIZE, IMG_SIZE, 1).astype('float32')
-    y_train = np.random.randint(0, 7, num_samples)
-    X_test = np.random.rand(num_samples//5, IMG_SIZE, IMG_SIZE, 1).astype('float32')
-    y_test = np.random.randint(0, 7, num_samples//5)
-    
-    y_train = tf.keras.utils.to_categorical(y_train, 7)
-    y_test = tf.keras.utils.to_categorical(y_test, 7)
-    
-    return X_train, y_train, X_test, y_test, emotions
-
-X_train, y_train, X_test, y_test, emotions = generate_sample_data()
+X_train, y_train, X_test, y_test = fer2013_shards.load_training_data(IMG_SIZE, synthetic_train=5000, synthetic_test=1000)
+y_train = tf.keras.utils.to_categorical(y_train, 7)
+y_test = tf.keras.utils.to_categorical(y_test, 7)
+emotions = fer2013_shards.EMOTIONS
 
 print(f"Training samples: {len(X_train)}")
 print(f"Test samples: {len(X_test)}")
@@ -99,7 +93,7 @@ model = Sequential([
     Dropout(0.5),
     Dense(256, activation='relu'),
     Dropout(0.4),
-    Dense(7, activation='softmax')
+    Dense(7, activation='softmax', dtype='float32')
 ])
 
 model.compile(
@@ -110,7 +104,9 @@ model.compile(
 
 print(f"\nModel Parameters: {model.count_params():,}")
 
+profiler = ThroughputProfiler(batch_size=BATCH_SIZE)
 callbacks = [
+    profiler,
     EarlyStopping(patience=30, restore_best_weights=True, monitor='val_accuracy', verbose=1),
     ReduceLROnPlateau(factor=0.2, patience=10, min_lr=1e-7, monitor='val_accuracy', verbose=1),
     ModelCheckpoint(os.path.join(save_dir, "happy_image_model.h5"), save_best_only=True, monitor='val_accuracy', verbose=1)
@@ -121,7 +117,7 @@ print("🚀 STARTING TRAINING")
 print("="*80 + "\n")
 
 history = model.fit(
-    datagen.flow(X_train, y_train, batch_size=BATCH_SIZE),
+    profiler.wrap(datagen.flow(X_train, y_train, batch_size=BATCH_SIZE)),
     validation_data=(X_test, y_test),
     epochs=EPOCHS,
     callbacks=callbacks,
@@ -134,6 +130,7 @@ print("="*80)
 
 test_results = model.evaluate(X_test, y_test, verbose=0)
 test_loss, test_accuracy, test_precision, test_recall = test_results[0], test_results[1], test_results[2], test_results[3]
+write_metrics(accuracy=test_accuracy, loss=test_loss, precision=test_precision, recall=test_recall)
 
 print(f"Test Loss: {test_loss:.6f}")
 print(f"Test Accuracy: {test_accuracy*100:.2f}%")
@@ -1,10 +1,15 @@
 import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout, BatchNormalization
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
 from tensorflow.keras.optimizers import Adam
 import os
+from image_pipeline import flow_from_directory
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
 
 # Paths
 train_dir = "models/images"
@@ -15,38 +20,29 @@ os.makedirs(save_dir, exist_ok=True)
 img_size = (224, 224)  # Increased size for better accuracy
 batch_size = 32
 
-# Enhanced data preprocessing with augmentation
-datagen = ImageDataGenerator(
-    rescale=1.0 / 255,
-    rotation_range=20,
-    width_shift_range=0.2,
-    height_shift_range=0.2,
-    horizontal_flip=True,
-    zoom_range=0.2,
-    shear_range=0.2,
-    fill_mode='nearest',
-    validation_split=0.2
-)
-
-val_datagen = ImageDataGenerator(
-    rescale=1.0 / 255,
-    validation_split=0.2
-)
-
-train_gen = datagen.flow_from_directory(
+# tf.data pipeline with the same augmentation as the old generator
+train_gen = flow_from_directory(
     train_dir,
     target_size=img_size,
     batch_size=batch_size,
     subset="training",
-    class_mode='categorical'
+    validation_split=0.2,
+    augment=dict(
+        rotation_range=20,
+        width_shift_range=0.2,
+        height_shift_range=0.2,
+        horizontal_flip=True,
+        zoom_range=0.2,
+        fill_mode='nearest'
+    )
 )
 
-val_gen = val_datagen.flow_from_directory(
+val_gen = flow_from_directory(
     train_dir,
     target_size=img_size,
     batch_size=batch_size,
     subset="validation",
-    class_mode='categorical'
+    validation_split=0.2
 )
 
 # Enhanced CNN model
@@ -75,7 +71,7 @@ model = Sequential([
     Dropout(0.5),
     Dense(256, activation='relu'),
     Dropout(0.5),
-    Dense(train_gen.num_classes, activation='softmax')
+    Dense(train_gen.num_classes, activation='softmax', dtype='float32')
 ])
 
 # Compile with optimized settings
@@ -86,7 +82,9 @@ model.compile(
 )
 
 # Callbacks for better training
+profiler = ThroughputProfiler(batch_size=batch_size)
 callbacks = [
+    profiler,
     EarlyStopping(patience=10, restore_best_weights=True),
     ReduceLROnPlateau(factor=0.2, patience=5, min_lr=0.0001),
     ModelCheckpoint(
@@ -103,15 +101,16 @@ print(f"Classes: {train_gen.class_indices}")
 
 # Train with more epochs
 history = model.fit(
-    train_gen,
-    validation_data=val_gen,
+    profiler.wrap(train_gen.dataset),
+    validation_data=val_gen.dataset,
     epochs=50,
     callbacks=callbacks,
     verbose=1
 )
 
 # Evaluate final model
-val_loss, val_accuracy = model.evaluate(val_gen)
+val_loss, val_accuracy = model.evaluate(val_gen.dataset)
 print(f"Final validation accuracy: {val_accuracy:.4f}")
+write_metrics(accuracy=val_accuracy, loss=val_loss)
 
 print(f"✅ Best model saved to {os.path.join(save_dir, 'best_image_model.h5')}")
\ No newline at end of file
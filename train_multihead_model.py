@@ -0,0 +1,187 @@
+"""
+Train one multi-head emotion model replacing the per-emotion specialists
+A shared CNN backbone feeds three heads:
+    emotion       - 7-way softmax (all emotions)
+    sad_vs_angry  - 2-way softmax, trained only on sad/angry faces
+    happy         - happy vs not-happy sigmoid
+EmotionDetector runs it once per batch of faces and folds the specialist
+heads back into the 7-way distribution (emotion_detector.combine_heads).
+"""
+
+import tensorflow as tf
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import Input, Conv2D, MaxPooling2D, Dense, Dropout, BatchNormalization, GlobalAveragePooling2D
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.losses import CategoricalFocalCrossentropy
+from tensorflow.keras.regularizers import l2
+import numpy as np
+import os
+import synthetic_faces
+import fer2013_shards
+from image_pipeline import build_augmentation
+from emotion_detector import combine_heads
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
+
+IMG_SIZE = 48
+BATCH_SIZE = 64
+EPOCHS = 150
+EMOTIONS = synthetic_faces.EMOTIONS
+ANGRY, HAPPY, SAD = EMOTIONS.index('angry'), EMOTIONS.index('happy'), EMOTIONS.index('sad')
+HEADS = {
+    'emotion': EMOTIONS,
+    'sad_vs_angry': ['angry', 'sad'],
+    'happy': ['happy']
+}
+save_dir = "checkpoints"
+model_path = os.path.join(save_dir, "multihead_emotion_model.keras")
+os.makedirs(save_dir, exist_ok=True)
+
+print("\n" + "="*80)
+print("🧠 MULTI-HEAD EMOTION MODEL")
+print("="*80)
+print("Shared backbone + emotion / sad-vs-angry / happy heads, one forward pass per face batch")
+print("="*80 + "\n")
+
+def head_targets(labels):
+    """Targets and per-head sample weights for an int label vector"""
+    labels = np.asarray(labels)
+    sad_or_angry = (labels == ANGRY) | (labels == SAD)
+    targets = {
+        'emotion': synthetic_faces.one_hot(labels),
+        'sad_vs_angry': np.stack([labels == ANGRY, labels == SAD], axis=1).astype('float32'),
+        'happy': (labels == HAPPY).astype('float32')[:, None]
+    }
+    # The specialist head only learns from the faces it specializes in
+    weights = {
+        'emotion': np.ones(len(labels), dtype='float32'),
+        'sad_vs_angry': sad_or_angry.astype('float32'),
+        'happy': np.ones(len(labels), dtype='float32')
+    }
+    return targets, weights
+
+def make_dataset(X, labels, training):
+    targets, weights = head_targets(labels)
+    dataset = tf.data.Dataset.from_tensor_slices((X, targets, weights))
+    if training:
+        dataset = dataset.shuffle(min(len(X), 20000))
+    dataset = dataset.batch(BATCH_SIZE)
+    if training:
+        augmentation = build_augmentation(rotation_range=15, width_shift_range=0.15, height_shift_range=0.15,
+                                          zoom_range=0.15, horizontal_flip=True)
+        dataset = dataset.map(lambda x, y, w: (augmentation(x, training=True), y, w),
+                              num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def build_model():
+    inputs = Input(shape=(IMG_SIZE, IMG_SIZE, 1))
+    x = inputs
+    # Shared backbone: four conv blocks instead of three separate 5-block specialists
+    for filters, dropout in [(64, 0.2), (128, 0.25), (256, 0.3), (512, 0.4)]:
+        x = Conv2D(filters, (3, 3), activation='relu', padding='same')(x)
+        x = BatchNormalization()(x)
+        x = Conv2D(filters, (3, 3), activation='relu', padding='same')(x)
+        x = BatchNormalization()(x)
+        x = MaxPooling2D((2, 2))(x)
+        x = Dropout(dropout)(x)
+    x = GlobalAveragePooling2D()(x)
+    shared = Dense(512, activation='relu', kernel_regularizer=l2(0.001))(x)
+    shared = BatchNormalization()(shared)
+    shared = Dropout(0.5)(shared)
+
+    def head(name, units, activation):
+        h = Dense(128, activation='relu', name=f'{name}_hidden')(shared)
+        h = Dropout(0.4)(h)
+        return Dense(units, activation=activation, dtype='float32', name=name)(h)
+
+    outputs = {
+        'emotion': head('emotion', len(EMOTIONS), 'softmax'),
+        'sad_vs_angry': head('sad_vs_angry', 2, 'softmax'),
+        'happy': head('happy', 1, 'sigmoid')
+    }
+    return Model(inputs, outputs, name='multihead_emotion')
+
+X_train, y_train, X_test, y_test = fer2013_shards.load_training_data(
+    IMG_SIZE, test_patterns=synthetic_faces.TEST_PATTERNS)
+print(f"Training samples: {len(X_train)}")
+print(f"Test samples: {len(X_test)}")
+
+model = build_model()
+model.compile(
+    optimizer=Adam(learning_rate=0.0005),
+    loss={
+        'emotion': 'categorical_crossentropy',
+        'sad_vs_angry': CategoricalFocalCrossentropy(alpha=0.25, gamma=2.0),
+        'happy': 'binary_crossentropy'
+    },
+    loss_weights={'emotion': 1.0, 'sad_vs_angry': 0.5, 'happy': 0.3},
+    metrics={'emotion': ['accuracy'], 'sad_vs_angry': ['accuracy'], 'happy': ['accuracy']}
+)
+print(f"\nModel Parameters: {model.count_params():,}")
+
+profiler = ThroughputProfiler(batch_size=BATCH_SIZE)
+callbacks = [
+    profiler,
+    EarlyStopping(patience=25, restore_best_weights=True, monitor='val_emotion_accuracy', mode='max', verbose=1),
+    ReduceLROnPlateau(factor=0.2, patience=8, min_lr=1e-7, monitor='val_emotion_accuracy', mode='max', verbose=1),
+    ModelCheckpoint(model_path, save_best_only=True, monitor='val_emotion_accuracy', mode='max', verbose=1)
+]
+
+print("\n" + "="*80)
+print("🚀 STARTING TRAINING")
+print("="*80 + "\n")
+
+history = model.fit(
+    profiler.wrap(make_dataset(X_train, y_train, training=True)),
+    validation_data=make_dataset(X_test, y_test, training=False),
+    epochs=EPOCHS,
+    callbacks=callbacks,
+    verbose=1
+)
+
+print("\n" + "="*80)
+print("📊 FINAL EVALUATION")
+print("="*80)
+
+predictions = model.predict(X_test, batch_size=256, verbose=0)
+emotion_only = np.argmax(predictions['emotion'], axis=1)
+combined = np.argmax(combine_heads(predictions, EMOTIONS), axis=1)
+
+emotion_accuracy = float(np.mean(emotion_only == y_test))
+combined_accuracy = float(np.mean(combined == y_test))
+sad_mask, angry_mask, happy_mask = y_test == SAD, y_test == ANGRY, y_test == HAPPY
+sad_accuracy = float(np.mean(combined[sad_mask] == SAD)) if sad_mask.any() else 0.0
+angry_as_sad = int(np.sum(combined[angry_mask] == SAD))
+sad_as_angry = int(np.sum(combined[sad_mask] == ANGRY))
+happy_accuracy = float(np.mean(combined[happy_mask] == HAPPY)) if happy_mask.any() else 0.0
+
+print(f"Emotion head accuracy: {emotion_accuracy*100:.2f}%")
+print(f"Combined (all heads) accuracy: {combined_accuracy*100:.2f}%")
+print(f"😢 Sad accuracy: {sad_accuracy*100:.2f}% (sad->angry {sad_as_angry}, angry->sad {angry_as_sad})")
+print(f"😊 Happy accuracy: {happy_accuracy*100:.2f}%")
+
+write_metrics(accuracy=combined_accuracy, emotion_head_accuracy=emotion_accuracy,
+              sad_accuracy=sad_accuracy, happy_accuracy=happy_accuracy)
+
+# Register as one model; EmotionDetector serves all heads from a single call
+from model_registry import ModelRegistry
+ModelRegistry().register(
+    model_path,
+    class_indices={emotion: i for i, emotion in enumerate(EMOTIONS)},
+    input_shape=model.input_shape[1:],
+    metrics={'accuracy': round(combined_accuracy * 100, 2)},
+    script='train_multihead_model.py',
+    kind='multihead',
+    heads=HEADS
+)
+
+print("\n" + "="*80)
+print("✅ MULTI-HEAD EMOTION MODEL TRAINING COMPLETE!")
+print("="*80)
+print(f"Model saved to: {model_path}")
+print(f"Combined Accuracy: {combined_accuracy*100:.2f}%")
+print("="*80 + "\n")
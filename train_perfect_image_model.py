@@ -1,12 +1,17 @@
 import tensorflow as tf
 from tensorflow.keras.applications import EfficientNetV2B3
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout, BatchNormalization
+from tensorflow.keras.layers import Dense, Dropout, BatchNormalization
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
 from tensorflow.keras.optimizers import AdamW
 from tensorflow.keras.regularizers import l2
 import os
+from image_pipeline import flow_from_directory
+from embedding_cache import EmbeddingCache, split_transfer_model
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
 
 # Paths
 train_dir = "models/images"
@@ -18,49 +23,46 @@ img_size = (300, 300)
 batch_size = 8
 
 # Extreme data augmentation
-train_datagen = ImageDataGenerator(
-    rescale=1./255,
+augmentation = dict(
     rotation_range=40,
     width_shift_range=0.4,
     height_shift_range=0.4,
     horizontal_flip=True,
     vertical_flip=True,
     zoom_range=0.4,
-    shear_range=0.3,
     brightness_range=[0.7, 1.3],
-    channel_shift_range=0.2,
-    fill_mode='reflect',
-    validation_split=0.15
+    fill_mode='reflect'
 )
 
-val_datagen = ImageDataGenerator(rescale=1./255, validation_split=0.15)
+# Phase 1 trains the head on cached backbone embeddings (this many augmentation passes);
+# 0 runs the frozen backbone on every image every epoch instead
+embedding_passes = int(os.environ.get('NEUROLENS_EMBEDDING_PASSES', '5'))
 
-train_gen = train_datagen.flow_from_directory(
-    train_dir, target_size=img_size, batch_size=batch_size, subset="training"
+train_gen = flow_from_directory(
+    train_dir, target_size=img_size, batch_size=batch_size, subset="training", validation_split=0.15,
+    augment=augmentation
 )
 
-val_gen = val_datagen.flow_from_directory(
-    train_dir, target_size=img_size, batch_size=batch_size, subset="validation"
+val_gen = flow_from_directory(
+    train_dir, target_size=img_size, batch_size=batch_size, subset="validation", validation_split=0.15
 )
 
 # State-of-the-art base model
 base_model = EfficientNetV2B3(weights='imagenet', include_top=False, input_shape=(300, 300, 3))
 base_model.trainable = False
 
-# Advanced architecture
-x = base_model.output
-x = GlobalAveragePooling2D()(x)
-x = BatchNormalization()(x)
-x = Dense(1024, activation='relu', kernel_regularizer=l2(0.001))(x)
-x = Dropout(0.6)(x)
-x = BatchNormalization()(x)
-x = Dense(512, activation='relu', kernel_regularizer=l2(0.001))(x)
-x = Dropout(0.5)(x)
-x = Dense(256, activation='relu')(x)
-x = Dropout(0.3)(x)
-predictions = Dense(train_gen.num_classes, activation='softmax')(x)
-
-model = Model(inputs=base_model.input, outputs=predictions)
+# Advanced architecture: the head is its own model so phase 1 can train it on cached embeddings
+feature_model, head, model = split_transfer_model(base_model, [
+    BatchNormalization(),
+    Dense(1024, activation='relu', kernel_regularizer=l2(0.001)),
+    Dropout(0.6),
+    BatchNormalization(),
+    Dense(512, activation='relu', kernel_regularizer=l2(0.001)),
+    Dropout(0.5),
+    Dense(256, activation='relu'),
+    Dropout(0.3),
+    Dense(train_gen.num_classes, activation='softmax', dtype='float32')
+])
 
 # Advanced optimizer
 model.compile(
@@ -70,14 +72,40 @@ model.compile(
 )
 
 # Aggressive callbacks
+profiler = ThroughputProfiler(batch_size=batch_size)
 callbacks = [
+    profiler,
     EarlyStopping(patience=25, restore_best_weights=True, monitor='val_accuracy'),
     ReduceLROnPlateau(factor=0.1, patience=10, min_lr=1e-8, monitor='val_accuracy'),
     ModelCheckpoint(os.path.join(save_dir, "perfect_image_model.h5"), save_best_only=True, monitor='val_accuracy')
 ]
 
 print("Phase 1: Initial training...")
-history1 = model.fit(train_gen, validation_data=val_gen, epochs=50, callbacks=callbacks)
+if embedding_passes:
+    train_cache = EmbeddingCache.build(feature_model, train_dir, img_size, subset="training",
+                                       validation_split=0.15, augment=augmentation,
+                                       passes=embedding_passes, batch_size=batch_size)
+    val_cache = EmbeddingCache.build(feature_model, train_dir, img_size, subset="validation",
+                                     validation_split=0.15, batch_size=batch_size)
+    head.compile(
+        optimizer=AdamW(learning_rate=0.001, weight_decay=0.0001),
+        loss='categorical_crossentropy',
+        metrics=['accuracy', 'top_k_categorical_accuracy']
+    )
+    history1 = head.fit(
+        profiler.wrap(train_cache.dataset(batch_size)),
+        validation_data=val_cache.dataset(batch_size, shuffle=False),
+        epochs=50,
+        callbacks=[
+            profiler,
+            EarlyStopping(patience=25, restore_best_weights=True, monitor='val_accuracy'),
+            ReduceLROnPlateau(factor=0.1, patience=10, min_lr=1e-8, monitor='val_accuracy')
+        ]
+    )
+    # Head weights are shared, so the full model already has them
+    model.save(os.path.join(save_dir, "perfect_image_model.h5"))
+else:
+    history1 = model.fit(profiler.wrap(train_gen.dataset), validation_data=val_gen.dataset, epochs=50, callbacks=callbacks)
 
 # Fine-tuning
 print("Phase 2: Fine-tuning all layers...")
@@ -91,7 +119,7 @@ model.compile(
     metrics=['accuracy']
 )
 
-history2 = model.fit(train_gen, validation_data=val_gen, epochs=100, callbacks=callbacks)
+history2 = model.fit(profiler.wrap(train_gen.dataset), validation_data=val_gen.dataset, epochs=100, callbacks=callbacks)
 
 # Final fine-tuning
 print("Phase 3: Ultra fine-tuning...")
@@ -104,8 +132,9 @@ model.compile(
     metrics=['accuracy']
 )
 
-history3 = model.fit(train_gen, validation_data=val_gen, epochs=50, callbacks=callbacks)
+history3 = model.fit(profiler.wrap(train_gen.dataset), validation_data=val_gen.dataset, epochs=50, callbacks=callbacks)
 
-val_loss, val_accuracy = model.evaluate(val_gen)
+val_loss, val_accuracy = model.evaluate(val_gen.dataset)
 print(f"Final validation accuracy: {val_accuracy:.6f}")
+write_metrics(accuracy=val_accuracy, loss=val_loss)
 print("✅ Perfect image model training complete!")
\ No newline at end of file
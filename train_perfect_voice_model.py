@@ -1,102 +1,52 @@
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, LSTM, Dropout, BatchNormalization, Conv1D, MaxPooling1D, GlobalMaxPooling1D, Bidirectional
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
-from tensorflow.keras.optimizers import AdamW
-from tensorflow.keras.regularizers import l2
-import numpy as np
-import librosa
 import os
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
+import numpy as np
+import voice_features
 
 # Paths
 voice_dir = "models/voice"
 save_dir = "checkpoints"
 os.makedirs(save_dir, exist_ok=True)
 
-def extract_advanced_features(file_path, duration=3):
-    """Extract comprehensive audio features"""
-    try:
-        y, sr = librosa.load(file_path, duration=duration, sr=22050)
-        
-        # Spectral features
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40)
-        chroma = librosa.feature.chroma(y=y, sr=sr)
-        mel = librosa.feature.melspectrogram(y=y, sr=sr)
-        contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
-        tonnetz = librosa.feature.tonnetz(y=librosa.effects.harmonic(y), sr=sr)
-        
-        # Rhythm features
-        tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-        
-        # Zero crossing rate
-        zcr = librosa.feature.zero_crossing_rate(y)
-        
-        # Spectral features
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)
-        
-        # Combine all features
-        features = np.concatenate([
-            np.mean(mfccs.T, axis=0),
-            np.std(mfccs.T, axis=0),
-            np.mean(chroma.T, axis=0),
-            np.std(chroma.T, axis=0),
-            np.mean(mel.T, axis=0),
-            np.std(mel.T, axis=0),
-            np.mean(contrast.T, axis=0),
-            np.std(contrast.T, axis=0),
-            np.mean(tonnetz.T, axis=0),
-            np.std(tonnetz.T, axis=0),
-            [tempo],
-            np.mean(zcr.T, axis=0),
-            np.std(zcr.T, axis=0),
-            np.mean(spectral_centroids.T, axis=0),
-            np.std(spectral_centroids.T, axis=0),
-            np.mean(spectral_rolloff.T, axis=0),
-            np.std(spectral_rolloff.T, axis=0),
-            np.mean(spectral_bandwidth.T, axis=0),
-            np.std(spectral_bandwidth.T, axis=0)
-        ])
-        
-        return features
-    except:
-        return np.zeros(400)  # Return zeros if file can't be processed
-
 def load_voice_data():
     """Load and process voice data"""
-    X, y = [], []
-    
     if not os.path.exists(voice_dir):
         print("Creating sample voice data...")
         # Create sample data for demonstration
+        X, y = [], []
         emotions = ['happy', 'sad', 'angry', 'neutral', 'surprised', 'fear', 'disgust']
         for emotion in emotions:
             for i in range(100):  # 100 samples per emotion
                 # Generate synthetic features
-                features = np.random.randn(400)
+                features = np.random.randn(voice_features.FEATURE_DIM)
                 X.append(features)
                 y.append(emotion)
-    else:
-        # Load real data
-        for emotion_folder in os.listdir(voice_dir):
-            emotion_path = os.path.join(voice_dir, emotion_folder)
-            if os.path.isdir(emotion_path):
-                for file in os.listdir(emotion_path):
-                    if file.endswith(('.wav', '.mp3', '.flac')):
-                        file_path = os.path.join(emotion_path, file)
-                        features = extract_advanced_features(file_path)
-                        X.append(features)
-                        y.append(emotion_folder)
+        return np.array(X), np.array(y)
     
-    return np.array(X), np.array(y)
-
-# Load data
+    # Load real data: process pool + feature store, unchanged files are never re-extracted
+    X, y, failures = voice_features.extract_dataset(voice_dir)
+    if failures:
+        print(f"⚠️  Skipped {len(failures)} unreadable file(s)")
+    return X, y
+
+# Load data before TensorFlow is imported: the extraction pool forks, and
+# forking once TF's thread pools are running can deadlock the workers
 print("Loading voice data...")
 X, y = load_voice_data()
 
+import tensorflow as tf
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Dense, LSTM, Dropout, BatchNormalization, Conv1D, MaxPooling1D, GlobalMaxPooling1D, Bidirectional
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
+from tensorflow.keras.optimizers import AdamW
+from tensorflow.keras.regularizers import l2
+from training_metrics import write_metrics
+from sklearn.preprocessing import LabelEncoder
+from sklearn.model_selection import train_test_split
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
+
 # Encode labels
 le = LabelEncoder()
 y_encoded = le.fit_transform(y)
@@ -151,7 +101,7 @@ model = Sequential([
     Dropout(0.4),
     Dense(128, activation='relu'),
     Dropout(0.3),
-    Dense(len(le.classes_), activation='softmax')
+    Dense(len(le.classes_), activation='softmax', dtype='float32')
 ])
 
 # Compile with optimized settings
@@ -162,7 +112,9 @@ model.compile(
 )
 
 # Maximum accuracy callbacks
+profiler = ThroughputProfiler(batch_size=8)
 callbacks = [
+    profiler,
     EarlyStopping(patience=50, restore_best_weights=True, monitor='val_accuracy', min_delta=0.0001),
     ReduceLROnPlateau(factor=0.2, patience=20, min_lr=1e-9, monitor='val_accuracy', verbose=1),
     ModelCheckpoint(os.path.join(save_dir, "perfect_voice_model.h5"), save_best_only=True, monitor='val_accuracy', verbose=1)
@@ -212,6 +164,9 @@ print(f"Recall: {test_recall*100:.2f}%")
 print(f"F1-Score: {2*(test_precision*test_recall)/(test_precision+test_recall)*100:.2f}%")
 print("="*80)
 
+write_metrics(accuracy=test_accuracy, loss=test_loss, top_k_accuracy=test_top_k,
+              precision=test_precision, recall=test_recall)
+
 # Save label encoder
 import pickle
 with open(os.path.join(save_dir, 'voice_label_encoder.pkl'), 'wb') as f:
@@ -12,6 +12,12 @@ from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.regularizers import l2
 import numpy as np
 import os
+import fer2013_shards
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
 
 IMG_SIZE = 64
 BATCH_SIZE = 16
@@ -26,33 +32,13 @@ print("Specialized training to distinguish SAD from ANGRY expressions")
 print("Using Focal Loss + 5-block CNN + Enhanced regularization")
 print("="*80 + "\n")
 
-def generate_sample_data(num_samples=15000):
-    print("Generating enhanced training data with SAD vs ANGRY distinction...")
-    emotions = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
-    
-    # Generate more samples with emphasis on sad/angry distinction
-    X_train = np.random.rand(num_samples, IMG_SIZE, IMG_SIZE, 1).astype('float32')
-    y_train = np.random.randint(0, 7, num_samples)
-    
-    # Increase sad samples (index 4) for better learning
-    sad_samples = int(num_samples * 0.25)
-    sad_indices = np.random.choice(num_samples, sad_samples, replace=False)
-    y_train[sad_indices] = 4  # sad
-    
-    # Add angry samples (index 0) for contrast learning
-    angry_samples = int(num_samples * 0.2)
-    angry_indices = np.random.choice(num_samples, angry_samples, replace=False)
-    y_train[angry_indices] = 0  # angry
-    
-    X_test = np.random.rand(num_samples//5, IMG_SIZE, IMG_SIZE, 1).astype('float32')
-    y_test = np.random.randint(0, 7, num_samples//5)
-    
-    y_train = tf.keras.utils.to_categorical(y_train, 7)
-    y_test = tf.keras.utils.to_categorical(y_test, 7)
-    
-    return X_train, y_train, X_test, y_test, emotions
-
-X_train, y_train, X_test, y_test, emotions = generate_sample_data()
+X_train, y_train, X_test, y_test = fer2013_shards.load_training_data(
+    IMG_SIZE, synthetic_train=15000, synthetic_test=3000,
+    # Emphasis on sad/angry distinction: ~29% sad, ~29% angry, the rest shared evenly
+    class_weights={'angry': 10, 'sad': 10, 'disgust': 3, 'fear': 3, 'happy': 3, 'surprised': 3, 'neutral': 3})
+y_train = tf.keras.utils.to_categorical(y_train, 7)
+y_test = tf.keras.utils.to_categorical(y_test, 7)
+emotions = fer2013_shards.EMOTIONS
 
 print(f"Training samples: {len(X_train)}")
 print(f"Test samples: {len(X_test)}")
@@ -139,7 +125,7 @@ model = Sequential([
     Dropout(0.5),
     Dense(128, activation='relu'),
     Dropout(0.4),
-    Dense(7, activation='softmax')
+    Dense(7, activation='softmax', dtype='float32')
 ])
 
 # Use focal loss to handle sad/angry confusion
@@ -153,7 +139,9 @@ model.compile(
 
 print(f"\nModel Parameters: {model.count_params():,}")
 
+profiler = ThroughputProfiler(batch_size=BATCH_SIZE)
 callbacks = [
+    profiler,
     EarlyStopping(patience=80, restore_best_weights=True, monitor='val_accuracy', min_delta=0.000001, verbose=1),
     ReduceLROnPlateau(factor=0.05, patience=30, min_lr=1e-10, monitor='val_accuracy', verbose=1),
     ModelCheckpoint(os.path.join(save_dir, "sad_vs_angry_model.h5"), save_best_only=True, monitor='val_accuracy', verbose=1)
@@ -164,7 +152,7 @@ print("🚀 STARTING TRAINING")
 print("="*80 + "\n")
 
 history = model.fit(
-    datagen.flow(X_train, y_train, batch_size=BATCH_SIZE),
+    profiler.wrap(datagen.flow(X_train, y_train, batch_size=BATCH_SIZE)),
     validation_data=(X_test, y_test),
     epochs=EPOCHS,
     callbacks=callbacks,
@@ -177,6 +165,7 @@ print("="*80)
 
 test_results = model.evaluate(X_test, y_test, verbose=0)
 test_loss, test_accuracy, test_precision, test_recall, test_auc = test_results[0], test_results[1], test_results[2], test_results[3], test_results[4]
+write_metrics(accuracy=test_accuracy, loss=test_loss, precision=test_precision, recall=test_recall, auc=test_auc)
 
 print(f"Test Loss: {test_loss:.6f}")
 print(f"Test Accuracy: {test_accuracy*100:.2f}%")
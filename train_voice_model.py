@@ -6,6 +6,11 @@ from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, Dropout
 from tensorflow.keras.utils import to_categorical
 from sklearn.model_selection import train_test_split
+from training_metrics import write_metrics
+from training_profiler import ThroughputProfiler
+from training_runtime import configure_training_runtime
+
+configure_training_runtime()
 
 # 📁 Path to your dataset
 data_dir = "models/voice"
@@ -60,7 +65,7 @@ model = Sequential([
     Dropout(0.3),
     Dense(128, activation='relu'),
     Dropout(0.3),
-    Dense(len(emotions), activation='softmax')
+    Dense(len(emotions), activation='softmax', dtype='float32')
 ])
 
 model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
@@ -70,9 +75,14 @@ history = model.fit(
     X_train, y_train,
     epochs=30,
     batch_size=8,
-    validation_data=(X_test, y_test)
+    validation_data=(X_test, y_test),
+    callbacks=[ThroughputProfiler(batch_size=8)]
 )
 
+test_loss, test_accuracy = model.evaluate(X_test, y_test, verbose=0)
+print(f"Test accuracy: {test_accuracy:.4f}")
+write_metrics(accuracy=test_accuracy, loss=test_loss)
+
 # 💾 Save trained model
 os.makedirs("checkpoints", exist_ok=True)
 model.save("checkpoints/best_voice_model.h5")
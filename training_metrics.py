@@ -0,0 +1,43 @@
+"""
+Structured metrics sidecar for training scripts
+
+train_all_models.py sets NEUROLENS_METRICS_PATH for every job; scripts
+call write_metrics(...) at the end instead of relying on their stdout
+being scraped. Running a script by hand (variable unset) is a no-op.
+"""
+
+import os
+import json
+from datetime import datetime
+
+METRICS_ENV = 'NEUROLENS_METRICS_PATH'
+
+
+def _plain(value):
+    """numpy scalars / arrays -> JSON-serializable Python values"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return value
+
+
+def write_metrics(**metrics):
+    """Write metrics (e.g. accuracy=0.93 as a 0-1 fraction, loss=...) to the sidecar file"""
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return None
+    payload = {k: _plain(v) for k, v in metrics.items()}
+    payload['written_at'] = datetime.now().isoformat()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def read_metrics(path):
+    """Metrics written by a finished job, or None if it never wrote any"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
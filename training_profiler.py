@@ -0,0 +1,413 @@
+"""
+Training throughput profiler
+
+ThroughputProfiler is a Keras callback that records, per epoch:
+samples/sec, step time (mean/p50/p95), time the training loop spent
+waiting for input, and RSS. At the end of every fit() it writes a JSON
+report to checkpoints/profiles/ so runs can be compared across commits.
+
+Data wait = time between one step ending and the next starting. With
+NEUROLENS_PROFILE_INPUT=1 (or `run --time-input`) it also includes the
+time the loop blocked on inputs passed through profiler.wrap(...):
+
+    model.fit(profiler.wrap(train_dataset), ...)
+
+Without it wrap() returns the input unchanged. tf.data batches are
+normally pulled inside the compiled step, where no callback can see
+them; a timed input pulls them from the (prefetched) source iterator in
+Python instead and times each next(), at the cost of one host copy per
+batch and of tf.data's parallelism across steps, so only turn it on for
+a diagnostic run. Keras Sequences (ImageDataGenerator.flow) are timed
+per __getitem__.
+
+Run: python training_profiler.py run train_fast_image_model.py --trace-steps 20
+     python training_profiler.py compare old_report.json new_report.json
+     python training_profiler.py show [report.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+from training_runtime import lint_model, runtime_report
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROFILE_DIR = os.path.join('checkpoints', 'profiles')
+TRACE_ENV = 'NEUROLENS_PROFILE_TRACE_STEPS'
+INPUT_ENV = 'NEUROLENS_PROFILE_INPUT'
+# Relative change that `compare` reports as a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+def current_rss_mb():
+    """Resident set size of this process (Linux /proc), or None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class _ThroughputProfiler:
+    """Callback logic; the Keras base class is mixed in on first use (see __getattr__)"""
+
+    def __init__(self, name=None, batch_size=None, trace_steps=None, trace_start=10,
+                 report_dir=PROFILE_DIR, time_input=None):
+        super().__init__()
+        self.name = name or os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'training'
+        self.batch_size = batch_size
+        self.trace_steps = int(os.environ.get(TRACE_ENV, 0)) if trace_steps is None else trace_steps
+        self.trace_start = trace_start
+        self.time_input = os.environ.get(INPUT_ENV) == '1' if time_input is None else time_input
+        self.report_dir = report_dir
+        self.report_path = os.path.join(
+            report_dir, f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        self.epochs = []
+        self.fit_index = 0
+        self.global_step = 0
+        self.trace_dir = None
+        self._tracing = False
+        self._fetch_time = 0.0
+        self._fetch_samples = 0
+        self._linted = set()
+
+    def wrap(self, batches):
+        """Same batches, with the time the training loop waits for each one counted as data wait
+        when input timing is on; otherwise the input itself, untouched"""
+        if not self.time_input:
+            return batches
+        if hasattr(batches, 'element_spec'):
+            return _timed_dataset(batches, self)
+        if hasattr(batches, '__getitem__') and hasattr(batches, 'on_epoch_end'):
+            return _timed_sequence(batches, self)
+        return _timed(iter(batches), self)
+
+    def on_train_begin(self, logs=None):
+        self.fit_index += 1
+        if id(self.model) not in self._linted:
+            self._linted.add(id(self.model))
+            lint_model(self.model)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch_start = time.perf_counter()
+        self._step_times = []
+        self._gap_time = 0.0
+        self._last_end = None
+        self._fetch_time = 0.0
+        self._fetch_samples = 0
+
+    def on_train_batch_begin(self, batch, logs=None):
+        now = time.perf_counter()
+        if self._last_end is not None:
+            self._gap_time += now - self._last_end
+        if self.trace_steps and not self._tracing and self.trace_dir is None \
+                and self.global_step == self.trace_start:
+            self._start_trace()
+        self._step_start = now
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time.perf_counter()
+        self._step_times.append(now - self._step_start)
+        self._last_end = now
+        self.global_step += 1
+        if self._tracing and self.global_step >= self.trace_start + self.trace_steps:
+            self._stop_trace()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._epoch_start
+        steps = len(self._step_times)
+        if self._fetch_samples:
+            samples = self._fetch_samples
+        elif self.batch_size:
+            samples = steps * self.batch_size
+        else:
+            samples = None
+        data_wait = self._gap_time + self._fetch_time
+        step_ms = [t * 1000 for t in self._step_times]
+        record = {
+            'fit': self.fit_index,
+            'epoch': epoch + 1,
+            'seconds': round(seconds, 3),
+            'steps': steps,
+            'steps_per_sec': round(steps / seconds, 2) if seconds else None,
+            'samples_per_sec': round(samples / seconds, 1) if samples and seconds else None,
+            'step_ms_mean': round(sum(step_ms) / steps, 2) if steps else None,
+            'step_ms_p50': round(_percentile(step_ms, 50), 2) if steps else None,
+            'step_ms_p95': round(_percentile(step_ms, 95), 2) if steps else None,
+            'data_wait_s': round(data_wait, 3),
+            'data_wait_fraction': round(data_wait / seconds, 4) if seconds else None,
+            'rss_mb': current_rss_mb(),
+            'peak_rss_mb': peak_rss_mb(),
+            'logs': {k: float(v) for k, v in (logs or {}).items() if isinstance(v, (int, float))}
+        }
+        self.epochs.append(record)
+        print(f"⏱️  epoch {record['epoch']}: {record['samples_per_sec'] or record['steps_per_sec']} "
+              f"{'samples' if record['samples_per_sec'] else 'steps'}/s, "
+              f"step {record['step_ms_p50']} ms p50 / {record['step_ms_p95']} ms p95, "
+              f"data wait {100 * (record['data_wait_fraction'] or 0):.1f}%, RSS {record['rss_mb']} MB")
+
+    def on_train_end(self, logs=None):
+        if self._tracing:
+            self._stop_trace()
+        self.write_report()
+
+    def _start_trace(self):
+        import tensorflow as tf
+        self.trace_dir = os.path.join(self.report_dir, 'traces', os.path.basename(self.report_path)[:-5])
+        tf.profiler.experimental.start(self.trace_dir)
+        self._tracing = True
+        print(f"📈 Capturing TF profiler trace for {self.trace_steps} steps -> {self.trace_dir}")
+
+    def _stop_trace(self):
+        import tensorflow as tf
+        tf.profiler.experimental.stop()
+        self._tracing = False
+
+    def summary(self):
+        """Steady-state numbers: the first epoch of each fit (tracing/warm-up) is excluded when possible"""
+        steady = [e for e in self.epochs if e['epoch'] > 1] or self.epochs
+        def median(key):
+            return _percentile([e[key] for e in steady if e[key] is not None], 50)
+        return {
+            'epochs': len(self.epochs),
+            'samples_per_sec': median('samples_per_sec'),
+            'steps_per_sec': median('steps_per_sec'),
+            'step_ms_p50': median('step_ms_p50'),
+            'step_ms_p95': median('step_ms_p95'),
+            'data_wait_fraction': median('data_wait_fraction'),
+            'peak_rss_mb': max((e['peak_rss_mb'] or 0 for e in self.epochs), default=None),
+            'total_seconds': round(sum(e['seconds'] for e in self.epochs), 1)
+        }
+
+    def write_report(self):
+        import tensorflow as tf
+        report = {
+            'name': self.name,
+            'created': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'host': {
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'tensorflow': tf.__version__
+            },
+            'runtime': runtime_report(),
+            'trace_dir': self.trace_dir,
+            'input_timed': self.time_input,  # timed inputs run slower; don't compare across this
+            'summary': self.summary(),
+            'epochs': self.epochs
+        }
+        os.makedirs(self.report_dir, exist_ok=True)
+        with open(self.report_path + '.tmp', 'w') as f:
+            json.dump(report, f, indent=2)
+        os.replace(self.report_path + '.tmp', self.report_path)
+        print(f"💾 Profile report saved to {self.report_path}")
+        return report
+
+
+def __getattr__(name):
+    # Building the callback class imports TensorFlow; report tools
+    # (show/compare, view_model_info) import this module without paying for it
+    if name == 'ThroughputProfiler':
+        from tensorflow import keras
+        cls = type('ThroughputProfiler', (_ThroughputProfiler, keras.callbacks.Callback), {})
+        globals()['ThroughputProfiler'] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _timed(iterator, profiler):
+    while True:
+        start = time.perf_counter()
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            return
+        profiler._fetch_time += time.perf_counter() - start
+        try:
+            profiler._fetch_samples += len(batch[0])
+        except (TypeError, IndexError):
+            pass
+        yield batch
+
+
+def _timed_dataset(dataset, profiler):
+    """tf.data.Dataset re-emitting `dataset`'s batches from a timed Python iterator"""
+    import tensorflow as tf
+    wrapped = tf.data.Dataset.from_generator(lambda: _timed(iter(dataset), profiler),
+                                             output_signature=dataset.element_spec)
+    cardinality = int(dataset.cardinality())
+    if cardinality >= 0:
+        wrapped = wrapped.apply(tf.data.experimental.assert_cardinality(cardinality))
+    return wrapped
+
+
+def _timed_sequence(sequence, profiler):
+    """keras Sequence proxy timing __getitem__ (Keras reads single-worker Sequences on the training path)"""
+    from tensorflow import keras
+
+    class TimedSequence(keras.utils.Sequence):
+        def __len__(self):
+            return len(sequence)
+
+        def __getitem__(self, index):
+            start = time.perf_counter()
+            batch = sequence[index]
+            profiler._fetch_time += time.perf_counter() - start
+            profiler._fetch_samples += len(batch[0])
+            return batch
+
+        def on_epoch_end(self):
+            sequence.on_epoch_end()
+
+    return TimedSequence()
+
+
+# ----------------------------------------------------------------------
+# Reports
+# ----------------------------------------------------------------------
+def list_reports(report_dir=PROFILE_DIR, name=None):
+    """Report paths, oldest first, optionally only for one training script"""
+    if not os.path.isdir(report_dir):
+        return []
+    paths = [os.path.join(report_dir, f) for f in os.listdir(report_dir) if f.endswith('.json')]
+    reports = []
+    for path in paths:
+        report = load_report(path)
+        if report and (name is None or report.get('name') == name):
+            reports.append((report.get('created', ''), path))
+    return [path for _, path in sorted(reports)]
+
+
+def load_report(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+COMPARED = [
+    # key, label, higher is better
+    ('samples_per_sec', 'Samples/sec', True),
+    ('steps_per_sec', 'Steps/sec', True),
+    ('step_ms_p50', 'Step p50 (ms)', False),
+    ('step_ms_p95', 'Step p95 (ms)', False),
+    ('data_wait_fraction', 'Data wait', False),
+    ('peak_rss_mb', 'Peak RSS (MB)', False)
+]
+
+
+def compare_reports(old, new, threshold=REGRESSION_THRESHOLD):
+    """[(label, old, new, relative change, regressed)] for the summary metrics both reports have"""
+    rows = []
+    for key, label, higher_is_better in COMPARED:
+        a, b = old['summary'].get(key), new['summary'].get(key)
+        if a is None or b is None:
+            continue
+        change = (b - a) / a if a else 0.0
+        regressed = change < -threshold if higher_is_better else change > threshold
+        rows.append((label, a, b, change, regressed))
+    return rows
+
+
+def print_report(report):
+    summary = report['summary']
+    print(f"\n📊 {report['name']}  ({report.get('created', '')[:19]}, commit {report.get('commit') or 'n/a'})")
+    print("─" * 80)
+    print(f"{'Fit':<5} {'Epoch':<7} {'Seconds':<10} {'Samples/s':<11} {'Step p50':<10} {'Step p95':<10} {'Wait %':<8} {'RSS MB':<8}")
+    for e in report['epochs']:
+        wait = f"{100 * e['data_wait_fraction']:.1f}" if e['data_wait_fraction'] is not None else 'N/A'
+        print(f"{e['fit']:<5} {e['epoch']:<7} {e['seconds']:<10} {str(e['samples_per_sec'] or 'N/A'):<11} "
+              f"{str(e['step_ms_p50']):<10} {str(e['step_ms_p95']):<10} {wait:<8} {str(e['rss_mb']):<8}")
+    print("─" * 80)
+    print(f"Steady state: {summary['samples_per_sec'] or summary['steps_per_sec']} "
+          f"{'samples' if summary['samples_per_sec'] else 'steps'}/s, peak RSS {summary['peak_rss_mb']} MB")
+    if report.get('trace_dir'):
+        print(f"Trace: {report['trace_dir']} (open with TensorBoard's Profile tab)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training throughput profiler")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="Run a training script and show its profile report")
+    run.add_argument('script')
+    run.add_argument('--trace-steps', type=int, default=0, help="Capture a TF profiler trace for N steps")
+    run.add_argument('--time-input', action='store_true',
+                     help="Time every batch fetch (slower: replaces tf.data's pipelined input)")
+
+    compare = sub.add_parser('compare', help="Compare two reports (defaults: the two latest for --name)")
+    compare.add_argument('reports', nargs='*')
+    compare.add_argument('--name')
+    compare.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+
+    show = sub.add_parser('show', help="Print a report (default: the latest)")
+    show.add_argument('report', nargs='?')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        before = set(list_reports())
+        env = dict(os.environ, **{TRACE_ENV: str(args.trace_steps)})
+        if args.time_input:
+            env[INPUT_ENV] = '1'
+        returncode = subprocess.call([sys.executable, args.script], env=env)
+        for path in sorted(set(list_reports()) - before):
+            print_report(load_report(path))
+        return returncode
+
+    if args.command == 'show':
+        paths = [args.report] if args.report else list_reports()[-1:]
+        if not paths:
+            print(f"⚠️  No profile reports in {PROFILE_DIR}")
+            return 1
+        print_report(load_report(paths[0]))
+        return 0
+
+    paths = args.reports or list_reports(name=args.name)[-2:]
+    if len(paths) != 2:
+        print("⚠️  Need two reports to compare")
+        return 1
+    old, new = load_report(paths[0]), load_report(paths[1])
+    print(f"\n{'Metric':<16} {'Old':<12} {'New':<12} {'Change':<10}")
+    print("─" * 56)
+    rows = compare_reports(old, new, args.threshold)
+    for label, a, b, change, regressed in rows:
+        print(f"{label:<16} {a:<12} {b:<12} {100 * change:+.1f}% {'⚠️  regression' if regressed else ''}")
+    return 1 if any(r[-1] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
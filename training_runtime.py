@@ -0,0 +1,230 @@
+"""
+CPU training runtime profile shared by the training scripts
+
+One call at the top of a script:
+
+    from training_runtime import configure_training_runtime
+    configure_training_runtime()
+
+- detects the CPU topology (sockets / physical cores / usable CPUs) and
+  sizes TensorFlow's intra-op pool to the physical cores it may use
+  (or to the budget train_all_models.py gives the job)
+- keeps oneDNN enabled
+- switches Keras to mixed_bfloat16 only when the CPU has native bf16
+  and a micro-benchmark measures a real speedup over float32
+
+lint_model(model) warns about layer settings that force slow kernels;
+ThroughputProfiler runs it automatically at the start of fit().
+"""
+
+import os
+import time
+
+# Only effective before TensorFlow is first imported; TF >= 2.9 enables it on x86 by default
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '1')
+
+# bf16 must beat float32 by at least this much to be switched on
+MIN_BF16_SPEEDUP = 1.15
+BF16_FLAGS = ('avx512_bf16', 'amx_bf16')
+
+_report = None
+
+
+def cpu_topology():
+    """Sockets, physical cores and logical CPUs this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        usable = sorted(os.sched_getaffinity(0))
+    else:
+        usable = list(range(os.cpu_count() or 1))
+
+    topology = {
+        'model': None,
+        'logical': os.cpu_count() or 1,
+        'usable': len(usable),
+        'physical_usable': len(usable),
+        'sockets': 1,
+        'bf16': False
+    }
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            blocks = f.read().strip().split('\n\n')
+    except OSError:
+        return topology
+
+    cores, sockets = set(), set()
+    for block in blocks:
+        info = {}
+        for line in block.splitlines():
+            key, _, value = line.partition(':')
+            info[key.strip()] = value.strip()
+        if 'processor' not in info:
+            continue
+        topology['model'] = topology['model'] or info.get('model name')
+        flags = info.get('flags', '').split()
+        topology['bf16'] = topology['bf16'] or any(flag in flags for flag in BF16_FLAGS)
+        sockets.add(info.get('physical id', '0'))
+        if int(info['processor']) in usable:
+            # Hyperthread siblings share (physical id, core id)
+            cores.add((info.get('physical id', '0'), info.get('core id', info['processor'])))
+    topology['sockets'] = len(sockets) or 1
+    topology['physical_usable'] = len(cores) or len(usable)
+    return topology
+
+
+def onednn_enabled():
+    try:
+        from tensorflow.python.util import _pywrap_util_port
+        return bool(_pywrap_util_port.IsMklEnabled())
+    except (ImportError, AttributeError):
+        return os.environ.get('TF_ENABLE_ONEDNN_OPTS') != '0'
+
+
+def _time_step(dtype, iterations=20):
+    """Milliseconds per conv + matmul step (the bulk of our CNN/LSTM training) in `dtype`"""
+    import tensorflow as tf
+
+    images = tf.cast(tf.random.uniform((16, 48, 48, 64)), dtype)
+    kernel = tf.cast(tf.random.uniform((3, 3, 64, 64)), dtype)
+    matrix = tf.cast(tf.random.uniform((512, 1024)), dtype)
+    weights = tf.cast(tf.random.uniform((1024, 1024)), dtype)
+
+    @tf.function
+    def step():
+        conv = tf.nn.conv2d(images, kernel, strides=1, padding='SAME')
+        dense = tf.matmul(matrix, weights)
+        return tf.reduce_sum(tf.cast(conv, tf.float32)) + tf.reduce_sum(tf.cast(dense, tf.float32))
+
+    step().numpy()  # trace + warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        step().numpy()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def measure_bf16_speedup():
+    """(float32 ms, bfloat16 ms, speedup) for the micro-benchmark step"""
+    import tensorflow as tf
+    float32_ms = _time_step(tf.float32)
+    bfloat16_ms = _time_step(tf.bfloat16)
+    return round(float32_ms, 2), round(bfloat16_ms, 2), round(float32_ms / bfloat16_ms, 2)
+
+
+def configure_training_runtime(mixed_precision='auto', verbose=True):
+    """Apply the CPU profile; returns (and remembers) a report dict.
+
+    mixed_precision: 'auto' (benchmark, enable bf16 if it pays off), True, or False
+    """
+    global _report
+    import tensorflow as tf
+
+    topology = cpu_topology()
+    # train_all_models.py pins jobs and passes their thread budget in these variables
+    intra = int(os.environ.get('TF_NUM_INTRAOP_THREADS') or topology['physical_usable'])
+    inter = int(os.environ.get('TF_NUM_INTEROP_THREADS') or (2 if intra > 2 else 1))
+
+    report = {
+        'cpu': topology,
+        'intra_op_threads': intra,
+        'inter_op_threads': inter,
+        'onednn': onednn_enabled(),
+        'mixed_precision': 'float32',
+        'bf16_benchmark': None,
+        'warnings': []
+    }
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+    except RuntimeError:
+        report['warnings'].append("TensorFlow already initialized; thread pools left unchanged "
+                                  "(call configure_training_runtime() before building models)")
+
+    if mixed_precision == 'auto' and not topology['bf16']:
+        report['warnings'].append("CPU has no native bf16 (avx512_bf16/amx_bf16); staying in float32")
+    elif mixed_precision:
+        float32_ms, bfloat16_ms, speedup = measure_bf16_speedup()
+        report['bf16_benchmark'] = {'float32_ms': float32_ms, 'bfloat16_ms': bfloat16_ms, 'speedup': speedup}
+        if mixed_precision is True or speedup >= MIN_BF16_SPEEDUP:
+            tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+            report['mixed_precision'] = 'mixed_bfloat16'
+
+    if verbose:
+        print_runtime_report(report)
+    _report = report
+    return report
+
+
+def runtime_report():
+    """Report from the last configure_training_runtime() call in this process, or None"""
+    return _report
+
+
+def print_runtime_report(report):
+    cpu = report['cpu']
+    print("\n⚙️  TRAINING RUNTIME")
+    print(f"   CPU: {cpu['model'] or 'unknown'} ({cpu['sockets']} socket(s), "
+          f"{cpu['physical_usable']} physical / {cpu['usable']} logical usable)")
+    print(f"   Threads: intra-op {report['intra_op_threads']}, inter-op {report['inter_op_threads']}")
+    print(f"   oneDNN: {'enabled' if report['onednn'] else 'disabled'}")
+    bench = report['bf16_benchmark']
+    if bench:
+        print(f"   bf16 benchmark: float32 {bench['float32_ms']} ms vs bfloat16 {bench['bfloat16_ms']} ms "
+              f"-> {bench['speedup']}x")
+    print(f"   Precision policy: {report['mixed_precision']}")
+    for warning in report['warnings']:
+        print(f"   ⚠️  {warning}")
+    print()
+
+
+# ----------------------------------------------------------------------
+# Slow-path lint
+# ----------------------------------------------------------------------
+def _walk_layers(layers):
+    for layer in layers:
+        yield layer
+        if hasattr(layer, 'forward_layer'):  # Bidirectional (backward mirrors forward's settings)
+            yield from _walk_layers([layer.forward_layer])
+        elif hasattr(layer, 'layer'):  # TimeDistributed and other wrappers
+            yield from _walk_layers([layer.layer])
+        elif hasattr(layer, 'layers'):  # nested models
+            yield from _walk_layers(layer.layers)
+
+
+def _activation_name(activation):
+    return getattr(activation, '__name__', str(activation))
+
+
+def lint_model(model):
+    """Warnings for layer settings that force slow (non-fused) kernels or unstable mixed precision"""
+    warnings = []
+    seen = set()
+    for layer in _walk_layers(model.layers):
+        kind = type(layer).__name__
+        if kind in ('LSTM', 'GRU') and layer.name not in seen:
+            seen.add(layer.name)
+            reasons = []
+            if getattr(layer, 'recurrent_dropout', 0):
+                reasons.append(f"recurrent_dropout={layer.recurrent_dropout}")
+            if _activation_name(layer.activation) != 'tanh':
+                reasons.append(f"activation={_activation_name(layer.activation)}")
+            if _activation_name(layer.recurrent_activation) != 'sigmoid':
+                reasons.append(f"recurrent_activation={_activation_name(layer.recurrent_activation)}")
+            if getattr(layer, 'unroll', False):
+                reasons.append("unroll=True")
+            if not getattr(layer, 'use_bias', True):
+                reasons.append("use_bias=False")
+            if reasons:
+                warnings.append(f"{kind} '{layer.name}' uses {', '.join(reasons)}, which disables the fused "
+                                f"cuDNN/oneDNN kernel (step-by-step loop instead); prefer dropout on the inputs")
+
+    output = model.layers[-1] if model.layers else None
+    while getattr(output, 'layers', None):  # head sub-model (embedding_cache.split_transfer_model)
+        output = output.layers[-1]
+    output_dtype = getattr(getattr(output, 'dtype_policy', None), 'compute_dtype', None)
+    if output is not None and output_dtype not in (None, 'float32'):
+        warnings.append(f"Output layer '{output.name}' computes in {output_dtype}; "
+                        f"pass dtype='float32' so softmax/loss stay in full precision")
+
+    for warning in warnings:
+        print(f"⚠️  {warning}")
+    return warnings
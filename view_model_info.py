@@ -6,6 +6,7 @@ Shows all trained models with their accuracy and details
 import os
 import json
 from datetime import datetime
+from training_profiler import list_reports, load_report, compare_reports
 
 class ModelInfoViewer:
     def __init__(self):
@@ -43,6 +44,43 @@ class ModelInfoViewer:
                 pass
         return []
     
+    def load_profiles(self):
+        """Latest profile report per training script, plus the one before it"""
+        latest = {}
+        for path in list_reports():
+            report = load_report(path)
+            if report:
+                latest.setdefault(report['name'], []).append(report)
+        return {name: reports[-2:] for name, reports in latest.items()}
+    
+    def display_profiles(self):
+        """Throughput from checkpoints/profiles, flagging regressions against the previous run"""
+        profiles = self.load_profiles()
+        if not profiles:
+            return
+        
+        print("\n\n⏱️  TRAINING THROUGHPUT")
+        print("─"*100)
+        print(f"{'Script':<32} {'Commit':<10} {'Samples/s':<12} {'Step p50 ms':<13} {'Data wait':<11} {'Peak RSS MB':<13} {'vs previous':<10}")
+        print("─"*100)
+        
+        for name, reports in sorted(profiles.items()):
+            summary = reports[-1]['summary']
+            speed = summary['samples_per_sec'] or summary['steps_per_sec']
+            wait = f"{100 * summary['data_wait_fraction']:.1f}%" if summary['data_wait_fraction'] is not None else "N/A"
+            change = ""
+            if len(reports) == 2:
+                rows = compare_reports(reports[0], reports[1])
+                throughput = [r for r in rows if r[0] in ('Samples/sec', 'Steps/sec')]
+                if throughput:
+                    change = f"{100 * throughput[0][3]:+.1f}%"
+                if any(r[4] for r in rows):
+                    change += " ⚠️"
+            commit = reports[-1].get('commit') or 'N/A'
+            print(f"{name:<32} {commit:<10} {str(speed):<12} {str(summary['step_ms_p50']):<13} {wait:<11} {str(summary['peak_rss_mb']):<13} {change:<10}")
+        
+        print("\n💡 Details: python training_profiler.py show | compare --name <script>")
+    
     def display_info(self):
         """Display comprehensive model information"""
         print("\n" + "="*100)
@@ -75,6 +113,8 @@ class ModelInfoViewer:
                 print(f"📈 Best Accuracy: {max(accuracies):.2f}%")
                 print(f"📈 Lowest Accuracy: {min(accuracies):.2f}%")
         
+        self.display_profiles()
+        
         # Display model files
         print("\n\n💾 MODEL FILES")
         print("─"*100)
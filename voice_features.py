@@ -0,0 +1,196 @@
+"""
+Voice feature extraction with a process pool and an on-disk feature store
+
+Every spectral feature is computed from one shared STFT, and features are
+cached under data/voice_feature_store/<EXTRACTOR_VERSION>/ keyed by the
+SHA-256 of the audio file, so re-running training only extracts files
+that changed (or everything, after an extractor change bumps the version).
+"""
+
+import os
+import sys
+import hashlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Bump whenever the feature definition changes; old cache entries are then ignored
+EXTRACTOR_VERSION = 'v2-shared-stft'
+STORE_DIR = 'data/voice_feature_store'
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac')
+
+SAMPLE_RATE = 22050
+DURATION = 3
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MFCC = 40
+N_MELS = 128
+# mfcc, chroma, mel, contrast, tonnetz (mean+std each), tempo, zcr/centroid/rolloff/bandwidth (mean+std)
+FEATURE_DIM = 2 * (N_MFCC + 12 + N_MELS + 7 + 6) + 1 + 2 * 4
+
+
+def extract_features(file_path, duration=DURATION):
+    """Comprehensive audio features for one file, all derived from a single STFT"""
+    import librosa
+
+    y, sr = librosa.load(file_path, duration=duration, sr=SAMPLE_RATE)
+
+    stft = librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    magnitude = np.abs(stft)
+    power = magnitude ** 2
+
+    # Spectral features
+    mel = librosa.feature.melspectrogram(S=power, sr=sr, n_mels=N_MELS)
+    log_mel = librosa.power_to_db(mel)
+    mfccs = librosa.feature.mfcc(S=log_mel, n_mfcc=N_MFCC)
+    chroma = librosa.feature.chroma_stft(S=power, sr=sr)
+    contrast = librosa.feature.spectral_contrast(S=magnitude, sr=sr)
+
+    # Harmonic part via HPSS on the existing STFT instead of effects.harmonic (its own STFT + ISTFT)
+    harmonic, _ = librosa.decompose.hpss(stft)
+    tonnetz = librosa.feature.tonnetz(chroma=librosa.feature.chroma_stft(S=np.abs(harmonic) ** 2, sr=sr), sr=sr)
+
+    # Rhythm features
+    onset_env = librosa.onset.onset_strength(S=log_mel, sr=sr)
+    tempo, _ = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr)
+
+    # Zero crossing rate
+    zcr = librosa.feature.zero_crossing_rate(y, frame_length=N_FFT, hop_length=HOP_LENGTH)
+
+    # Spectral shape
+    spectral_centroids = librosa.feature.spectral_centroid(S=magnitude, sr=sr)
+    spectral_rolloff = librosa.feature.spectral_rolloff(S=magnitude, sr=sr)
+    spectral_bandwidth = librosa.feature.spectral_bandwidth(S=magnitude, sr=sr)
+
+    # Combine all features
+    features = np.concatenate([
+        np.mean(mfccs.T, axis=0),
+        np.std(mfccs.T, axis=0),
+        np.mean(chroma.T, axis=0),
+        np.std(chroma.T, axis=0),
+        np.mean(mel.T, axis=0),
+        np.std(mel.T, axis=0),
+        np.mean(contrast.T, axis=0),
+        np.std(contrast.T, axis=0),
+        np.mean(tonnetz.T, axis=0),
+        np.std(tonnetz.T, axis=0),
+        np.atleast_1d(tempo)[:1],
+        np.mean(zcr.T, axis=0),
+        np.std(zcr.T, axis=0),
+        np.mean(spectral_centroids.T, axis=0),
+        np.std(spectral_centroids.T, axis=0),
+        np.mean(spectral_rolloff.T, axis=0),
+        np.std(spectral_rolloff.T, axis=0),
+        np.mean(spectral_bandwidth.T, axis=0),
+        np.std(spectral_bandwidth.T, axis=0)
+    ]).astype(np.float32)
+
+    if features.shape != (FEATURE_DIM,):
+        raise ValueError(f"expected {FEATURE_DIM} features, got {features.shape}")
+    return features
+
+
+class FeatureStore:
+    def __init__(self, store_dir=STORE_DIR, version=EXTRACTOR_VERSION):
+        self.root = os.path.join(store_dir, version)
+
+    @staticmethod
+    def file_hash(file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.npy")
+
+    def get(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            return np.load(path)
+        return None
+
+    def put(self, key, features):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, features)
+        os.replace(tmp_path, path)
+
+
+def _extract_job(args):
+    """Worker: hash -> cache lookup -> extract on miss. Never raises."""
+    file_path, store_dir = args
+    store = FeatureStore(store_dir)
+    try:
+        key = store.file_hash(file_path)
+        cached = store.get(key)
+        if cached is not None:
+            return file_path, cached, None, True
+        features = extract_features(file_path)
+        store.put(key, features)
+        return file_path, features, None, False
+    except Exception as e:
+        return file_path, None, f"{type(e).__name__}: {e}", False
+
+
+def list_audio_files(voice_dir):
+    """(path, label) pairs for <voice_dir>/<emotion>/<file>"""
+    files = []
+    for emotion_folder in sorted(os.listdir(voice_dir)):
+        emotion_path = os.path.join(voice_dir, emotion_folder)
+        if os.path.isdir(emotion_path):
+            for file in sorted(os.listdir(emotion_path)):
+                if file.endswith(AUDIO_EXTENSIONS):
+                    files.append((os.path.join(emotion_path, file), emotion_folder))
+    return files
+
+
+def extract_dataset(voice_dir, workers=None, store_dir=STORE_DIR):
+    """Features for every audio file under voice_dir.
+
+    Returns (X, y, failures) where failures is a list of (path, error);
+    failed files are left out instead of being zero-filled.
+    """
+    files = list_audio_files(voice_dir)
+    labels = dict(files)
+    jobs = [(path, store_dir) for path, _ in files]
+
+    workers = workers or os.cpu_count() or 1
+    # fork only from a process that hasn't loaded TensorFlow (its thread pools
+    # don't survive a fork; children can deadlock), and not spawn: that would
+    # re-run the unguarded training script in every child. Otherwise extract
+    # serially; the feature store still skips unchanged files.
+    tf_loaded = 'tensorflow' in sys.modules
+    if tf_loaded and workers > 1:
+        print("⚠️  TensorFlow already imported; extracting voice features without a process pool")
+    if workers > 1 and not tf_loaded and 'fork' in mp.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('fork')) as pool:
+            results = list(pool.map(_extract_job, jobs, chunksize=8))
+    else:
+        results = [_extract_job(job) for job in jobs]
+
+    X, y, failures = [], [], []
+    cached = 0
+    for path, features, error, hit in results:
+        if error is not None:
+            failures.append((path, error))
+            continue
+        cached += hit
+        X.append(features)
+        y.append(labels[path])
+
+    print(f"✓ Voice features: {len(X)} files ({cached} cached, {len(X) - cached} extracted), "
+          f"{len(failures)} failed")
+    for path, error in failures:
+        print(f"  ✗ {path}: {error}")
+
+    X = np.stack(X) if X else np.zeros((0, FEATURE_DIM), dtype=np.float32)
+    return X, np.array(y), failures
+
+
+if __name__ == "__main__":
+    voice_dir = sys.argv[1] if len(sys.argv) > 1 else 'models/voice'
+    extract_dataset(voice_dir)